@@ -1,20 +1,106 @@
-from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
-from flask_cors import CORS
-from .config import Config
+# app/__init__.py
+import importlib
+import time
 
-db = SQLAlchemy()
+# (module, blueprint, url prefix), imported when the app is built
+BLUEPRINTS = [
+    ('app.routes.health', 'health_bp', None),
+    ('app.routes.auth', 'auth_bp', '/api/auth'),
+    ('app.routes.users', 'users_bp', '/api/users'),
+    ('app.routes.companies', 'companies_bp', '/api/companies'),
+    ('app.routes.projects', 'projects_bp', '/api/projects'),
+    ('app.routes.jobs', 'jobs_bp', '/api/jobs'),
+    ('app.routes.exports', 'exports_bp', '/api/exports'),
+    ('app.routes.reports', 'reports_bp', '/api/reports'),
+    ('app.routes.changes', 'changes_bp', '/api/changes'),
+    ('app.routes.analytics', 'analytics_bp', '/api/analytics'),
+    ('app.routes.standards', 'standards_bp', '/api/standards'),
+    ('app.routes.mappings', 'mappings_bp', '/api/mappings'),
+    ('app.routes.project_types', 'project_types_bp', '/api/project-types'),
+    ('app.routes.deadlines', 'deadlines_bp', '/api/deadlines'),
+    ('app.routes.tickets', 'tickets_bp', '/api/tickets'),
+    ('app.routes.evidence_review', 'evidence_review_bp', '/api/evidence-reviews'),
+    ('app.routes.scans', 'scans_bp', '/api/scans'),
+    ('app.routes.scopes', 'scopes_bp', '/api/scopes'),
+    ('app.routes.audit_logs', 'audit_logs_bp', '/api/audit-logs'),
+    ('app.routes.batch', 'batch_bp', '/api/batch'),
+    ('app.routes.uploads', 'uploads_bp', '/api/uploads'),
+]
 
-def create_app():
-    app = Flask(__name__)
-    app.config.from_object(Config)
+# Modules that register session event listeners; every process needs them,
+# including workers and scripts that register no routes
+LISTENER_MODULES = [
+    'app.services.changes',
+    'app.services.analytics',
+    'app.services.standards',
+    'app.services.mapping_index',
+    'app.services.tickets',
+    'app.services.scopes',
+    'app.services.result_cache',
+    'app.services.tokens',
+    'app.services.upload_queue',
+    'app.utils.policy',
+]
+
+
+def create_app(config_object=None, register_routes=True):
+    """Build the Flask app; the single entry point for the API, worker and scripts."""
+    started = time.perf_counter()
     
-    # Initialize extensions
-    db.init_app(app)
+    from flask import Flask
+    from flask_cors import CORS
+    from app.config import Config
+    from app.models.models import db
+    
+    app = Flask(__name__)
+    app.config.from_object(config_object or Config)
     CORS(app)
+    db.init_app(app)
+    configured = time.perf_counter()
     
-    # Register blueprints
-    from app.routes.auth import auth_bp
-    app.register_blueprint(auth_bp, url_prefix="/api/auth")
+    for module in LISTENER_MODULES:
+        importlib.import_module(module)
+    if register_routes:
+        for module, blueprint, url_prefix in BLUEPRINTS:
+            app.register_blueprint(getattr(importlib.import_module(module), blueprint), url_prefix=url_prefix)
+        if app.config.get('LOAD_SHEDDING_ENABLED'):
+            from app.utils.rate_limit import init_load_shedding
+            init_load_shedding(app)
+        from app.utils.archived_projects import init_archived_project_reads
+        init_archived_project_reads(app)
+    registered = time.perf_counter()
     
+    app.config['STARTUP_TIMINGS'] = {
+        'configure_seconds': round(configured - started, 4),
+        'register_seconds': round(registered - configured, 4),
+        'create_app_seconds': round(registered - started, 4),
+    }
+    
+    if app.config.get('PRELOAD_CACHES'):
+        warm_caches(app)
+    
+    app.logger.info('App ready: %s', app.config['STARTUP_TIMINGS'])
     return app
+
+
+def warm_caches(app):
+    """Load mappers and shared catalog data up front so forked workers share them copy-on-write."""
+    started = time.perf_counter()
+    
+    from sqlalchemy.orm import configure_mappers
+    from app.models.models import db, ProjectType
+    from app.services.mapping_index import get_mapping_index
+    from app.services.project_templates import get_compiled_plan
+    
+    configure_mappers()
+    with app.app_context():
+        get_mapping_index()
+        for project_type_id, version in db.session.query(ProjectType.id, ProjectType.template_version).filter(
+            ProjectType.template_version.isnot(None)
+        ):
+            get_compiled_plan(project_type_id, version)
+        db.session.remove()
+        # Connections opened here must not be inherited by forked workers
+        db.get_engine(app).dispose()
+    
+    app.config['STARTUP_TIMINGS']['warm_seconds'] = round(time.perf_counter() - started, 4)
@@ -1,21 +1,23 @@
-# import os
-
-# class Config:
-#     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key'
-#     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
-#         'postgresql://youruser:yourpassword@db:5432/yourdb'
-#     SQLALCHEMY_TRACK_MODIFICATIONS = False
-
-# # app/config.py
+# app/config.py
 import os
 
-# class Config:
-#     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key'
-#     SQLALCHEMY_DATABASE_URI = 'postgresql://localhost/compliancepro'  # Replace 'yourdb' with your database name
-#     SQLALCHEMY_TRACK_MODIFICATIONS = False
-
 
 class Config:
-    SECRET_KEY = 'dev-secret-key'
-    SQLALCHEMY_DATABASE_URI = 'postgresql://anmolgupta@localhost/compliancepron'
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key'
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'postgresql://anmolgupta@localhost:5432/compliancepron'
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'your-secret-key'  # Change this to a secure key in production
+    # Load catalog caches while building the app, e.g. before gunicorn forks workers
+    PRELOAD_CACHES = os.environ.get('PRELOAD_CACHES', '').lower() in ('1', 'true', 'yes')
+    # Token-bucket budgets declared with @rate_limit on routes
+    RATE_LIMITS_ENABLED = os.environ.get('RATE_LIMITS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    # Per-process adaptive concurrency limit; excess requests get 503 with Retry-After
+    LOAD_SHEDDING_ENABLED = os.environ.get('LOAD_SHEDDING_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    CONCURRENCY_LIMIT_INITIAL = int(os.environ.get('CONCURRENCY_LIMIT_INITIAL', 20))
+    CONCURRENCY_LIMIT_MAX = int(os.environ.get('CONCURRENCY_LIMIT_MAX', 200))
+    # /api/batch: sub-requests per call, and how many independent reads of one call run at once
+    BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', 20))
+    BATCH_CONCURRENCY = int(os.environ.get('BATCH_CONCURRENCY', 4))
+    # Access tokens are short-lived and renewed with a rotating refresh token
+    ACCESS_TOKEN_MINUTES = int(os.environ.get('ACCESS_TOKEN_MINUTES', 15))
+    REFRESH_TOKEN_DAYS = int(os.environ.get('REFRESH_TOKEN_DAYS', 14))
@@ -2,8 +2,7 @@
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.dialects.postgresql import JSONB
-from werkzeug.security import generate_password_hash, check_password_hash
-import bcrypt
+import ipaddress
 
 db = SQLAlchemy()
 
@@ -62,40 +61,14 @@ class User(db.Model):
     notifications = db.relationship('Notification', backref='user', lazy=True)
     audit_logs = db.relationship('AuditLog', backref='user', lazy=True)
     
-    # In your User model
-
-def check_password(self, password):
-    try:
-        import bcrypt
-        # Convert the stored password hash from string to bytes
-        stored_hash = self.password.encode('utf-8')
-        
-        # Convert the provided password to bytes and check against stored hash
-        return bcrypt.checkpw(password.encode('utf-8'), stored_hash)
-    except ImportError:
-        # Fallback in case bcrypt is not available
-        from werkzeug.security import check_password_hash
-        return check_password_hash(self.password, password)
-
-def set_password(self, password):
-    try:
+    def check_password(self, password):
+        # bcrypt is imported on first use to keep app start-up light
         import bcrypt
-        # Generate a salt and hash the password
-        salt = bcrypt.gensalt()
-        hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-        self.password = hashed.decode('utf-8')  # Store as string in the database
-    except ImportError:
-        # Fallback in case bcrypt is not available
-        from werkzeug.security import generate_password_hash
-        self.password = generate_password_hash(password)
-
-
-    # def set_password(self, password):
-    #     self.password = generate_password_hash(password)
-    
-    # def check_password(self, password):
-    #     return check_password_hash(self.password, password)
+        return bcrypt.checkpw(password.encode('utf-8'), self.password.encode('utf-8'))
     
+    def set_password(self, password):
+        import bcrypt
+        self.password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
     
     def to_dict(self, include_company=False):
         data = {
@@ -126,12 +99,15 @@ class ProjectType(db.Model):
     code = db.Column(db.String(50), unique=True, nullable=False)
     category = db.Column(db.String(50))
     is_auditable = db.Column(db.Boolean, default=True)
+    # Current ProjectTypeTemplate version, if the type has a template
+    template_version = db.Column(db.Integer)
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     projects = db.relationship('Project', backref='project_type', lazy=True)
+    templates = db.relationship('ProjectTypeTemplate', backref='project_type', lazy=True)
     creator = db.relationship('User', foreign_keys=[created_by])
     
     def to_dict(self):
@@ -141,12 +117,43 @@ class ProjectType(db.Model):
             'code': self.code,
             'category': self.category,
             'is_auditable': self.is_auditable,
+            'template_version': self.template_version,
             'created_by': self.created_by,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
 
+class ProjectTypeTemplate(db.Model):
+    __tablename__ = 'project_type_templates'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    project_type_id = db.Column(db.Integer, db.ForeignKey('project_types.id'), nullable=False)
+    version = db.Column(db.Integer, nullable=False)
+    # Template as submitted: associated standards, required evidence, workflow steps
+    definition = db.Column(JSONB, nullable=False)
+    # Resolved ids and milestone offsets used when instantiating projects
+    compiled_plan = db.Column(JSONB, nullable=False)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    creator = db.relationship('User', foreign_keys=[created_by])
+    
+    __table_args__ = (db.UniqueConstraint('project_type_id', 'version'),)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'project_type_id': self.project_type_id,
+            'version': self.version,
+            'definition': self.definition,
+            'compiled_plan': self.compiled_plan,
+            'created_by': self.created_by,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
 class Project(db.Model):
     __tablename__ = 'projects'
     
@@ -158,6 +165,13 @@ class Project(db.Model):
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Set while the project's data lives in the archive schema; the summary
+    # keeps the status to restore and the rows moved per table
+    archived_at = db.Column(db.DateTime)
+    archive_summary = db.Column(JSONB)
+    
+    CLOSED_STATUSES = ('completed', 'closed', 'cancelled')
+    ARCHIVED_STATUS = 'archived'
     
     # Relationships
     project_users = db.relationship('ProjectUser', backref='project', lazy=True)
@@ -177,7 +191,8 @@ class Project(db.Model):
             'status': self.status,
             'created_by': self.created_by,
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'archived_at': self.archived_at.isoformat() if self.archived_at else None
         }
         
         if include_company and self.company:
@@ -288,6 +303,15 @@ class Milestone(db.Model):
     # Relationships
     creator = db.relationship('User', foreign_keys=[created_by])
     
+    CLOSED_STATUSES = ('completed', 'cancelled')
+    
+    # Open milestones by due date, for the deadline sweeper
+    __table_args__ = (
+        db.Index('ix_milestones_open_due_date', 'due_date', 'project_plan_id',
+                 postgresql_where=db.or_(status.is_(None), status.notin_(CLOSED_STATUSES))),
+        db.Index('ix_milestones_updated_at', 'updated_at'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -314,6 +338,12 @@ class ComplianceStandard(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Denormalized counters, kept current by services/standards.py
+    requirements_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    leaf_requirements_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    evidence_items_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    projects_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
     # Relationships
     requirements = db.relationship('Requirement', backref='compliance_standard', lazy=True)
     creator = db.relationship('User', foreign_keys=[created_by])
@@ -325,6 +355,10 @@ class ComplianceStandard(db.Model):
             'code': self.code,
             'description': self.description,
             'version': self.version,
+            'requirements_count': self.requirements_count,
+            'leaf_requirements_count': self.leaf_requirements_count,
+            'evidence_items_count': self.evidence_items_count,
+            'projects_count': self.projects_count,
             'created_by': self.created_by,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
@@ -336,6 +370,21 @@ class ComplianceStandard(db.Model):
         return data
 
 
+class StandardCounterDelta(db.Model):
+    __tablename__ = 'standard_counter_deltas'
+    
+    # Pending changes to a standard's counters. Writers only insert here, so
+    # concurrent project creation never waits on the standard's row; a
+    # periodic job folds the rows into compliance_standards
+    id = db.Column(db.BigInteger, primary_key=True)
+    standard_id = db.Column(db.Integer, db.ForeignKey('compliance_standards.id', ondelete='CASCADE'), nullable=False, index=True)
+    requirements_count = db.Column(db.Integer, nullable=False, default=0)
+    leaf_requirements_count = db.Column(db.Integer, nullable=False, default=0)
+    evidence_items_count = db.Column(db.Integer, nullable=False, default=0)
+    projects_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
 class Requirement(db.Model):
     __tablename__ = 'requirements'
     
@@ -357,7 +406,10 @@ class Requirement(db.Model):
     group_mappings = db.relationship('RequirementGroupMapping', backref='requirement', lazy=True)
     creator = db.relationship('User', foreign_keys=[created_by])
     
-    __table_args__ = (db.UniqueConstraint('compliance_standard_id', 'requirement_number'),)
+    __table_args__ = (
+        db.UniqueConstraint('compliance_standard_id', 'requirement_number'),
+        db.Index('ix_requirements_parent_id', 'parent_id'),
+    )
     
     def to_dict(self, include_children=False, include_evidence=False):
         data = {
@@ -473,7 +525,10 @@ class EvidenceRequirementMapping(db.Model):
     # Relationships
     creator = db.relationship('User', foreign_keys=[created_by])
     
-    __table_args__ = (db.UniqueConstraint('evidence_id', 'requirement_id'),)
+    __table_args__ = (
+        db.UniqueConstraint('evidence_id', 'requirement_id'),
+        db.Index('ix_evidence_requirement_mappings_requirement_id', 'requirement_id'),
+    )
 
 
 class ProjectEvidence(db.Model):
@@ -564,7 +619,10 @@ class SOA(db.Model):
     # Relationships
     creator = db.relationship('User', foreign_keys=[created_by])
     
-    __table_args__ = (db.UniqueConstraint('project_id', 'requirement_id'),)
+    __table_args__ = (
+        db.UniqueConstraint('project_id', 'requirement_id'),
+        db.Index('ix_soa_requirement_id', 'requirement_id'),
+    )
     
     def to_dict(self, include_requirement=False):
         data = {
@@ -606,6 +664,17 @@ class ActionItem(db.Model):
     evidences = db.relationship('ActionEvidence', backref='action_item', lazy=True)
     creator = db.relationship('User', foreign_keys=[created_by])
     
+    CLOSED_STATUSES = ('closed', 'completed', 'cancelled')
+    
+    # Open action items by target date, overall and per assignee
+    __table_args__ = (
+        db.Index('ix_action_items_open_target_date', 'target_date',
+                 postgresql_where=db.or_(status.is_(None), status.notin_(CLOSED_STATUSES))),
+        db.Index('ix_action_items_open_assignee_target_date', 'assigned_to', 'target_date',
+                 postgresql_where=db.or_(status.is_(None), status.notin_(CLOSED_STATUSES))),
+        db.Index('ix_action_items_updated_at', 'updated_at'),
+    )
+    
     def to_dict(self, include_evidences=False, include_requirement=False):
         data = {
             'id': self.id,
@@ -684,8 +753,9 @@ class TestingScope(db.Model):
     # Relationships
     scan_results = db.relationship('ScanResult', backref='scope', lazy=True)
     creator = db.relationship('User', foreign_keys=[created_by])
+    entries = db.relationship('TestingScopeEntry', backref='scope', lazy=True, passive_deletes=True)
     
-    def to_dict(self, include_scan_results=False):
+    def to_dict(self, include_scan_results=False, include_entries=False):
         data = {
             'id': self.id,
             'project_id': self.project_id,
@@ -699,9 +769,45 @@ class TestingScope(db.Model):
         if include_scan_results:
             data['scan_results'] = [result.to_dict() for result in self.scan_results]
             
+        if include_entries:
+            data['entries'] = [entry.to_dict() for entry in self.entries]
+            
         return data
 
 
+class TestingScopeEntry(db.Model):
+    __tablename__ = 'testing_scope_entries'
+    
+    # One parsed piece of a scope value: an IP range, a host or a *.domain wildcard
+    id = db.Column(db.Integer, primary_key=True)
+    scope_id = db.Column(db.Integer, db.ForeignKey('testing_scopes.id', ondelete='CASCADE'), nullable=False)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)
+    ip_version = db.Column(db.SmallInteger)
+    # Inclusive integer bounds of the address range; numeric(39) holds IPv6
+    range_start = db.Column(db.Numeric(39, 0))
+    range_end = db.Column(db.Numeric(39, 0))
+    host = db.Column(db.String(255))
+    
+    __table_args__ = (
+        db.Index('ix_testing_scope_entries_project_range', 'project_id', 'ip_version', 'range_start', 'range_end'),
+        db.Index('ix_testing_scope_entries_project_host', 'project_id', 'host'),
+        db.Index('ix_testing_scope_entries_scope_id', 'scope_id'),
+    )
+    
+    def to_dict(self):
+        address = ipaddress.IPv4Address if self.ip_version == 4 else ipaddress.IPv6Address
+        return {
+            'id': self.id,
+            'scope_id': self.scope_id,
+            'kind': self.kind,
+            'ip_version': self.ip_version,
+            'range_start': str(address(int(self.range_start))) if self.range_start is not None else None,
+            'range_end': str(address(int(self.range_end))) if self.range_end is not None else None,
+            'host': self.host
+        }
+
+
 class Vulnerability(db.Model):
     __tablename__ = 'vulnerabilities'
     
@@ -726,6 +832,8 @@ class Vulnerability(db.Model):
     scan_results = db.relationship('ScanResult', backref='vulnerability', lazy=True)
     creator = db.relationship('User', foreign_keys=[created_by])
     
+    __table_args__ = (db.Index('ix_vulnerabilities_project_cve', 'project_id', 'cve_id'),)
+    
     def to_dict(self, include_scan_results=False):
         data = {
             'id': self.id,
@@ -762,6 +870,13 @@ class ScanResult(db.Model):
     proof_of_concept = db.Column(db.Text)
     status = db.Column(db.String(50))
     scan_date = db.Column(db.DateTime, default=datetime.utcnow)
+    # Host, URL or service the finding was reported against
+    affected_system = db.Column(db.String(255))
+    # sha1 of vulnerability key, scope and normalised affected system
+    fingerprint = db.Column(db.String(40))
+    first_seen_at = db.Column(db.DateTime)
+    last_seen_at = db.Column(db.DateTime)
+    closed_at = db.Column(db.DateTime)
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -769,6 +884,15 @@ class ScanResult(db.Model):
     # Relationships
     creator = db.relationship('User', foreign_keys=[created_by])
     
+    OPEN_STATUSES = ('open', 'reopened')
+    # Closed by a rescan or by hand; seeing the finding again reopens it
+    CLOSED_STATUSES = ('closed', 'fixed')
+    
+    __table_args__ = (
+        db.UniqueConstraint('project_id', 'fingerprint'),
+        db.Index('ix_scan_results_project_scope_status', 'project_id', 'scope_id', 'status'),
+    )
+    
     def to_dict(self, include_vulnerability=False, include_scope=False):
         data = {
             'id': self.id,
@@ -778,6 +902,11 @@ class ScanResult(db.Model):
             'proof_of_concept': self.proof_of_concept,
             'status': self.status,
             'scan_date': self.scan_date.isoformat() if self.scan_date else None,
+            'affected_system': self.affected_system,
+            'fingerprint': self.fingerprint,
+            'first_seen_at': self.first_seen_at.isoformat() if self.first_seen_at else None,
+            'last_seen_at': self.last_seen_at.isoformat() if self.last_seen_at else None,
+            'closed_at': self.closed_at.isoformat() if self.closed_at else None,
             'created_by': self.created_by,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
@@ -792,6 +921,10 @@ class ScanResult(db.Model):
         return data
 
 
+# Numeric part of SupportTicket.ticket_id
+ticket_number_seq = db.Sequence('support_ticket_number_seq', metadata=db.Model.metadata)
+
+
 class SupportTicket(db.Model):
     __tablename__ = 'support_tickets'
     
@@ -812,6 +945,15 @@ class SupportTicket(db.Model):
     # Relationships
     attachments = db.relationship('TicketAttachment', backref='ticket', lazy=True)
     
+    RESOLVED_STATUSES = ('resolved', 'closed')
+    
+    __table_args__ = (
+        # Triage queues: filter by status/priority, page by (created_at, id)
+        db.Index('ix_support_tickets_status_priority_created', 'status', 'priority', 'created_at', 'id'),
+        db.Index('ix_support_tickets_assignee_status', 'assigned_to', 'status', 'created_at', 'id'),
+        db.Index('ix_support_tickets_requester_created', 'requester_id', 'created_at', 'id'),
+    )
+    
     def to_dict(self, include_attachments=False, include_requester=False, include_assignee=False):
         data = {
             'id': self.id,
@@ -882,6 +1024,12 @@ class AuditLog(db.Model):
     user_agent = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        # Retention picks aged rows by time; the audit API pages an entity's history by id
+        db.Index('ix_audit_logs_created_at', 'created_at'),
+        db.Index('ix_audit_logs_entity', 'entity_type', 'entity_id', 'id'),
+    )
+    
     def to_dict(self, include_user=False):
         data = {
             'id': self.id,
@@ -948,4 +1096,359 @@ class Notification(db.Model):
             'is_read': self.is_read,
             'link': self.link,
             'created_at': self.created_at.isoformat() if self.created_at else None
-        }
\ No newline at end of file
+        }
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    queue = db.Column(db.String(50), nullable=False, default='default')
+    job_type = db.Column(db.String(100), nullable=False)
+    payload = db.Column(JSONB)
+    status = db.Column(db.String(50), nullable=False, default='queued')
+    progress = db.Column(db.Integer, default=0)
+    attempts = db.Column(db.Integer, default=0)
+    max_attempts = db.Column(db.Integer, default=3)
+    run_at = db.Column(db.DateTime, default=datetime.utcnow)
+    locked_by = db.Column(db.String(100))
+    locked_at = db.Column(db.DateTime)
+    result = db.Column(JSONB)
+    error = db.Column(db.Text)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    
+    # Relationships
+    creator = db.relationship('User', foreign_keys=[created_by])
+    
+    # Workers poll for due jobs per queue
+    __table_args__ = (db.Index('ix_jobs_queue_status_run_at', 'queue', 'status', 'run_at'),)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'queue': self.queue,
+            'job_type': self.job_type,
+            'status': self.status,
+            'progress': self.progress,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'run_at': self.run_at.isoformat() if self.run_at else None,
+            'result': self.result,
+            'error': self.error,
+            'created_by': self.created_by,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class ChangeLog(db.Model):
+    __tablename__ = 'change_log'
+    
+    id = db.Column(db.BigInteger, primary_key=True)
+    # Writing transaction id, so readers only see rows from finished transactions
+    txid = db.Column(db.BigInteger, nullable=False, server_default=db.text('pg_current_xact_id()::text::bigint'))
+    entity_type = db.Column(db.String(50), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    operation = db.Column(db.String(20), nullable=False)
+    # No foreign keys: tombstones must outlive the rows they describe
+    project_id = db.Column(db.Integer)
+    user_id = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (db.Index('ix_change_log_txid_id', 'txid', 'id'),)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'entity_type': self.entity_type,
+            'entity_id': self.entity_id,
+            'operation': self.operation,
+            'project_id': self.project_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+class ProjectDistributionRollup(db.Model):
+    __tablename__ = 'project_distribution_rollups'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    # Day the counted projects were created
+    day = db.Column(db.Date, nullable=False)
+    company_id = db.Column(db.Integer, db.ForeignKey('companies.id'), nullable=False)
+    category = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(50), nullable=False)
+    project_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('day', 'company_id', 'category', 'status'),
+        db.Index('ix_project_distribution_rollups_company_day', 'company_id', 'day'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'day': self.day.isoformat() if self.day else None,
+            'company_id': self.company_id,
+            'category': self.category,
+            'status': self.status,
+            'project_count': self.project_count,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
+class CacheVersion(db.Model):
+    __tablename__ = 'cache_versions'
+    
+    # Bumped whenever the data behind a per-worker in-memory structure changes
+    name = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'version': self.version,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
+class SchemaMigration(db.Model):
+    __tablename__ = 'schema_migrations'
+    
+    # Migrations from services/migrations.py already applied to this database
+    name = db.Column(db.String(100), primary_key=True)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class CacheDelta(db.Model):
+    __tablename__ = 'cache_deltas'
+    
+    # The changes behind one CacheVersion bump, so other workers can replay them instead of rebuilding
+    name = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.BigInteger, primary_key=True)
+    deltas = db.Column(JSONB, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class DeadlineEvent(db.Model):
+    __tablename__ = 'deadline_events'
+    
+    # One row per emitted event, so the sweeper never notifies twice
+    id = db.Column(db.Integer, primary_key=True)
+    entity_type = db.Column(db.String(50), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    event = db.Column(db.String(50), nullable=False)
+    due_date = db.Column(db.Date, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (db.UniqueConstraint('entity_type', 'entity_id', 'event', 'due_date'),)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'entity_type': self.entity_type,
+            'entity_id': self.entity_id,
+            'event': self.event,
+            'due_date': self.due_date.isoformat() if self.due_date else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+class SupportTicketCounter(db.Model):
+    __tablename__ = 'support_ticket_counters'
+    
+    # scope is 'all' (user_id 0), 'requester' or 'assignee'; an assignee
+    # row only counts tickets the user did not raise themselves
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(20), nullable=False)
+    user_id = db.Column(db.Integer, nullable=False, default=0)
+    status = db.Column(db.String(50), nullable=False)
+    ticket_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (db.UniqueConstraint('scope', 'user_id', 'status'),)
+    
+    def to_dict(self):
+        return {
+            'scope': self.scope,
+            'user_id': self.user_id,
+            'status': self.status,
+            'ticket_count': self.ticket_count,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
+class RateLimitBucket(db.Model):
+    __tablename__ = 'rate_limit_buckets'
+    
+    # One token bucket per limit and key, e.g. 'login:ip:10.0.0.1'; shared by
+    # every worker process. Unlogged: losing buckets on a crash only resets limits
+    key = db.Column(db.String(255), primary_key=True)
+    tokens = db.Column(db.Float, nullable=False)
+    allowed = db.Column(db.Boolean, nullable=False, default=True)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    
+    __table_args__ = {'prefixes': ['UNLOGGED']}
+    
+    def to_dict(self):
+        return {
+            'key': self.key,
+            'tokens': self.tokens,
+            'allowed': self.allowed,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
+class AuditArchive(db.Model):
+    __tablename__ = 'audit_archives'
+    
+    # One compressed, columnar file of audit_logs rows moved out of Postgres.
+    # The min/max columns are the file's index: queries skip files whose
+    # ranges cannot match. Files are written once and never modified.
+    id = db.Column(db.Integer, primary_key=True)
+    path = db.Column(db.String(500), nullable=False, unique=True)
+    row_count = db.Column(db.Integer, nullable=False)
+    size_bytes = db.Column(db.BigInteger, nullable=False)
+    checksum = db.Column(db.String(64), nullable=False)
+    min_id = db.Column(db.Integer, nullable=False)
+    max_id = db.Column(db.Integer, nullable=False)
+    min_created_at = db.Column(db.DateTime, nullable=False)
+    max_created_at = db.Column(db.DateTime, nullable=False)
+    min_entity_id = db.Column(db.Integer, nullable=False)
+    max_entity_id = db.Column(db.Integer, nullable=False)
+    min_user_id = db.Column(db.Integer)
+    max_user_id = db.Column(db.Integer)
+    entity_types = db.Column(JSONB, nullable=False, default=list)
+    actions = db.Column(JSONB, nullable=False, default=list)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_audit_archives_max_id', 'max_id'),
+        db.Index('ix_audit_archives_created_range', 'min_created_at', 'max_created_at'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'path': self.path,
+            'row_count': self.row_count,
+            'size_bytes': self.size_bytes,
+            'checksum': self.checksum,
+            'min_id': self.min_id,
+            'max_id': self.max_id,
+            'min_created_at': self.min_created_at.isoformat() if self.min_created_at else None,
+            'max_created_at': self.max_created_at.isoformat() if self.max_created_at else None,
+            'min_entity_id': self.min_entity_id,
+            'max_entity_id': self.max_entity_id,
+            'min_user_id': self.min_user_id,
+            'max_user_id': self.max_user_id,
+            'entity_types': self.entity_types,
+            'actions': self.actions,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+class RefreshToken(db.Model):
+    __tablename__ = 'refresh_tokens'
+    
+    # One row per issued refresh token. Each use replaces the token with a new
+    # one in the same family; presenting a replaced token again revokes the family
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(64), nullable=False, unique=True)
+    family_id = db.Column(db.String(64), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    revoked_at = db.Column(db.DateTime)
+    replaced_by = db.Column(db.String(64))
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'jti': self.jti,
+            'family_id': self.family_id,
+            'user_id': self.user_id,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'revoked_at': self.revoked_at.isoformat() if self.revoked_at else None,
+            'replaced_by': self.replaced_by
+        }
+
+
+class TokenRevocation(db.Model):
+    __tablename__ = 'token_revocations'
+    
+    # Append-only feed of revoked access tokens, read incrementally by every
+    # worker by (txid, id). A row revokes one token (jti) or, with jti NULL,
+    # every token of user_id issued before revoked_at. Kept until expires_at,
+    # after which the tokens it revokes have expired anyway
+    id = db.Column(db.BigInteger, primary_key=True)
+    # Writing transaction id, so readers only see rows from finished transactions
+    txid = db.Column(db.BigInteger, nullable=False, server_default=db.text('pg_current_xact_id()::text::bigint'))
+    jti = db.Column(db.String(64), index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
+    reason = db.Column(db.String(50))
+    revoked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    
+    __table_args__ = (db.Index('ix_token_revocations_txid_id', 'txid', 'id'),)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'jti': self.jti,
+            'user_id': self.user_id,
+            'reason': self.reason,
+            'revoked_at': self.revoked_at.isoformat() if self.revoked_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+        }
+
+
+class UploadMetadata(db.Model):
+    __tablename__ = 'upload_metadata'
+    
+    # What post-processing found in one uploaded file, whichever table holds
+    # the upload: evidence_upload, action_evidence or ticket_attachment.
+    # Created pending when the upload is saved; a job run claims it
+    # (processing) and fills it in (processed or failed)
+    id = db.Column(db.Integer, primary_key=True)
+    upload_kind = db.Column(db.String(50), nullable=False)
+    upload_id = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending', index=True)
+    sha256 = db.Column(db.String(64), index=True)
+    blake2b = db.Column(db.String(128))
+    mime_type = db.Column(db.String(100))
+    page_count = db.Column(db.Integer)
+    document_created_at = db.Column(db.DateTime)
+    document_modified_at = db.Column(db.DateTime)
+    thumbnail_path = db.Column(db.String(500))
+    details = db.Column(JSONB, nullable=False, default=dict)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime)
+    claimed_at = db.Column(db.DateTime)
+    
+    __table_args__ = (db.UniqueConstraint('upload_kind', 'upload_id'),)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'upload_kind': self.upload_kind,
+            'upload_id': self.upload_id,
+            'status': self.status,
+            'sha256': self.sha256,
+            'blake2b': self.blake2b,
+            'mime_type': self.mime_type,
+            'page_count': self.page_count,
+            'document_created_at': self.document_created_at.isoformat() if self.document_created_at else None,
+            'document_modified_at': self.document_modified_at.isoformat() if self.document_modified_at else None,
+            'has_thumbnail': bool(self.thumbnail_path),
+            'details': self.details,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'processed_at': self.processed_at.isoformat() if self.processed_at else None
+        }
@@ -0,0 +1,60 @@
+from flask import Blueprint, request, jsonify
+from datetime import datetime
+
+from app.models.models import db
+from app.services.analytics import get_distribution
+from app.services.jobs import enqueue
+from app.utils.auth import token_required
+from app.utils.policy import can, permission_required
+
+analytics_bp = Blueprint('analytics', __name__)
+
+
+def parse_date_arg(name):
+    value = request.args.get(name)
+    return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+@analytics_bp.route('/distribution', methods=['GET'])
+@token_required
+def get_project_distribution(current_user):
+    try:
+        start = parse_date_arg('from')
+        end = parse_date_arg('to')
+    except ValueError:
+        return jsonify({'message': 'Dates must be YYYY-MM-DD!'}), 400
+    
+    top = max(1, min(request.args.get('top', 10, type=int), 100))
+    
+    # Only super admin sees every company
+    view_all = can(current_user, 'companies:view_all')
+    company_id = None if view_all else current_user.company_id
+    if not view_all and not company_id:
+        return jsonify({'message': 'Unauthorized!'}), 403
+    
+    return jsonify(get_distribution(company_id=company_id, start=start, end=end, top=top))
+
+@analytics_bp.route('/rollups/backfill', methods=['POST'])
+@token_required
+@permission_required('analytics:backfill')
+def backfill_rollups(current_user):
+    data = request.get_json(silent=True) or {}
+    try:
+        start, end = [
+            datetime.strptime(data[name], '%Y-%m-%d').date() if data.get(name) else None
+            for name in ('start', 'end')
+        ]
+    except (TypeError, ValueError):
+        return jsonify({'message': 'Dates must be YYYY-MM-DD!'}), 400
+    if start and end and start > end:
+        return jsonify({'message': 'Start must not be after end!'}), 400
+    
+    job = enqueue('backfill_distribution_rollups', {
+        'start': start.isoformat() if start else None,
+        'end': end.isoformat() if end else None
+    }, created_by=current_user.id)
+    db.session.commit()
+    
+    return jsonify({
+        'message': 'Rollup backfill started!',
+        'job': job.to_dict()
+    }), 202
@@ -0,0 +1,55 @@
+from flask import Blueprint, request, jsonify
+
+from app.models.models import db, AuditArchive
+from app.services.audit import AUDIT_COLUMN_NAMES, parse_filters, query_audit_logs
+from app.services.jobs import enqueue
+from app.utils.auth import token_required
+from app.utils.policy import permission_required
+from app.utils.responses import list_response
+
+audit_logs_bp = Blueprint('audit_logs', __name__)
+
+@audit_logs_bp.route('', methods=['GET'])
+@token_required
+@permission_required('audit_logs:view')
+def get_audit_logs(current_user):
+    limit = max(1, min(request.args.get('limit', 100, type=int), 1000))
+    
+    try:
+        filters = parse_filters(request.args)
+        before = request.args.get('before', type=int)
+    except ValueError:
+        return jsonify({'message': 'Invalid audit log filter!'}), 400
+    
+    # Hot rows from Postgres and archived rows from files, newest first
+    rows, next_before, stats = query_audit_logs(filters, before=before, limit=limit)
+    
+    headers = {
+        'X-Archives-Scanned': str(stats['archives_scanned']),
+        'X-Archives-Skipped': str(stats['archives_skipped'])
+    }
+    if next_before is not None:
+        headers['X-Next-Before'] = str(next_before)
+    return list_response('audit_logs', AUDIT_COLUMN_NAMES, rows, headers=headers)
+
+@audit_logs_bp.route('/archives', methods=['GET'])
+@token_required
+@permission_required('audit_logs:view')
+def get_audit_archives(current_user):
+    archives = AuditArchive.query.order_by(AuditArchive.max_id.desc()).all()
+    
+    return jsonify({
+        'archives': [archive.to_dict() for archive in archives]
+    })
+
+@audit_logs_bp.route('/archives', methods=['POST'])
+@token_required
+@permission_required('audit_logs:archive')
+def archive_audit_logs(current_user):
+    job = enqueue('archive_audit_logs', created_by=current_user.id)
+    db.session.commit()
+    
+    return jsonify({
+        'message': 'Audit log archiving started!',
+        'job': job.to_dict()
+    }), 202
@@ -1,75 +1,153 @@
-from flask import Blueprint, request, jsonify
-from app.models.user import User
-from app import db
-import jwt
-import datetime
-from functools import wraps
-from flask import current_app
+from flask import Blueprint, request, jsonify, g
+from datetime import datetime
 
-auth_bp = Blueprint('auth', __name__)
+from app.models.models import db, User, Company
+from app.services.tokens import create_refresh_token, revoke_access_token, revoke_refresh_token, rotate_refresh_token
+from app.utils.auth import create_token, token_required
+from app.utils.rate_limit import rate_limit
 
-def token_required(f):
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        token = request.headers.get('Authorization')
-        if not token:
-            return jsonify({'message': 'Token is missing'}), 401
-        try:
-            token = token.split()[1]  # Remove 'Bearer ' prefix
-            data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=["HS256"])
-            current_user = User.query.get(data['user_id'])
-        except:
-            return jsonify({'message': 'Token is invalid'}), 401
-        return f(current_user, *args, **kwargs)
-    return decorated
+auth_bp = Blueprint('auth', __name__)
 
 @auth_bp.route('/register', methods=['POST'])
+@rate_limit(ip='5/minute')
 def register():
     data = request.get_json()
     
-    if not data or not data.get('email') or not data.get('password'):
-        return jsonify({'message': 'Missing required fields'}), 400
-    
+    # Check if user already exists
     if User.query.filter_by(email=data['email']).first():
-        return jsonify({'message': 'Email already registered'}), 400
+        return jsonify({'message': 'User already exists!'}), 409
     
-    user = User(email=data['email'])
-    user.set_password(data['password'])
+    # Create new user
+    new_user = User(
+        email=data['email'],
+        name=data['name'],
+        role='client_admin',  # Default role for new registrations
+        is_active=True
+    )
+    new_user.set_password(data['password'])
     
-    db.session.add(user)
+    # Save user to database
+    db.session.add(new_user)
+    db.session.flush()
+    refresh_token, _ = create_refresh_token(new_user.id)
     db.session.commit()
     
-    return jsonify({'message': 'User registered successfully'}), 201
+    # Create JWT token
+    token = create_token(new_user.id, new_user.role)
+    
+    return jsonify({
+        'message': 'User registered successfully!',
+        'token': token,
+        'refresh_token': refresh_token,
+        'user': new_user.to_dict()
+    }), 201
 
 @auth_bp.route('/login', methods=['POST'])
+@rate_limit(ip='20/minute', email='5/minute')
 def login():
     data = request.get_json()
-    
-    if not data or not data.get('email') or not data.get('password'):
-        return jsonify({'message': 'Missing required fields'}), 400
+    print(f"Login attempt for email: {data.get('email')}")
     
     user = User.query.filter_by(email=data['email']).first()
+    if not user:
+        print(f"User not found: {data.get('email')}")
+        return jsonify({'message': 'Invalid credentials!'}), 401
     
-    if not user or not user.check_password(data['password']):
-        return jsonify({'message': 'Invalid email or password'}), 401
+    # Verify password using bcrypt
+    try:
+        password_valid = user.check_password(data['password'])
+    except Exception as e:
+        print(f"Password verification error: {e}")
+        password_valid = False
     
-    token = jwt.encode({
-        'user_id': user.id,
-        'exp': datetime.datetime.utcnow() + datetime.timedelta(days=1)
-    }, current_app.config['SECRET_KEY'])
+    if not password_valid:
+        return jsonify({'message': 'Invalid credentials!'}), 401
+    
+    if not user.is_active:
+        return jsonify({'message': 'User is inactive!'}), 401
+    
+    # Update last login time
+    user.last_login = datetime.utcnow()
+    refresh_token, _ = create_refresh_token(user.id)
+    db.session.commit()
+
+    # Create JWT token
+    token = create_token(user.id, user.role)
+
+    user_data = {
+        'id': user.id,
+        'email': user.email,
+        'name': user.name,
+        'role': user.role,
+    }
+    
+    if user.company_id:
+        company = Company.query.get(user.company_id)
+        if company:
+            user_data['company'] = {
+                'id': company.id,
+                'name': company.name,
+            }
     
     return jsonify({
+        'message': 'Login successful!',
         'token': token,
-        'user': {
-            'id': user.id,
-            'email': user.email
-        }
+        'refresh_token': refresh_token,
+        'user': user_data
     })
 
 @auth_bp.route('/me', methods=['GET'])
 @token_required
-def get_user(current_user):
-    return jsonify({
+def get_me(current_user):
+    user_data = {
         'id': current_user.id,
-        'email': current_user.email
-    })
\ No newline at end of file
+        'email': current_user.email,
+        'name': current_user.name,
+        'role': current_user.role,
+    }
+    
+    if current_user.company_id:
+        company = Company.query.get(current_user.company_id)
+        if company:
+            user_data['company'] = {
+                'id': company.id,
+                'name': company.name,
+            }
+    
+    return jsonify({
+        'user': user_data
+    })
+
+@auth_bp.route('/refresh', methods=['POST'])
+@rate_limit(ip='60/minute')
+def refresh():
+    data = request.get_json(silent=True) or {}
+    if not data.get('refresh_token'):
+        return jsonify({'message': 'Refresh token is required!'}), 400
+    
+    try:
+        user, refresh_token = rotate_refresh_token(data['refresh_token'])
+    except ValueError as e:
+        # Keep any family revocation triggered by a reused token
+        db.session.commit()
+        print(f"Refresh refused: {e}")
+        return jsonify({'message': 'Invalid refresh token!'}), 401
+    db.session.commit()
+    
+    return jsonify({
+        'token': create_token(user.id, user.role),
+        'refresh_token': refresh_token
+    })
+
+@auth_bp.route('/logout', methods=['POST'])
+@token_required
+def logout(current_user):
+    data = request.get_json(silent=True) or {}
+    # Batched calls carry no token of their own
+    if g.get('token'):
+        revoke_access_token(g.token)
+    if data.get('refresh_token'):
+        revoke_refresh_token(data['refresh_token'])
+    db.session.commit()
+    
+    return jsonify({'message': 'Logged out successfully!'})
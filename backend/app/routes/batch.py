@@ -0,0 +1,124 @@
+from flask import Blueprint, request, jsonify, current_app
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.test import EnvironBuilder
+import base64
+
+from app.models.models import db
+from app.utils.auth import BATCH_USER_ENVIRON, token_required
+
+batch_bp = Blueprint('batch', __name__)
+
+BATCH_METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+# Reads have no side effects, so consecutive reads may run in any order
+READ_METHODS = ('GET',)
+
+# Response headers that describe the sub-response's own encoding, not its content
+SKIPPED_HEADERS = ('Content-Length', 'Content-Type', 'Content-Encoding', 'Vary')
+
+
+def batch_executor(app):
+    executor = app.extensions.get('batch_executor')
+    if executor is None:
+        executor = ThreadPoolExecutor(max_workers=app.config.get('BATCH_CONCURRENCY', 4), thread_name_prefix='batch')
+        app.extensions['batch_executor'] = executor
+    return executor
+
+
+def parse_sub_request(index, entry):
+    if not isinstance(entry, dict) or not isinstance(entry.get('path'), str):
+        return None, f'Request {index} needs a path!'
+    method = str(entry.get('method', 'GET')).upper()
+    path = entry['path']
+    if method not in BATCH_METHODS:
+        return None, f'Request {index} has an unsupported method!'
+    if not path.startswith('/api/') or path.split('?')[0].rstrip('/') == '/api/batch':
+        return None, f'Request {index} has an invalid path!'
+    return {'id': entry.get('id', index), 'method': method, 'path': path, 'body': entry.get('body')}, None
+
+
+def sub_request_environ(sub_request):
+    builder = EnvironBuilder(
+        path=sub_request['path'],
+        method=sub_request['method'],
+        json=sub_request['body'],
+        environ_overrides={'REMOTE_ADDR': request.remote_addr}
+    )
+    try:
+        return builder.get_environ()
+    finally:
+        builder.close()
+
+
+def render_sub_response(sub_request, response):
+    data = response.get_data()
+    if response.is_json:
+        body = response.get_json()
+    elif response.mimetype.startswith('text/'):
+        body = data.decode(response.charset, 'replace')
+    else:
+        body = base64.b64encode(data).decode('ascii')
+    result = {
+        'id': sub_request['id'],
+        'status': response.status_code,
+        'headers': {name: value for name, value in response.headers.items() if name not in SKIPPED_HEADERS},
+        'body': body
+    }
+    if not response.is_json and not response.mimetype.startswith('text/'):
+        result['body_encoding'] = 'base64'
+    return result
+
+
+def dispatch(app, user, sub_request, environ):
+    """Run one sub-request through the full request cycle in its own app context and session."""
+    with app.request_context(environ):
+        # Merging copies the loaded user into this thread's session without a query
+        request.environ[BATCH_USER_ENVIRON] = db.session.merge(user, load=False)
+        response = app.full_dispatch_request()
+        try:
+            return render_sub_response(sub_request, response)
+        finally:
+            response.close()
+
+
+@batch_bp.route('', methods=['POST'])
+@token_required
+def run_batch(current_user):
+    """Run several API calls for one token, e.g. everything a page needs on load.
+    
+    Sub-requests keep their order in the response. Runs of consecutive GETs
+    execute concurrently, each with its own pooled connection; any other
+    method waits for the requests before it and runs alone, so a write is
+    seen by the reads listed after it.
+    """
+    data = request.get_json(silent=True) or {}
+    entries = data.get('requests')
+    if not isinstance(entries, list) or not entries:
+        return jsonify({'message': 'Requests are required!'}), 400
+    if len(entries) > current_app.config.get('BATCH_MAX_REQUESTS', 20):
+        return jsonify({'message': 'Too many requests in batch!'}), 400
+    
+    sub_requests = []
+    for index, entry in enumerate(entries):
+        sub_request, error = parse_sub_request(index, entry)
+        if error:
+            return jsonify({'message': error}), 400
+        sub_requests.append(sub_request)
+    
+    app = current_app._get_current_object()
+    environs = [sub_request_environ(sub_request) for sub_request in sub_requests]
+    # Detach the user with its attributes loaded and hand this request's connection back to the pool
+    db.session.close()
+    
+    executor = batch_executor(app)
+    responses = []
+    pending = []
+    for sub_request, environ in zip(sub_requests, environs):
+        if sub_request['method'] not in READ_METHODS:
+            responses += [future.result() for future in pending]
+            pending = []
+            responses.append(executor.submit(dispatch, app, current_user, sub_request, environ).result())
+        else:
+            pending.append(executor.submit(dispatch, app, current_user, sub_request, environ))
+    responses += [future.result() for future in pending]
+    
+    return jsonify({'responses': responses})
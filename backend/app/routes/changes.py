@@ -0,0 +1,28 @@
+from flask import Blueprint, request, jsonify
+
+from app.services.changes import get_changes, head_cursor, decode_cursor
+from app.utils.auth import token_required
+
+changes_bp = Blueprint('changes', __name__)
+
+@changes_bp.route('', methods=['GET'])
+@token_required
+def get_change_feed(current_user):
+    since = request.args.get('since')
+    
+    # Without a cursor, hand out the current head; clients take it before their initial full load
+    if not since:
+        return jsonify({
+            'changes': [],
+            'cursor': head_cursor(),
+            'has_more': False
+        })
+    
+    try:
+        decode_cursor(since)
+    except ValueError:
+        return jsonify({'message': 'Invalid cursor!'}), 400
+    
+    limit = max(1, min(request.args.get('limit', 500, type=int), 1000))
+    
+    return jsonify(get_changes(current_user, since, limit))
@@ -0,0 +1,46 @@
+from flask import Blueprint, request, jsonify
+
+from app.models.models import db, Company
+from app.services.listings import companies_list
+from app.utils.auth import token_required
+from app.utils.policy import can, permission_required
+
+companies_bp = Blueprint('companies', __name__)
+
+@companies_bp.route('', methods=['GET'])
+@token_required
+def get_companies(current_user):
+    # Cross-company access sees all companies
+    if can(current_user, 'companies:view_all'):
+        companies = companies_list()
+    # Others can only see their own company
+    elif current_user.company_id:
+        companies = companies_list(current_user.company_id)
+    else:
+        companies = []
+    
+    return jsonify({
+        'companies': companies
+    })
+
+@companies_bp.route('', methods=['POST'])
+@token_required
+@permission_required('companies:create')
+def create_company(current_user):
+    data = request.get_json()
+    
+    # Create new company
+    new_company = Company(
+        name=data['name'],
+        address=data.get('address'),
+        is_active=True
+    )
+    
+    # Save company to database
+    db.session.add(new_company)
+    db.session.commit()
+    
+    return jsonify({
+        'message': 'Company created successfully!',
+        'company': new_company.to_dict()
+    }), 201
@@ -0,0 +1,16 @@
+from flask import Blueprint, request, jsonify
+
+from app.services.deadlines import upcoming_deadlines
+from app.utils.auth import token_required
+
+deadlines_bp = Blueprint('deadlines', __name__)
+
+@deadlines_bp.route('/me', methods=['GET'])
+@token_required
+def get_my_deadlines(current_user):
+    days = max(0, min(request.args.get('days', 14, type=int), 365))
+    limit = max(1, min(request.args.get('limit', 100, type=int), 500))
+    
+    return jsonify({
+        'deadlines': upcoming_deadlines(current_user, days=days, limit=limit)
+    })
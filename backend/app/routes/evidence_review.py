@@ -0,0 +1,39 @@
+from flask import Blueprint, request, jsonify
+
+from app.models.models import db
+from app.services.evidence_review import REVIEW_TARGETS, review_uploads
+from app.utils.auth import token_required
+
+evidence_review_bp = Blueprint('evidence_review', __name__)
+
+MAX_REVIEW_BATCH = 1000
+
+@evidence_review_bp.route('/<kind>', methods=['POST'])
+@token_required
+def review_batch(current_user, kind):
+    if kind not in REVIEW_TARGETS:
+        return jsonify({'message': 'Unknown evidence type!'}), 404
+    
+    data = request.get_json() or {}
+    items = data.get('reviews') or []
+    if not items:
+        return jsonify({'message': 'No reviews given!'}), 400
+    if len(items) > MAX_REVIEW_BATCH:
+        return jsonify({'message': f'At most {MAX_REVIEW_BATCH} reviews per request!'}), 400
+    
+    try:
+        result = review_uploads(
+            kind, items, current_user,
+            ip_address=request.remote_addr,
+            user_agent=request.headers.get('User-Agent')
+        )
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 400
+    
+    db.session.commit()
+    
+    return jsonify({
+        'message': f"Reviewed {len(result['reviewed'])} item(s)!",
+        **result
+    })
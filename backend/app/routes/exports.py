@@ -0,0 +1,75 @@
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+
+from app.models.models import Project
+from app.services.exports import (
+    ACTION_ITEM_COLUMNS, SCAN_RESULT_COLUMNS, select_columns,
+    action_items_query, scan_results_query, stream_csv, stream_xlsx
+)
+from app.utils.auth import token_required, can_access_project
+from app.utils.rate_limit import rate_limit
+
+exports_bp = Blueprint('exports', __name__)
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def export_response(filename, names, rows):
+    export_format = request.args.get('format', 'csv')
+    
+    if export_format == 'xlsx':
+        try:
+            import xlsxwriter  # noqa: F401
+        except ImportError:
+            return jsonify({'message': 'XLSX export is not available!'}), 501
+        body, mimetype = stream_xlsx(names, rows), XLSX_MIMETYPE
+    elif export_format == 'csv':
+        body, mimetype = stream_csv(names, rows), 'text/csv'
+    else:
+        return jsonify({'message': 'Unsupported export format!'}), 400
+    
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}.{export_format}'}
+    )
+
+
+def get_export_project(current_user, project_id):
+    project = Project.query.get(project_id)
+    if not project:
+        return None, (jsonify({'message': 'Project not found!'}), 404)
+    if not can_access_project(current_user, project, 'project:export'):
+        return None, (jsonify({'message': 'Unauthorized!'}), 403)
+    return project, None
+
+@exports_bp.route('/projects/<int:project_id>/action-items', methods=['GET'])
+@token_required
+@rate_limit(name='exports', tenant='120/hour')
+def export_action_items(current_user, project_id):
+    project, error = get_export_project(current_user, project_id)
+    if error:
+        return error
+    
+    try:
+        names, columns = select_columns(ACTION_ITEM_COLUMNS, request.args.get('columns'))
+        rows = action_items_query(project.id, columns, request.args)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    return export_response(f'project-{project.id}-action-items', names, rows)
+
+@exports_bp.route('/projects/<int:project_id>/scan-results', methods=['GET'])
+@token_required
+@rate_limit(name='exports', tenant='120/hour')
+def export_scan_results(current_user, project_id):
+    project, error = get_export_project(current_user, project_id)
+    if error:
+        return error
+    
+    try:
+        names, columns = select_columns(SCAN_RESULT_COLUMNS, request.args.get('columns'))
+        rows = scan_results_query(project.id, columns, request.args)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    return export_response(f'project-{project.id}-scan-results', names, rows)
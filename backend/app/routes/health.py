@@ -0,0 +1,27 @@
+from flask import Blueprint, jsonify, current_app
+import os
+
+from app.services import result_cache
+from app.services.tokens import denylist
+from app.utils.rate_limit import shed_exempt
+
+health_bp = Blueprint('health', __name__)
+
+# Basic routes
+@health_bp.route('/')
+@shed_exempt
+def index():
+    return jsonify({'message': 'Welcome to Compliance Pro API!'})
+
+@health_bp.route('/api/health', methods=['GET'])
+@shed_exempt
+def health():
+    limiter = current_app.extensions.get('load_shedder')
+    return jsonify({
+        'status': 'ok',
+        'pid': os.getpid(),
+        'startup': current_app.config.get('STARTUP_TIMINGS'),
+        'load': limiter.stats() if limiter else None,
+        'result_cache': result_cache.metrics.snapshot(),
+        'revocations': denylist.snapshot()
+    })
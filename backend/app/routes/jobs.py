@@ -0,0 +1,41 @@
+from flask import Blueprint, request, jsonify
+
+from app.models.models import Job
+from app.utils.auth import token_required
+from app.utils.policy import can
+
+jobs_bp = Blueprint('jobs', __name__)
+
+@jobs_bp.route('', methods=['GET'])
+@token_required
+def get_jobs(current_user):
+    # Super admin can see all jobs, others only the ones they started
+    query = Job.query
+    if not can(current_user, 'jobs:view_all'):
+        query = query.filter_by(created_by=current_user.id)
+    
+    if request.args.get('status'):
+        query = query.filter_by(status=request.args['status'])
+    if request.args.get('queue'):
+        query = query.filter_by(queue=request.args['queue'])
+    
+    limit = min(request.args.get('limit', 50, type=int), 200)
+    jobs = query.order_by(Job.id.desc()).limit(limit).all()
+    
+    return jsonify({
+        'jobs': [job.to_dict() for job in jobs]
+    })
+
+@jobs_bp.route('/<int:job_id>', methods=['GET'])
+@token_required
+def get_job(current_user, job_id):
+    job = Job.query.get(job_id)
+    if not job:
+        return jsonify({'message': 'Job not found!'}), 404
+    
+    if not can(current_user, 'jobs:view_all') and job.created_by != current_user.id:
+        return jsonify({'message': 'Unauthorized!'}), 403
+    
+    return jsonify({
+        'job': job.to_dict()
+    })
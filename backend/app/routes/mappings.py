@@ -0,0 +1,53 @@
+from flask import Blueprint, request, jsonify
+
+from app.models.models import EvidenceItem
+from app.services.mapping_index import get_mapping_index
+from app.utils.auth import token_required
+
+mappings_bp = Blueprint('mappings', __name__)
+
+
+def parse_ids(value):
+    return [int(item) for item in value.split(',') if item.strip()] if value else []
+
+@mappings_bp.route('/evidence/<int:evidence_id>/coverage', methods=['GET'])
+@token_required
+def get_evidence_coverage(current_user, evidence_id):
+    try:
+        standard_ids = parse_ids(request.args.get('standards'))
+    except ValueError:
+        return jsonify({'message': 'Invalid standard ids!'}), 400
+    
+    index = get_mapping_index()
+    
+    return jsonify({
+        'evidence_id': evidence_id,
+        'coverage': index.coverage(evidence_id, standard_ids or None)
+    })
+
+@mappings_bp.route('/overlap', methods=['GET'])
+@token_required
+def get_standards_overlap(current_user):
+    try:
+        standard_ids = parse_ids(request.args.get('standards'))
+    except ValueError:
+        return jsonify({'message': 'Invalid standard ids!'}), 400
+    
+    if len(standard_ids) < 2:
+        return jsonify({'message': 'At least two standards are required!'}), 400
+    
+    shared = get_mapping_index().overlap(standard_ids)
+    
+    # Names for the shared evidence items in one query
+    if shared:
+        names = dict(EvidenceItem.query.with_entities(EvidenceItem.id, EvidenceItem.name).filter(
+            EvidenceItem.id.in_([item['evidence_id'] for item in shared])
+        ).all())
+        for item in shared:
+            item['name'] = names.get(item['evidence_id'])
+    
+    return jsonify({
+        'standard_ids': standard_ids,
+        'shared_evidence_count': len(shared),
+        'shared_evidence': shared
+    })
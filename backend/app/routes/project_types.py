@@ -0,0 +1,54 @@
+from flask import Blueprint, request, jsonify
+from sqlalchemy.exc import IntegrityError
+
+from app.models.models import db, ProjectType, ProjectTypeTemplate
+from app.services.project_templates import save_template
+from app.utils.auth import token_required
+from app.utils.policy import permission_required
+
+project_types_bp = Blueprint('project_types', __name__)
+
+@project_types_bp.route('/<int:project_type_id>/template', methods=['GET'])
+@token_required
+def get_project_type_template(current_user, project_type_id):
+    project_type = ProjectType.query.get(project_type_id)
+    if not project_type:
+        return jsonify({'message': 'Project type not found!'}), 404
+    
+    version = request.args.get('version', project_type.template_version, type=int)
+    template = ProjectTypeTemplate.query.filter_by(project_type_id=project_type.id, version=version).first() if version else None
+    
+    return jsonify({
+        'project_type': project_type.to_dict(),
+        'template': template.to_dict() if template else None
+    })
+
+@project_types_bp.route('/<int:project_type_id>/template', methods=['PUT'])
+@token_required
+@permission_required('project_types:edit')
+def save_project_type_template(current_user, project_type_id):
+    project_type = ProjectType.query.get(project_type_id)
+    if not project_type:
+        return jsonify({'message': 'Project type not found!'}), 404
+    
+    data = request.get_json() or {}
+    definition = {
+        'associatedStandards': data.get('associatedStandards') or [],
+        'requiredEvidence': data.get('requiredEvidence') or [],
+        'workflowSteps': data.get('workflowSteps') or []
+    }
+    
+    try:
+        template = save_template(project_type, definition, created_by=current_user.id)
+        db.session.commit()
+    except (ValueError, TypeError) as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 400
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'message': 'Template was changed concurrently, please retry!'}), 409
+    
+    return jsonify({
+        'message': 'Template saved successfully!',
+        'template': template.to_dict()
+    }), 201
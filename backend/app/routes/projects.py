@@ -0,0 +1,182 @@
+from flask import Blueprint, request, jsonify
+from datetime import datetime
+
+from app.models.models import db, Project, ProjectUser
+from app.services.provisioning import provision_project
+from app.services.project_templates import get_project_type_plan
+from app.services.jobs import enqueue
+from app.services.exports import select_columns
+from app.services.listings import PROJECT_COLUMNS, projects_query
+from app.utils.archived_projects import archive_safe
+from app.utils.auth import token_required, can_access_project
+from app.utils.policy import can, permission_required, get_principal
+from app.utils.responses import list_response
+
+projects_bp = Blueprint('projects', __name__)
+
+@projects_bp.route('', methods=['GET'])
+@token_required
+def get_projects(current_user):
+    # Projects the user can reach, from the cached principal
+    criterion = get_principal(current_user).project_filter(Project.id)
+    
+    try:
+        names, columns = select_columns(PROJECT_COLUMNS, request.args.get('columns'))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    def objects():
+        query = Project.query if criterion is None else Project.query.filter(criterion)
+        return [project.to_dict(include_company=True, include_project_type=True) for project in query.all()]
+    
+    return list_response('projects', names, projects_query(columns, criterion), objects)
+
+@projects_bp.route('', methods=['POST'])
+@token_required
+@permission_required('projects:create')
+def create_project(current_user):
+    data = request.get_json()
+    
+    # Without cross-company access, projects can only be created for their company
+    if not can(current_user, 'companies:assign') and (
+        'company_id' not in data or data['company_id'] != current_user.company_id
+    ):
+        company_id = current_user.company_id
+    else:
+        company_id = data.get('company_id')
+    
+    # Standards whose requirements make up the SOA and evidence checklist
+    standard_ids = list(data.get('compliance_standard_ids') or [])
+    if data.get('compliance_standard_id'):
+        standard_ids.append(data['compliance_standard_id'])
+    
+    # The project type's current template adds its standards, evidence and milestones
+    template_version, plan = get_project_type_plan(data['project_type_id'])
+    try:
+        start_date = datetime.strptime(data['start_date'], '%Y-%m-%d').date() if data.get('start_date') else None
+    except ValueError:
+        return jsonify({'message': 'start_date must be YYYY-MM-DD!'}), 400
+    
+    # Create new project
+    new_project = Project(
+        name=data['name'],
+        company_id=company_id,
+        project_type_id=data['project_type_id'],
+        status='in_progress',
+        created_by=current_user.id
+    )
+    
+    try:
+        # Flush to get the project id without committing yet
+        db.session.add(new_project)
+        db.session.flush()
+        
+        # If project owner is specified, assign them to the project
+        if 'project_owner_id' in data:
+            project_user = ProjectUser(
+                project_id=new_project.id,
+                user_id=data['project_owner_id'],
+                role='project_owner'
+            )
+            db.session.add(project_user)
+        
+        # Generate SOA and evidence checklist in the same transaction,
+        # or hand it to a worker for very large standards
+        provisioning = None
+        job = None
+        if data.get('async_provisioning') and (standard_ids or plan):
+            job = enqueue('provision_project', {
+                'project_id': new_project.id,
+                'standard_ids': standard_ids,
+                'project_type_id': new_project.project_type_id,
+                'template_version': template_version,
+                'start_date': start_date.isoformat() if start_date else None,
+                'created_by': current_user.id
+            }, queue='provisioning', created_by=current_user.id)
+        else:
+            provisioning = provision_project(
+                new_project.id, standard_ids, created_by=current_user.id, plan=plan, start_date=start_date
+            )
+        
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Project creation error: {e}")
+        return jsonify({'message': 'Could not create project!'}), 500
+    
+    return jsonify({
+        'message': 'Project created successfully!',
+        'project': new_project.to_dict(),
+        'provisioning': provisioning,
+        'job': job.to_dict() if job else None
+    }), 201
+
+@projects_bp.route('/<int:project_id>', methods=['PUT'])
+@token_required
+def update_project(current_user, project_id):
+    project = Project.query.get(project_id)
+    if not project:
+        return jsonify({'message': 'Project not found!'}), 404
+    if not can_access_project(current_user, project, 'project:edit'):
+        return jsonify({'message': 'Unauthorized!'}), 403
+    
+    data = request.get_json() or {}
+    # Archiving is its own operation, not a status a client can set
+    if data.get('status') == Project.ARCHIVED_STATUS:
+        return jsonify({'message': 'Use the archive endpoint to archive a project!'}), 400
+    
+    if 'name' in data:
+        project.name = data['name']
+    if 'status' in data:
+        project.status = data['status']
+    db.session.commit()
+    
+    return jsonify({
+        'message': 'Project updated successfully!',
+        'project': project.to_dict()
+    })
+
+@projects_bp.route('/<int:project_id>/archive', methods=['POST'])
+@archive_safe
+@token_required
+@permission_required('projects:archive')
+def archive_project(current_user, project_id):
+    project = Project.query.get(project_id)
+    if not project:
+        return jsonify({'message': 'Project not found!'}), 404
+    if not can_access_project(current_user, project):
+        return jsonify({'message': 'Unauthorized!'}), 403
+    if project.status == Project.ARCHIVED_STATUS:
+        return jsonify({'message': 'Project is already archived!'}), 409
+    if project.status not in Project.CLOSED_STATUSES:
+        return jsonify({'message': 'Only closed projects can be archived!'}), 400
+    
+    # Moving the project's rows can take a while, so a worker does it
+    job = enqueue('archive_project', {'project_id': project.id}, created_by=current_user.id)
+    db.session.commit()
+    
+    return jsonify({
+        'message': 'Project archiving started!',
+        'job': job.to_dict()
+    }), 202
+
+@projects_bp.route('/<int:project_id>/restore', methods=['POST'])
+@archive_safe
+@token_required
+@permission_required('projects:archive')
+def restore_project(current_user, project_id):
+    project = Project.query.get(project_id)
+    if not project:
+        return jsonify({'message': 'Project not found!'}), 404
+    if not can_access_project(current_user, project):
+        return jsonify({'message': 'Unauthorized!'}), 403
+    if project.status != Project.ARCHIVED_STATUS:
+        return jsonify({'message': 'Project is not archived!'}), 409
+    
+    job = enqueue('restore_project', {'project_id': project.id}, created_by=current_user.id)
+    db.session.commit()
+    
+    return jsonify({
+        'message': 'Project restore started!',
+        'job': job.to_dict()
+    }), 202
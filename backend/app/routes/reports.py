@@ -0,0 +1,64 @@
+from flask import Blueprint, request, jsonify, send_file
+import os
+
+from app.models.models import db, Project, Job
+from app.services.jobs import enqueue
+from app.utils.archived_projects import archive_safe
+from app.utils.auth import token_required, can_access_project
+from app.utils.rate_limit import rate_limit
+
+reports_bp = Blueprint('reports', __name__)
+
+@reports_bp.route('/projects/<int:project_id>', methods=['POST'])
+@archive_safe
+@token_required
+@rate_limit(tenant='30/hour')
+def generate_project_report(current_user, project_id):
+    project = Project.query.get(project_id)
+    if not project:
+        return jsonify({'message': 'Project not found!'}), 404
+    
+    if not can_access_project(current_user, project, 'project:report'):
+        return jsonify({'message': 'Unauthorized!'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    
+    # Rendering runs on the reports queue; poll /api/jobs/<id> for progress
+    job = enqueue('render_project_report', {
+        'project_id': project.id,
+        'pdf': data.get('pdf', True)
+    }, queue='reports', created_by=current_user.id)
+    db.session.commit()
+    
+    return jsonify({
+        'message': 'Report generation started!',
+        'job': job.to_dict()
+    }), 202
+
+@reports_bp.route('/<int:job_id>/download', methods=['GET'])
+@token_required
+def download_report(current_user, job_id):
+    job = Job.query.get(job_id)
+    if not job or job.job_type != 'render_project_report':
+        return jsonify({'message': 'Report not found!'}), 404
+    
+    project = Project.query.get(job.payload.get('project_id'))
+    if not project or not can_access_project(current_user, project, 'project:report'):
+        return jsonify({'message': 'Unauthorized!'}), 403
+    
+    if job.status != 'completed':
+        return jsonify({'message': 'Report is not ready yet!', 'job': job.to_dict()}), 409
+    
+    report_format = request.args.get('format', 'html')
+    if report_format not in ('html', 'pdf'):
+        return jsonify({'message': 'Unsupported report format!'}), 400
+    
+    path = (job.result or {}).get(f'{report_format}_path')
+    if not path or not os.path.exists(path):
+        return jsonify({'message': f'{report_format.upper()} report is not available!'}), 404
+    
+    return send_file(
+        path,
+        as_attachment=True,
+        download_name=f'{project.name}-report.{report_format}'
+    )
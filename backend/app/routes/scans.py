@@ -0,0 +1,97 @@
+from flask import Blueprint, request, jsonify
+from werkzeug.utils import secure_filename
+from datetime import datetime
+import os
+
+from app.models.models import db, Project
+from app.services.jobs import enqueue
+from app.services.exports import SCAN_RESULT_COLUMNS, select_columns, scan_results_query
+from app.utils.auth import token_required, can_access_project
+from app.utils.rate_limit import rate_limit
+from app.utils.responses import list_response
+
+scans_bp = Blueprint('scans', __name__)
+
+SCAN_FILE_FORMATS = ('csv', 'jsonl')
+
+@scans_bp.route('/projects/<int:project_id>/reconcile', methods=['POST'])
+@token_required
+@rate_limit(tenant='60/hour')
+def reconcile_project_scan(current_user, project_id):
+    project = Project.query.get(project_id)
+    if not project:
+        return jsonify({'message': 'Project not found!'}), 404
+    if not can_access_project(current_user, project, 'scan:import'):
+        return jsonify({'message': 'Unauthorized!'}), 403
+    
+    # Small scans come as JSON, large ones as a CSV or JSON-lines file handled by a worker
+    upload = request.files.get('file')
+    data = request.form if upload else (request.get_json() or {})
+    
+    try:
+        scan_date = datetime.fromisoformat(data['scan_date']) if data.get('scan_date') else datetime.utcnow()
+    except ValueError:
+        return jsonify({'message': 'scan_date must be ISO 8601!'}), 400
+    
+    scope_ids = data.get('scope_ids')
+    if isinstance(scope_ids, str):
+        scope_ids = [int(scope_id) for scope_id in scope_ids.split(',') if scope_id]
+    
+    if upload:
+        file_format = data.get('format', 'jsonl')
+        if file_format not in SCAN_FILE_FORMATS:
+            return jsonify({'message': 'Unsupported scan file format!'}), 400
+        
+        # Only the upload directory is needed here; the engine itself runs in the worker
+        from app.services.scans import SCAN_UPLOAD_DIR
+        os.makedirs(SCAN_UPLOAD_DIR, exist_ok=True)
+        path = os.path.join(
+            SCAN_UPLOAD_DIR,
+            f"{datetime.utcnow().strftime('%Y%m%d%H%M%S%f')}-{secure_filename(upload.filename or 'scan')}"
+        )
+        upload.save(path)
+        
+        job = enqueue('reconcile_scan', {
+            'project_id': project_id,
+            'path': path,
+            'format': file_format,
+            'scope_ids': scope_ids,
+            'scan_date': scan_date.isoformat(),
+            'created_by': current_user.id
+        }, created_by=current_user.id)
+        db.session.commit()
+        
+        return jsonify({
+            'message': 'Scan reconciliation started!',
+            'job': job.to_dict()
+        }), 202
+    
+    # The reconciliation engine loads on first use, not at start-up
+    from app.services.scans import reconcile_scan
+    
+    findings = data.get('findings') or []
+    result = reconcile_scan(project_id, findings, scope_ids=scope_ids, scan_date=scan_date, created_by=current_user.id)
+    db.session.commit()
+    
+    return jsonify({
+        'message': 'Scan reconciled successfully!',
+        'reconciliation': result
+    })
+
+@scans_bp.route('/projects/<int:project_id>/results', methods=['GET'])
+@token_required
+def list_scan_results(current_user, project_id):
+    project = Project.query.get(project_id)
+    if not project:
+        return jsonify({'message': 'Project not found!'}), 404
+    if not can_access_project(current_user, project):
+        return jsonify({'message': 'Unauthorized!'}), 403
+    
+    # Same columns and filters as the export, streamed from a server-side cursor
+    try:
+        names, columns = select_columns(SCAN_RESULT_COLUMNS, request.args.get('columns'))
+        rows = scan_results_query(project.id, columns, request.args)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    return list_response('scan_results', names, rows)
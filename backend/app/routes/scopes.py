@@ -0,0 +1,122 @@
+from flask import Blueprint, request, jsonify
+
+from app.models.models import db, Project, TestingScope
+from app.services.scopes import get_scope_index, check_scope_value
+from app.utils.auth import token_required, can_access_project
+
+scopes_bp = Blueprint('scopes', __name__)
+
+
+def get_scope_project(current_user, project_id, action='project:view'):
+    project = Project.query.get(project_id)
+    if not project:
+        return None, (jsonify({'message': 'Project not found!'}), 404)
+    if not can_access_project(current_user, project, action):
+        return None, (jsonify({'message': 'Unauthorized!'}), 403)
+    return project, None
+
+@scopes_bp.route('/projects/<int:project_id>', methods=['GET'])
+@token_required
+def get_scopes(current_user, project_id):
+    project, error = get_scope_project(current_user, project_id)
+    if error:
+        return error
+    
+    scopes = TestingScope.query.filter_by(project_id=project_id).order_by(TestingScope.id).all()
+    
+    return jsonify({
+        'scopes': [scope.to_dict(include_entries=True) for scope in scopes]
+    })
+
+@scopes_bp.route('/projects/<int:project_id>', methods=['POST'])
+@token_required
+def create_scope(current_user, project_id):
+    project, error = get_scope_project(current_user, project_id, 'scan:import')
+    if error:
+        return error
+    
+    data = request.get_json() or {}
+    try:
+        entries, overlaps = check_scope_value(project_id, data.get('scope_value'))
+    except ValueError as e:
+        return jsonify({'message': f'{e}!'}), 400
+    
+    # Exact duplicates of an existing scope need an explicit override
+    if any(overlap['duplicate'] for overlap in overlaps) and not data.get('allow_duplicates'):
+        return jsonify({
+            'message': 'Scope duplicates an existing scope!',
+            'overlaps': overlaps
+        }), 409
+    
+    scope = TestingScope(
+        project_id=project_id,
+        scope_type=data.get('scope_type'),
+        scope_value=data['scope_value'],
+        created_by=current_user.id
+    )
+    db.session.add(scope)
+    db.session.commit()
+    
+    return jsonify({
+        'message': 'Scope created successfully!',
+        'scope': scope.to_dict(include_entries=True),
+        'overlaps': overlaps
+    }), 201
+
+@scopes_bp.route('/<int:scope_id>', methods=['PUT'])
+@token_required
+def update_scope(current_user, scope_id):
+    scope = TestingScope.query.get(scope_id)
+    if not scope:
+        return jsonify({'message': 'Scope not found!'}), 404
+    project, error = get_scope_project(current_user, scope.project_id, 'scan:import')
+    if error:
+        return error
+    
+    data = request.get_json() or {}
+    overlaps = []
+    if 'scope_value' in data:
+        try:
+            entries, overlaps = check_scope_value(scope.project_id, data['scope_value'], exclude_scope_id=scope.id)
+        except ValueError as e:
+            return jsonify({'message': f'{e}!'}), 400
+        if any(overlap['duplicate'] for overlap in overlaps) and not data.get('allow_duplicates'):
+            return jsonify({
+                'message': 'Scope duplicates an existing scope!',
+                'overlaps': overlaps
+            }), 409
+        scope.scope_value = data['scope_value']
+    if 'scope_type' in data:
+        scope.scope_type = data['scope_type']
+    
+    db.session.commit()
+    
+    return jsonify({
+        'message': 'Scope updated successfully!',
+        'scope': scope.to_dict(include_entries=True),
+        'overlaps': overlaps
+    })
+
+@scopes_bp.route('/projects/<int:project_id>/overlaps', methods=['GET'])
+@token_required
+def get_scope_overlaps(current_user, project_id):
+    project, error = get_scope_project(current_user, project_id)
+    if error:
+        return error
+    
+    return jsonify({
+        'overlaps': get_scope_index(project_id).overlaps()
+    })
+
+@scopes_bp.route('/projects/<int:project_id>/resolve', methods=['GET'])
+@token_required
+def resolve_targets(current_user, project_id):
+    project, error = get_scope_project(current_user, project_id)
+    if error:
+        return error
+    
+    # ?target=10.0.0.5&target=https://app.example.com
+    index = get_scope_index(project_id)
+    return jsonify({
+        'scopes': {target: index.resolve(target) for target in request.args.getlist('target')}
+    })
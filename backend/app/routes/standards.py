@@ -0,0 +1,80 @@
+from flask import Blueprint, request, jsonify
+from sqlalchemy.exc import IntegrityError
+from werkzeug.utils import secure_filename
+from datetime import datetime
+import os
+
+from app.models.models import db, ComplianceStandard
+from app.services.jobs import enqueue
+from app.services.listings import standards_list
+from app.utils.auth import token_required
+from app.utils.policy import permission_required
+
+standards_bp = Blueprint('standards', __name__)
+
+@standards_bp.route('', methods=['GET'])
+@token_required
+def get_standards(current_user):
+    return jsonify({
+        'standards': standards_list()
+    })
+
+@standards_bp.route('/import', methods=['POST'])
+@token_required
+@permission_required('standards:import')
+def import_standard(current_user):
+    # Catalog parsers load on first import, not at start-up
+    from app.services.standard_import import IMPORT_FORMATS, IMPORT_UPLOAD_DIR, import_standard_file, remove_upload
+    
+    upload = request.files.get('file')
+    import_format = request.form.get('format', 'json')
+    if not upload:
+        return jsonify({'message': 'Catalog file is required!'}), 400
+    if import_format not in IMPORT_FORMATS:
+        return jsonify({'message': 'Unsupported import format!'}), 400
+    
+    os.makedirs(IMPORT_UPLOAD_DIR, exist_ok=True)
+    path = os.path.join(
+        IMPORT_UPLOAD_DIR,
+        f"{datetime.utcnow().strftime('%Y%m%d%H%M%S%f')}-{secure_filename(upload.filename or 'catalog')}"
+    )
+    upload.save(path)
+    
+    standard = {
+        'code': request.form.get('code'),
+        'name': request.form.get('name'),
+        'version': request.form.get('version'),
+        'description': request.form.get('description')
+    }
+    
+    # Large catalogs can be loaded by a worker instead
+    if request.form.get('async') in ('1', 'true'):
+        job = enqueue('import_standard', {
+            'path': path,
+            'format': import_format,
+            'standard': standard,
+            'created_by': current_user.id
+        }, created_by=current_user.id, max_attempts=1)
+        db.session.commit()
+        return jsonify({
+            'message': 'Standard import started!',
+            'job': job.to_dict()
+        }), 202
+    
+    try:
+        result = import_standard_file(path, import_format, standard, created_by=current_user.id)
+        db.session.commit()
+    except (ValueError, KeyError) as e:
+        db.session.rollback()
+        return jsonify({'message': f'Invalid catalog: {e}'}), 400
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'message': 'Catalog conflicts with existing requirements!'}), 400
+    finally:
+        remove_upload(path)
+    
+    return jsonify({
+        'message': 'Standard imported successfully!',
+        'import': result,
+        'standard': ComplianceStandard.query.get(result['standard_id']).to_dict()
+    })
@@ -0,0 +1,132 @@
+from flask import Blueprint, request, jsonify
+from datetime import datetime
+
+from app.models.models import db, SupportTicket
+from app.services.tickets import (
+    TICKET_STATUSES, TICKET_PRIORITIES, list_tickets, ticket_summary, visible_tickets,
+    save_attachments, remove_attachments, create_ticket, rebuild_ticket_counters
+)
+from app.utils.auth import token_required
+from app.utils.policy import can, permission_required
+
+tickets_bp = Blueprint('tickets', __name__)
+
+
+def split_arg(name):
+    value = request.args.get(name)
+    return [item for item in value.split(',') if item] if value else None
+
+@tickets_bp.route('', methods=['GET'])
+@token_required
+def get_tickets(current_user):
+    limit = max(1, min(request.args.get('limit', 50, type=int), 200))
+    assigned_to = request.args.get('assigned_to')
+    if assigned_to == 'me':
+        assigned_to = current_user.id
+    
+    try:
+        tickets, next_cursor = list_tickets(
+            current_user,
+            status=split_arg('status'),
+            priority=split_arg('priority'),
+            assigned_to=int(assigned_to) if assigned_to else None,
+            category=request.args.get('category'),
+            after=request.args.get('after'),
+            limit=limit
+        )
+    except ValueError:
+        return jsonify({'message': 'Invalid cursor or filter!'}), 400
+    
+    return jsonify({
+        'tickets': [ticket.to_dict() for ticket in tickets],
+        'next_cursor': next_cursor
+    })
+
+@tickets_bp.route('/summary', methods=['GET'])
+@token_required
+def get_ticket_summary(current_user):
+    return jsonify(ticket_summary(current_user))
+
+@tickets_bp.route('', methods=['POST'])
+@token_required
+def create_support_ticket(current_user):
+    # Accept JSON, or multipart form data when files are attached
+    data = request.get_json(silent=True) or request.form.to_dict()
+    if not data.get('issue_category') or not data.get('issue_description'):
+        return jsonify({'message': 'Issue category and description are required!'}), 400
+    if data.get('priority') and data['priority'] not in TICKET_PRIORITIES:
+        return jsonify({'message': 'Invalid priority!'}), 400
+    
+    saved = save_attachments(request.files.getlist('attachments'))
+    try:
+        # Ticket, its number and its attachments land in one commit
+        ticket = create_ticket(current_user, data, saved)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        remove_attachments(saved)
+        print(f"Ticket creation error: {e}")
+        return jsonify({'message': 'Could not create ticket!'}), 500
+    
+    return jsonify({
+        'message': 'Ticket created successfully!',
+        'ticket': ticket.to_dict(include_attachments=True)
+    }), 201
+
+@tickets_bp.route('/<int:ticket_id>', methods=['GET'])
+@token_required
+def get_ticket(current_user, ticket_id):
+    ticket = visible_tickets(current_user).filter(SupportTicket.id == ticket_id).first()
+    if not ticket:
+        return jsonify({'message': 'Ticket not found!'}), 404
+    
+    return jsonify({
+        'ticket': ticket.to_dict(include_attachments=True)
+    })
+
+@tickets_bp.route('/<int:ticket_id>', methods=['PUT'])
+@token_required
+def update_ticket(current_user, ticket_id):
+    ticket = visible_tickets(current_user).filter(SupportTicket.id == ticket_id).first()
+    if not ticket:
+        return jsonify({'message': 'Ticket not found!'}), 404
+    
+    # Only support staff and the assignee work a ticket
+    if not can(current_user, 'tickets:manage') and ticket.assigned_to != current_user.id:
+        return jsonify({'message': 'Unauthorized!'}), 403
+    
+    data = request.get_json()
+    if 'status' in data and data['status'] not in TICKET_STATUSES:
+        return jsonify({'message': 'Invalid status!'}), 400
+    if 'priority' in data and data['priority'] not in TICKET_PRIORITIES:
+        return jsonify({'message': 'Invalid priority!'}), 400
+    if 'assigned_to' in data and not can(current_user, 'tickets:manage'):
+        return jsonify({'message': 'Unauthorized!'}), 403
+    
+    for field in ('status', 'priority', 'assigned_to', 'resolution_details'):
+        if field in data:
+            setattr(ticket, field, data[field])
+    
+    if ticket.status in SupportTicket.RESOLVED_STATUSES and not ticket.resolution_date:
+        ticket.resolution_date = datetime.utcnow()
+    elif ticket.status not in SupportTicket.RESOLVED_STATUSES:
+        ticket.resolution_date = None
+    
+    db.session.commit()
+    
+    return jsonify({
+        'message': 'Ticket updated successfully!',
+        'ticket': ticket.to_dict()
+    })
+
+@tickets_bp.route('/counters/rebuild', methods=['POST'])
+@token_required
+@permission_required('tickets:rebuild_counters')
+def rebuild_counters(current_user):
+    rows = rebuild_ticket_counters()
+    db.session.commit()
+    
+    return jsonify({
+        'message': 'Ticket counters rebuilt!',
+        'rows': rows
+    })
@@ -0,0 +1,51 @@
+from flask import Blueprint, jsonify, send_file
+import os
+
+from app.models.models import SupportTicket, TicketAttachment, UploadMetadata
+from app.services.evidence_review import REVIEW_TARGETS
+from app.services.tickets import visible_tickets
+from app.services.upload_queue import UPLOAD_KINDS
+from app.utils.auth import token_required
+from app.utils.policy import can_project
+
+uploads_bp = Blueprint('uploads', __name__)
+
+
+def can_view_upload(user, kind, upload_id):
+    # Evidence follows its project's access rules, attachments their ticket's
+    if kind == 'ticket_attachment':
+        return visible_tickets(user).join(
+            TicketAttachment, TicketAttachment.ticket_id == SupportTicket.id
+        ).filter(TicketAttachment.id == upload_id).first() is not None
+    
+    model, parent_column, parent_model = REVIEW_TARGETS[kind]
+    project_id = parent_model.query.with_entities(parent_model.project_id).join(
+        model, parent_column == parent_model.id
+    ).filter(model.id == upload_id).scalar()
+    return project_id is not None and can_project(user, project_id)
+
+
+def find_metadata(current_user, kind, upload_id):
+    if kind not in UPLOAD_KINDS or not can_view_upload(current_user, kind, upload_id):
+        return None
+    return UploadMetadata.query.filter_by(upload_kind=kind, upload_id=upload_id).first()
+
+@uploads_bp.route('/<kind>/<int:upload_id>/metadata', methods=['GET'])
+@token_required
+def get_upload_metadata(current_user, kind, upload_id):
+    metadata = find_metadata(current_user, kind, upload_id)
+    if not metadata:
+        return jsonify({'message': 'Upload not found!'}), 404
+    
+    return jsonify({
+        'metadata': metadata.to_dict()
+    })
+
+@uploads_bp.route('/<kind>/<int:upload_id>/thumbnail', methods=['GET'])
+@token_required
+def get_upload_thumbnail(current_user, kind, upload_id):
+    metadata = find_metadata(current_user, kind, upload_id)
+    if not metadata or not metadata.thumbnail_path or not os.path.exists(metadata.thumbnail_path):
+        return jsonify({'message': 'Thumbnail not found!'}), 404
+    
+    return send_file(metadata.thumbnail_path, mimetype='image/png', max_age=3600)
@@ -0,0 +1,67 @@
+from flask import Blueprint, request, jsonify
+
+from app.models.models import db, User
+from app.services.exports import select_columns
+from app.services.listings import USER_COLUMNS, users_query
+from app.utils.auth import token_required
+from app.utils.policy import can, permission_required
+from app.utils.responses import list_response
+
+users_bp = Blueprint('users', __name__)
+
+@users_bp.route('', methods=['GET'])
+@token_required
+@permission_required('users:list')
+def get_users(current_user):
+    # Without cross-company access, only show users from their company
+    company_id = None if can(current_user, 'companies:view_all') else current_user.company_id
+    
+    try:
+        names, columns = select_columns(USER_COLUMNS, request.args.get('columns'))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    def objects():
+        query = User.query if company_id is None else User.query.filter_by(company_id=company_id)
+        return [user.to_dict() for user in query.all()]
+    
+    return list_response('users', names, users_query(columns, company_id), objects)
+
+@users_bp.route('', methods=['POST'])
+@token_required
+@permission_required('users:create')
+def create_user(current_user):
+    data = request.get_json()
+    
+    # Check if user already exists
+    if User.query.filter_by(email=data['email']).first():
+        return jsonify({'message': 'User already exists!'}), 409
+    
+    # Without cross-company access, users can only be created for their company
+    if not can(current_user, 'companies:assign') and (
+        'company_id' not in data or data['company_id'] != current_user.company_id
+    ):
+        company_id = current_user.company_id
+    else:
+        company_id = data.get('company_id')
+    
+    # Create new user
+    new_user = User(
+        email=data['email'],
+        name=data['name'],
+        phone=data.get('phone'),
+        designation=data.get('designation'),
+        company_id=company_id,
+        role=data['role'],
+        is_active=True
+    )
+    new_user.set_password(data['password'])
+    
+    # Save user to database
+    db.session.add(new_user)
+    db.session.commit()
+    
+    return jsonify({
+        'message': 'User created successfully!',
+        'user': new_user.to_dict()
+    }), 201
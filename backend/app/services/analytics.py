@@ -0,0 +1,229 @@
+# services/analytics.py
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import event, select, func, literal, cast, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+
+from app.models.models import db, Project, ProjectType, Company, ProjectDistributionRollup
+from app.services.jobs import job_handler
+from app.services.result_cache import cached_result, invalidate_on_commit, table_tags
+
+UNKNOWN = 'unknown'
+
+# Incremental updates hold it shared and the backfill exclusively, so a
+# backfill never interleaves with a transaction applying deltas
+ROLLUP_LOCK = 'project_distribution_rollups'
+
+
+def rollup_key(project, category, values=None):
+    values = values or {}
+    created_at = values.get('created_at', project.created_at) or datetime.utcnow()
+    return (
+        created_at.date(),
+        values.get('company_id', project.company_id),
+        category or UNKNOWN,
+        values.get('status', project.status) or UNKNOWN
+    )
+
+
+def previous_values(project):
+    # Committed values of the attributes that place a project in a rollup bucket
+    values = {}
+    for attribute in ('created_at', 'company_id', 'project_type_id', 'status'):
+        history = get_history(project, attribute)
+        if history.deleted:
+            values[attribute] = history.deleted[0]
+    return values
+
+
+def category_moves(connection, old_categories, new_categories, skipped_ids):
+    """Deltas moving the projects of re-categorised types from their old category to the new one."""
+    day = cast(Project.created_at, db.Date)
+    query = select(
+        Project.project_type_id, day, Project.company_id, func.coalesce(Project.status, UNKNOWN), func.count(Project.id)
+    ).where(Project.project_type_id.in_(old_categories))
+    if skipped_ids:
+        query = query.where(Project.id.notin_(skipped_ids))
+    
+    deltas = defaultdict(int)
+    for project_type_id, created_day, company_id, status, count in connection.execute(
+        query.group_by(Project.project_type_id, day, Project.company_id, Project.status)
+    ):
+        deltas[(created_day, company_id, old_categories[project_type_id] or UNKNOWN, status)] -= count
+        deltas[(created_day, company_id, new_categories[project_type_id] or UNKNOWN, status)] += count
+    return deltas
+
+
+@event.listens_for(Session, 'after_flush')
+def maintain_distribution_rollups(session, flush_context):
+    deltas = defaultdict(int)
+    categories = {}
+    connection = session.connection()
+    
+    # Types whose category this flush changed, with the category their projects were counted under
+    old_categories = {}
+    new_categories = {}
+    for project_type in session.dirty:
+        if isinstance(project_type, ProjectType) and get_history(project_type, 'category').deleted:
+            old_categories[project_type.id] = get_history(project_type, 'category').deleted[0]
+            new_categories[project_type.id] = project_type.category
+    
+    def category_for(project_type_id, before=False):
+        if before and project_type_id in old_categories:
+            return old_categories[project_type_id]
+        if project_type_id not in categories:
+            categories[project_type_id] = connection.execute(
+                select(ProjectType.category).where(ProjectType.id == project_type_id)
+            ).scalar()
+        return categories[project_type_id]
+    
+    # Projects moved one by one below are left out of the per-type move
+    moved_ids = set()
+    for project in session.new:
+        if isinstance(project, Project):
+            deltas[rollup_key(project, category_for(project.project_type_id))] += 1
+            moved_ids.add(project.id)
+    
+    for project in session.dirty:
+        if isinstance(project, Project):
+            old = previous_values(project)
+            if not old:
+                continue
+            old_type_id = old.get('project_type_id', project.project_type_id)
+            deltas[rollup_key(project, category_for(old_type_id, before=True), old)] -= 1
+            deltas[rollup_key(project, category_for(project.project_type_id))] += 1
+            moved_ids.add(project.id)
+    
+    for project in session.deleted:
+        if isinstance(project, Project):
+            old = previous_values(project)
+            old_type_id = old.get('project_type_id', project.project_type_id)
+            deltas[rollup_key(project, category_for(old_type_id, before=True), old)] -= 1
+    
+    if old_categories:
+        for key, delta in category_moves(connection, old_categories, new_categories, moved_ids).items():
+            deltas[key] += delta
+    
+    if not any(deltas.values()):
+        return
+    connection.execute(text('SELECT pg_advisory_xact_lock_shared(hashtext(:name))'), {'name': ROLLUP_LOCK})
+    
+    table = ProjectDistributionRollup.__table__
+    now = datetime.utcnow()
+    for (day, company_id, category, status), delta in deltas.items():
+        if not delta:
+            continue
+        invalidate_on_commit(session, *table_tags(table.name, [company_id]))
+        statement = insert(table).values(
+            day=day, company_id=company_id, category=category, status=status,
+            project_count=delta, updated_at=now
+        )
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=['day', 'company_id', 'category', 'status'],
+            set_={
+                'project_count': table.c.project_count + statement.excluded.project_count,
+                'updated_at': now
+            }
+        ))
+
+
+def backfill_distribution_rollups(start=None, end=None):
+    """Rebuild rollups for a day range (inclusive) straight from projects.
+    
+    Waits for transactions with pending deltas to commit, so the rebuild
+    sees their projects, and holds back new ones until it commits, so their
+    deltas land on the rebuilt rows.
+    """
+    db.session.execute(text('SELECT pg_advisory_xact_lock(hashtext(:name))'), {'name': ROLLUP_LOCK})
+    day = cast(Project.created_at, db.Date)
+    
+    delete = ProjectDistributionRollup.query
+    source = select(
+        day,
+        Project.company_id,
+        func.coalesce(ProjectType.category, UNKNOWN),
+        func.coalesce(Project.status, UNKNOWN),
+        func.count(Project.id),
+        literal(datetime.utcnow())
+    ).select_from(Project).join(ProjectType, ProjectType.id == Project.project_type_id)
+    
+    if start:
+        delete = delete.filter(ProjectDistributionRollup.day >= start)
+        source = source.where(day >= start)
+    if end:
+        delete = delete.filter(ProjectDistributionRollup.day <= end)
+        source = source.where(day <= end)
+    
+    source = source.group_by(day, Project.company_id, ProjectType.category, Project.status)
+    
+    delete.delete(synchronize_session=False)
+    invalidate_on_commit(db.session, *table_tags(ProjectDistributionRollup.__tablename__))
+    result = db.session.execute(insert(ProjectDistributionRollup.__table__).from_select(
+        ['day', 'company_id', 'category', 'status', 'project_count', 'updated_at'], source
+    ))
+    return result.rowcount
+
+
+@job_handler('backfill_distribution_rollups')
+def backfill_distribution_rollups_job(payload, report_progress):
+    start = datetime.strptime(payload['start'], '%Y-%m-%d').date() if payload.get('start') else None
+    end = datetime.strptime(payload['end'], '%Y-%m-%d').date() if payload.get('end') else None
+    rows = backfill_distribution_rollups(start, end)
+    db.session.commit()
+    return {'rollup_rows': rows}
+
+
+@cached_result('distribution', (ProjectDistributionRollup, Company), ttl=60, tenant_arg='company_id')
+def get_distribution(company_id=None, start=None, end=None, top=10):
+    """Project distribution for the dashboard charts, read from rollups only."""
+    R = ProjectDistributionRollup
+    filters = [R.project_count != 0]
+    if company_id:
+        filters.append(R.company_id == company_id)
+    if start:
+        filters.append(R.day >= start)
+    if end:
+        filters.append(R.day <= end)
+    
+    by_category = db.session.query(R.category, func.sum(R.project_count)).filter(
+        *filters
+    ).group_by(R.category).all()
+    
+    by_status = db.session.query(R.status, func.sum(R.project_count)).filter(
+        *filters
+    ).group_by(R.status).all()
+    
+    # Top companies by total projects, then their per-category split
+    top_companies = db.session.query(
+        R.company_id, func.sum(R.project_count).label('total')
+    ).filter(*filters).group_by(R.company_id).order_by(
+        func.sum(R.project_count).desc(), R.company_id
+    ).limit(top).subquery()
+    
+    company_rows = db.session.query(
+        Company.id, Company.name, R.category, func.sum(R.project_count), top_companies.c.total
+    ).join(
+        top_companies, top_companies.c.company_id == Company.id
+    ).join(
+        R, R.company_id == Company.id
+    ).filter(*filters).group_by(
+        Company.id, Company.name, R.category, top_companies.c.total
+    ).order_by(top_companies.c.total.desc(), Company.id).all()
+    
+    companies = {}
+    for company_id, name, category, count, total in company_rows:
+        entry = companies.setdefault(company_id, {'company_id': company_id, 'name': name, 'total': int(total)})
+        entry[category.lower()] = int(count)
+    
+    # Every company carries every category key so the charts can stack them
+    for entry in companies.values():
+        for category, _ in by_category:
+            entry.setdefault(category.lower(), 0)
+    
+    return {
+        'project_type': [{'name': category, 'value': int(count)} for category, count in by_category if count],
+        'company_projects': list(companies.values()),
+        'status': [{'name': status, 'value': int(count)} for status, count in by_status if count]
+    }
@@ -0,0 +1,372 @@
+# services/audit.py
+from datetime import datetime, timedelta
+from functools import lru_cache
+import hashlib
+import json
+import os
+import struct
+import uuid
+import zlib
+
+from sqlalchemy import text
+
+from app.models.models import db, AuditLog, AuditArchive
+from app.services.jobs import job_handler
+
+AUDIT_ARCHIVE_DIR = os.environ.get('AUDIT_ARCHIVE_DIR') or os.path.join(os.getcwd(), 'instance', 'audit-archive')
+
+# Rows younger than this stay in Postgres; archives older than the retention period are deleted
+AUDIT_HOT_DAYS = int(os.environ.get('AUDIT_HOT_DAYS', 90))
+AUDIT_RETENTION_DAYS = int(os.environ.get('AUDIT_RETENTION_DAYS', 7 * 365))
+
+# Rows per archive file
+ARCHIVE_FILE_ROWS = 50000
+
+ARCHIVE_MAGIC = b'CPAUDIT1'
+FOOTER_TAIL = struct.Struct('>Q8s')
+EPOCH = datetime(1970, 1, 1)
+
+AUDIT_COLUMNS = {
+    'id': AuditLog.id,
+    'user_id': AuditLog.user_id,
+    'action': AuditLog.action,
+    'entity_type': AuditLog.entity_type,
+    'entity_id': AuditLog.entity_id,
+    'details': AuditLog.details,
+    'ip_address': AuditLog.ip_address,
+    'user_agent': AuditLog.user_agent,
+    'created_at': AuditLog.created_at,
+}
+AUDIT_COLUMN_NAMES = list(AUDIT_COLUMNS)
+
+# How each column is stored: ids and timestamps as deltas from the previous
+# row, repetitive strings as a dictionary plus codes, the rest as plain values
+COLUMN_ENCODINGS = {
+    'id': 'delta',
+    'created_at': 'delta_us',
+    'action': 'dictionary',
+    'entity_type': 'dictionary',
+    'ip_address': 'dictionary',
+    'user_agent': 'dictionary',
+}
+
+
+def to_micros(value):
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def from_micros(value):
+    return EPOCH + timedelta(microseconds=value)
+
+
+def encode_column(encoding, values):
+    if encoding == 'delta_us':
+        values = [to_micros(value) for value in values]
+        encoding = 'delta'
+    if encoding == 'delta':
+        previous = 0
+        deltas = []
+        for value in values:
+            deltas.append(value - previous)
+            previous = value
+        return deltas
+    if encoding == 'dictionary':
+        dictionary = {}
+        codes = [dictionary.setdefault(value, len(dictionary)) for value in values]
+        return {'dictionary': list(dictionary), 'codes': codes}
+    return values
+
+
+def decode_column(encoding, data):
+    if encoding in ('delta', 'delta_us'):
+        values = []
+        total = 0
+        for delta in data:
+            total += delta
+            values.append(total)
+        return [from_micros(value) for value in values] if encoding == 'delta_us' else values
+    if encoding == 'dictionary':
+        dictionary = data['dictionary']
+        return [dictionary[code] for code in data['codes']]
+    return data
+
+
+def write_archive(rows):
+    """Write rows (in AUDIT_COLUMN_NAMES order, ascending id) to a new archive file.
+    
+    Layout: magic, one zlib-compressed JSON block per column, a JSON footer with
+    each block's offset, length and SHA-256, then the footer length and magic
+    again. Readers load the footer from the tail and only the columns they
+    need, checking each block as they read it. The file is written
+    under a temporary name and renamed once complete, so it is never seen partly
+    written. Returns the AuditArchive fields for the file.
+    """
+    os.makedirs(AUDIT_ARCHIVE_DIR, exist_ok=True)
+    columns = list(zip(*rows))
+    ids = columns[0]
+    created = columns[AUDIT_COLUMN_NAMES.index('created_at')]
+    entity_ids = columns[AUDIT_COLUMN_NAMES.index('entity_id')]
+    user_ids = [value for value in columns[AUDIT_COLUMN_NAMES.index('user_id')] if value is not None]
+    
+    path = os.path.join(AUDIT_ARCHIVE_DIR, f'audit-{ids[0]:010d}-{ids[-1]:010d}-{uuid.uuid4().hex[:8]}.cpa')
+    partial = path + '.partial'
+    footer = {'version': 2, 'row_count': len(rows), 'encodings': {}, 'columns': {}, 'checksums': {}}
+    checksum = hashlib.sha256()
+    
+    with open(partial, 'wb') as f:
+        def write(data):
+            f.write(data)
+            checksum.update(data)
+        
+        write(ARCHIVE_MAGIC)
+        for name, values in zip(AUDIT_COLUMN_NAMES, columns):
+            encoding = COLUMN_ENCODINGS.get(name, 'plain')
+            block = zlib.compress(json.dumps(encode_column(encoding, list(values)), separators=(',', ':')).encode('utf-8'), 9)
+            footer['encodings'][name] = encoding
+            footer['columns'][name] = [f.tell(), len(block)]
+            footer['checksums'][name] = hashlib.sha256(block).hexdigest()
+            write(block)
+        footer_bytes = json.dumps(footer).encode('utf-8')
+        write(footer_bytes)
+        write(FOOTER_TAIL.pack(len(footer_bytes), ARCHIVE_MAGIC))
+        f.flush()
+        os.fsync(f.fileno())
+        size = f.tell()
+    os.replace(partial, path)
+    
+    return {
+        'path': path,
+        'row_count': len(rows),
+        'size_bytes': size,
+        'checksum': checksum.hexdigest(),
+        'min_id': ids[0],
+        'max_id': ids[-1],
+        'min_created_at': min(created),
+        'max_created_at': max(created),
+        'min_entity_id': min(entity_ids),
+        'max_entity_id': max(entity_ids),
+        'min_user_id': min(user_ids) if user_ids else None,
+        'max_user_id': max(user_ids) if user_ids else None,
+        'entity_types': sorted(set(columns[AUDIT_COLUMN_NAMES.index('entity_type')])),
+        'actions': sorted(set(columns[AUDIT_COLUMN_NAMES.index('action')])),
+    }
+
+
+def verify_archive(path, checksum):
+    """Check a whole archive file against the checksum recorded for it."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    if digest.hexdigest() != checksum:
+        raise ValueError(f'Audit archive is corrupt: {path}')
+
+
+@lru_cache(maxsize=256)
+def read_footer(path, checksum):
+    """Load an archive's footer from the end of the file, leaving the column blocks unread."""
+    with open(path, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        f.seek(0)
+        if size < len(ARCHIVE_MAGIC) + FOOTER_TAIL.size or f.read(len(ARCHIVE_MAGIC)) != ARCHIVE_MAGIC:
+            raise ValueError(f'Not an audit archive: {path}')
+        f.seek(size - FOOTER_TAIL.size)
+        footer_length, magic = FOOTER_TAIL.unpack(f.read(FOOTER_TAIL.size))
+        if magic != ARCHIVE_MAGIC:
+            raise ValueError(f'Not an audit archive: {path}')
+        if footer_length > size - FOOTER_TAIL.size - len(ARCHIVE_MAGIC):
+            raise ValueError(f'Audit archive is corrupt: {path}')
+        f.seek(size - FOOTER_TAIL.size - footer_length)
+        try:
+            footer = json.loads(f.read(footer_length))
+        except ValueError:
+            raise ValueError(f'Audit archive is corrupt: {path}')
+    if 'checksums' not in footer:
+        # Version 1 files carry only the whole-file checksum
+        verify_archive(path, checksum)
+    return footer
+
+
+# Archive files never change, so decoded columns can be cached by path
+@lru_cache(maxsize=64)
+def read_column(path, checksum, name):
+    footer = read_footer(path, checksum)
+    offset, length = footer['columns'][name]
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        block = f.read(length)
+    expected = footer.get('checksums', {}).get(name)
+    if expected is not None and hashlib.sha256(block).hexdigest() != expected:
+        raise ValueError(f'Audit archive is corrupt: {path}')
+    return decode_column(footer['encodings'][name], json.loads(zlib.decompress(block)))
+
+
+def try_archive_lock():
+    # Held until the end of the current transaction
+    return db.session.execute(text("SELECT pg_try_advisory_xact_lock(hashtext('audit_archive'))")).scalar()
+
+
+def archive_audit_logs(hot_days=AUDIT_HOT_DAYS, retention_days=AUDIT_RETENTION_DAYS, max_files=None):
+    """Move audit rows older than hot_days into archive files, then drop expired archives.
+    
+    Each file is written and fsynced before the transaction that records it
+    and deletes its rows, so a crash leaves either the rows or the archive,
+    never neither. Runs are serialised with an advisory lock, taken again for
+    each transaction, the purge included.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=hot_days)
+    columns = list(AUDIT_COLUMNS.values())
+    files = rows_archived = 0
+    
+    while max_files is None or files < max_files:
+        if not try_archive_lock():
+            db.session.rollback()
+            print("Audit archiving already running elsewhere")
+            return {'files': files, 'rows': rows_archived, 'purged_files': 0}
+        
+        rows = db.session.query(*columns).filter(AuditLog.created_at < cutoff).order_by(AuditLog.id).limit(ARCHIVE_FILE_ROWS).all()
+        if not rows:
+            db.session.rollback()
+            break
+        
+        fields = write_archive(rows)
+        try:
+            db.session.add(AuditArchive(**fields))
+            # Rows picked above are exactly the aged rows up to the file's last id
+            deleted = AuditLog.query.filter(
+                AuditLog.created_at < cutoff, AuditLog.id <= fields['max_id']
+            ).delete(synchronize_session=False)
+            if deleted != len(rows):
+                raise RuntimeError(f'Archived {len(rows)} audit rows but would delete {deleted}')
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            os.remove(fields['path'])
+            raise
+        
+        files += 1
+        rows_archived += len(rows)
+        print(f"Archived {len(rows)} audit rows to {fields['path']}")
+    
+    return {'files': files, 'rows': rows_archived, 'purged_files': purge_expired_archives(retention_days)}
+
+
+def purge_expired_archives(retention_days=AUDIT_RETENTION_DAYS):
+    """Drop archives past retention; their rows are deleted in one transaction under the archiving lock."""
+    if not try_archive_lock():
+        db.session.rollback()
+        print("Audit archiving already running elsewhere")
+        return 0
+    
+    table = AuditArchive.__table__
+    paths = db.session.execute(table.delete().where(
+        table.c.max_created_at < datetime.utcnow() - timedelta(days=retention_days)
+    ).returning(table.c.path)).scalars().all()
+    db.session.commit()
+    
+    # Files go once their rows are gone, so no query can still pick them
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError as e:
+            print(f"Could not remove expired audit archive {path}: {e}")
+    return len(paths)
+
+
+@job_handler('archive_audit_logs')
+def archive_audit_logs_job(payload, report_progress):
+    return archive_audit_logs()
+
+
+def parse_filters(args):
+    """Audit query filters from request args; raises ValueError on bad values."""
+    filters = {}
+    for name in ('entity_type', 'action'):
+        if args.get(name):
+            filters[name] = args[name]
+    for name in ('entity_id', 'user_id'):
+        if args.get(name):
+            filters[name] = int(args[name])
+    for name in ('since', 'until'):
+        if args.get(name):
+            filters[name] = datetime.fromisoformat(args[name])
+    return filters
+
+
+def hot_rows(filters, before, limit):
+    query = db.session.query(*AUDIT_COLUMNS.values())
+    for name in ('entity_type', 'action', 'entity_id', 'user_id'):
+        if name in filters:
+            query = query.filter(AUDIT_COLUMNS[name] == filters[name])
+    if 'since' in filters:
+        query = query.filter(AuditLog.created_at >= filters['since'])
+    if 'until' in filters:
+        query = query.filter(AuditLog.created_at < filters['until'])
+    if before is not None:
+        query = query.filter(AuditLog.id < before)
+    return [tuple(row) for row in query.order_by(AuditLog.id.desc()).limit(limit)]
+
+
+def candidate_archives(filters, before):
+    """Archives whose min/max index says they may hold matching rows, newest first."""
+    query = AuditArchive.query
+    if before is not None:
+        query = query.filter(AuditArchive.min_id < before)
+    if 'since' in filters:
+        query = query.filter(AuditArchive.max_created_at >= filters['since'])
+    if 'until' in filters:
+        query = query.filter(AuditArchive.min_created_at < filters['until'])
+    if 'entity_id' in filters:
+        query = query.filter(AuditArchive.min_entity_id <= filters['entity_id'], AuditArchive.max_entity_id >= filters['entity_id'])
+    if 'user_id' in filters:
+        query = query.filter(AuditArchive.min_user_id <= filters['user_id'], AuditArchive.max_user_id >= filters['user_id'])
+    if 'entity_type' in filters:
+        query = query.filter(AuditArchive.entity_types.contains([filters['entity_type']]))
+    if 'action' in filters:
+        query = query.filter(AuditArchive.actions.contains([filters['action']]))
+    return query.order_by(AuditArchive.max_id.desc())
+
+
+def archive_rows(archive, filters, before):
+    """Matching rows of one archive file, newest first; only filtered columns are read for non-matches."""
+    ids = read_column(archive.path, archive.checksum, 'id')
+    matches = range(len(ids))
+    if before is not None:
+        matches = [i for i in matches if ids[i] < before]
+    for name in ('entity_type', 'action', 'entity_id', 'user_id'):
+        if name in filters and matches:
+            values = read_column(archive.path, archive.checksum, name)
+            matches = [i for i in matches if values[i] == filters[name]]
+    if ('since' in filters or 'until' in filters) and matches:
+        created = read_column(archive.path, archive.checksum, 'created_at')
+        since, until = filters.get('since'), filters.get('until')
+        matches = [i for i in matches if (since is None or created[i] >= since) and (until is None or created[i] < until)]
+    if not matches:
+        return []
+    
+    columns = [read_column(archive.path, archive.checksum, name) for name in AUDIT_COLUMN_NAMES]
+    return [tuple(column[i] for column in columns) for i in reversed(matches)]
+
+
+def query_audit_logs(filters, before=None, limit=100):
+    """One page of audit rows across Postgres and the archives, newest id first.
+    
+    Returns (rows, next_before, stats). Archives are visited newest first and
+    the walk stops once no remaining file can beat the page's oldest row.
+    """
+    rows = hot_rows(filters, before, limit)
+    candidates = candidate_archives(filters, before).all()
+    scanned = 0
+    
+    for archive in candidates:
+        rows.sort(key=lambda row: row[0], reverse=True)
+        if len(rows) >= limit and archive.max_id < rows[limit - 1][0]:
+            break
+        rows += archive_rows(archive, filters, before)
+        scanned += 1
+    
+    rows.sort(key=lambda row: row[0], reverse=True)
+    page = rows[:limit]
+    next_before = page[-1][0] if len(page) == limit else None
+    total = AuditArchive.query.count()
+    return page, next_before, {'archives_scanned': scanned, 'archives_skipped': total - scanned}
@@ -0,0 +1,165 @@
+# services/changes.py
+from datetime import datetime
+from sqlalchemy import event, text, tuple_
+from sqlalchemy.orm import Session
+
+from app.models.models import db, ChangeLog, Project, ProjectEvidence, ActionItem, SupportTicket, User
+from app.utils.policy import can, get_principal
+
+# Entities exposed through the change feed
+TRACKED_MODELS = {
+    Project: 'project',
+    ProjectEvidence: 'project_evidence',
+    ActionItem: 'action_item',
+    SupportTicket: 'support_ticket',
+}
+
+ENTITY_MODELS = {entity_type: model for model, entity_type in TRACKED_MODELS.items()}
+
+# Transactions below this id have all finished, so their rows can no longer appear behind a cursor
+VISIBLE_TXID = text('pg_snapshot_xmin(pg_current_snapshot())::text::bigint')
+
+
+def change_scope(obj):
+    """Return (project_id, user_id) used to decide who may see a change."""
+    if isinstance(obj, Project):
+        return obj.id, None
+    if isinstance(obj, SupportTicket):
+        return None, obj.requester_id
+    return obj.project_id, obj.assigned_to
+
+
+@event.listens_for(Session, 'after_flush')
+def record_flushed_changes(session, flush_context):
+    # Runs inside the flush, so change rows commit or roll back with the data
+    rows = []
+    for objects, operation in ((session.new, 'created'), (session.dirty, 'updated'), (session.deleted, 'deleted')):
+        for obj in objects:
+            entity_type = TRACKED_MODELS.get(type(obj))
+            if not entity_type:
+                continue
+            if operation == 'updated' and not session.is_modified(obj, include_collections=False):
+                continue
+            project_id, user_id = change_scope(obj)
+            rows.append({
+                'entity_type': entity_type,
+                'entity_id': obj.id,
+                'operation': operation,
+                'project_id': project_id,
+                'user_id': user_id,
+                'created_at': datetime.utcnow()
+            })
+    
+    if rows:
+        session.connection().execute(ChangeLog.__table__.insert(), rows)
+
+
+def record_changes(entity_type, entity_ids, operation, project_id=None, user_id=None):
+    """Record changes made by set-based statements that bypass the ORM flush."""
+    if not entity_ids:
+        return
+    now = datetime.utcnow()
+    db.session.execute(ChangeLog.__table__.insert(), [{
+        'entity_type': entity_type,
+        'entity_id': entity_id,
+        'operation': operation,
+        'project_id': project_id,
+        'user_id': user_id,
+        'created_at': now
+    } for entity_id in entity_ids])
+
+
+def encode_cursor(txid, change_id):
+    return f'{txid}.{change_id}'
+
+
+def decode_cursor(cursor):
+    txid, _, change_id = cursor.partition('.')
+    return int(txid), int(change_id or 0)
+
+
+def scoped_changes(user):
+    query = ChangeLog.query
+    
+    if can(user, 'companies:view_all'):
+        return query
+    
+    if can(user, 'changes:view_company'):
+        company_projects = db.session.query(Project.id).filter(Project.company_id == user.company_id)
+        company_users = db.session.query(User.id).filter(User.company_id == user.company_id)
+        return query.filter(db.or_(
+            ChangeLog.project_id.in_(company_projects),
+            ChangeLog.user_id.in_(company_users)
+        ))
+    
+    return query.filter(db.or_(
+        get_principal(user).project_filter(ChangeLog.project_id),
+        ChangeLog.user_id == user.id
+    ))
+
+
+def head_cursor():
+    latest = ChangeLog.query.filter(ChangeLog.txid < VISIBLE_TXID).order_by(
+        ChangeLog.txid.desc(), ChangeLog.id.desc()
+    ).first()
+    return encode_cursor(latest.txid, latest.id) if latest else encode_cursor(0, 0)
+
+
+def get_changes(user, since, limit):
+    """Return changes visible to the user after the given cursor.
+    
+    Several changes to the same entity within the page collapse into its
+    latest state; deleted entities come back as tombstones.
+    """
+    txid, change_id = decode_cursor(since)
+    
+    changes = scoped_changes(user).filter(
+        ChangeLog.txid < VISIBLE_TXID,
+        tuple_(ChangeLog.txid, ChangeLog.id) > tuple_(txid, change_id)
+    ).order_by(ChangeLog.txid, ChangeLog.id).limit(limit + 1).all()
+    
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    cursor = encode_cursor(changes[-1].txid, changes[-1].id) if changes else since
+    
+    # Keep only the last change per entity
+    latest = {}
+    for change in changes:
+        key = (change.entity_type, change.entity_id)
+        first = latest[key]['first_operation'] if key in latest else change.operation
+        latest[key] = {'change': change, 'first_operation': first}
+    
+    # Load current state of surviving entities, one query per type
+    ids_by_type = {}
+    for (entity_type, entity_id), entry in latest.items():
+        if entry['change'].operation != 'deleted':
+            ids_by_type.setdefault(entity_type, []).append(entity_id)
+    
+    entities = {}
+    for entity_type, ids in ids_by_type.items():
+        model = ENTITY_MODELS[entity_type]
+        for obj in model.query.filter(model.id.in_(ids)).all():
+            entities[(entity_type, obj.id)] = obj.to_dict()
+    
+    results = []
+    for key, entry in latest.items():
+        change = entry['change']
+        data = entities.get(key)
+        if change.operation == 'deleted' or data is None:
+            operation = 'deleted'
+        elif entry['first_operation'] == 'created':
+            operation = 'created'
+        else:
+            operation = 'updated'
+        results.append({
+            'entity_type': change.entity_type,
+            'entity_id': change.entity_id,
+            'operation': operation,
+            'data': data if operation != 'deleted' else None
+        })
+    
+    return {
+        'changes': results,
+        'cursor': cursor,
+        'has_more': has_more
+    }
@@ -0,0 +1,246 @@
+# services/deadlines.py
+from datetime import datetime, timedelta
+import heapq
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.models.models import (
+    db, Milestone, ProjectPlan, ActionItem, ProjectUser, Project,
+    DeadlineEvent, Notification, NotificationSetting
+)
+from app.services.jobs import job_handler
+
+# Items due within this many days are "at risk"
+AT_RISK_DAYS = 3
+
+
+def utc_today():
+    # Due dates are compared with the UTC day, like the utcnow() edit stamps the sweep reloads by
+    return datetime.utcnow().date()
+
+
+def open_milestones():
+    return db.or_(Milestone.status.is_(None), Milestone.status.notin_(Milestone.CLOSED_STATUSES))
+
+
+def open_action_items():
+    return db.or_(ActionItem.status.is_(None), ActionItem.status.notin_(ActionItem.CLOSED_STATUSES))
+
+
+class DeadlineHeap:
+    """Min-heap of upcoming deadline triggers, filled incrementally from the partial indexes.
+    
+    Each open item contributes an at_risk trigger (AT_RISK_DAYS before it is
+    due), unless it is already past due, and an overdue trigger (the day
+    after). Only the window up to the
+    load watermark is held in memory; each sweep extends the watermark and
+    reloads items edited since the previous sweep.
+    """
+    
+    def __init__(self):
+        self.heap = []
+        self.loaded_until = None
+        self.last_sweep = None
+    
+    def push(self, entity_type, entity_id, due_date, today):
+        # An item first seen after its due date only gets the overdue event
+        if due_date >= today:
+            heapq.heappush(self.heap, (due_date - timedelta(days=AT_RISK_DAYS), 'at_risk', entity_type, entity_id, due_date))
+        heapq.heappush(self.heap, (due_date + timedelta(days=1), 'overdue', entity_type, entity_id, due_date))
+    
+    def load(self, today):
+        horizon = today + timedelta(days=AT_RISK_DAYS)
+        
+        milestones = db.session.query(Milestone.id, Milestone.due_date).filter(open_milestones(), Milestone.due_date <= horizon)
+        actions = db.session.query(ActionItem.id, ActionItem.target_date).filter(open_action_items(), ActionItem.target_date <= horizon)
+        
+        if self.loaded_until is not None:
+            # Only the newly reached window, plus anything rescheduled since the last sweep
+            milestones = milestones.filter(db.or_(Milestone.due_date > self.loaded_until, Milestone.updated_at >= self.last_sweep))
+            actions = actions.filter(db.or_(ActionItem.target_date > self.loaded_until, ActionItem.updated_at >= self.last_sweep))
+        
+        for milestone_id, due_date in milestones:
+            self.push('milestone', milestone_id, due_date, today)
+        for action_id, due_date in actions:
+            self.push('action_item', action_id, due_date, today)
+        
+        self.loaded_until = horizon
+    
+    def pop_due(self, today):
+        due = []
+        while self.heap and self.heap[0][0] <= today:
+            due.append(heapq.heappop(self.heap))
+        return due
+
+
+_heap = DeadlineHeap()
+
+
+def still_open(triggers):
+    """Filter triggers down to items that are still open and still due on the same date."""
+    milestone_ids = [t[3] for t in triggers if t[2] == 'milestone']
+    action_ids = [t[3] for t in triggers if t[2] == 'action_item']
+    current = {}
+    
+    if milestone_ids:
+        for milestone_id, due_date in db.session.query(Milestone.id, Milestone.due_date).filter(
+            Milestone.id.in_(milestone_ids), open_milestones()
+        ):
+            current[('milestone', milestone_id)] = due_date
+    if action_ids:
+        for action_id, due_date in db.session.query(ActionItem.id, ActionItem.target_date).filter(
+            ActionItem.id.in_(action_ids), open_action_items()
+        ):
+            current[('action_item', action_id)] = due_date
+    
+    return [t for t in triggers if current.get((t[2], t[3])) == t[4]]
+
+
+def recipients(events):
+    """Map each (entity_type, entity_id) to the users to notify: the assignee, else the project owners."""
+    action_ids = [entity_id for entity_type, entity_id in events if entity_type == 'action_item']
+    milestone_ids = [entity_id for entity_type, entity_id in events if entity_type == 'milestone']
+    
+    result = {}
+    projects = {}
+    if action_ids:
+        for action_id, project_id, assigned_to in db.session.query(ActionItem.id, ActionItem.project_id, ActionItem.assigned_to).filter(ActionItem.id.in_(action_ids)):
+            if assigned_to:
+                result[('action_item', action_id)] = {assigned_to}
+            else:
+                projects[('action_item', action_id)] = project_id
+    if milestone_ids:
+        for milestone_id, project_id in db.session.query(Milestone.id, ProjectPlan.project_id).join(
+            ProjectPlan, ProjectPlan.id == Milestone.project_plan_id
+        ).filter(Milestone.id.in_(milestone_ids)):
+            projects[('milestone', milestone_id)] = project_id
+    
+    owners = {}
+    if projects:
+        for project_id, user_id in db.session.query(ProjectUser.project_id, ProjectUser.user_id).filter(
+            ProjectUser.project_id.in_(set(projects.values())), ProjectUser.role == 'project_owner'
+        ):
+            owners.setdefault(project_id, set()).add(user_id)
+    for key, project_id in projects.items():
+        result[key] = owners.get(project_id, set())
+    
+    return result
+
+
+def emit_events(triggers):
+    if not triggers:
+        return 0
+    
+    # The unique constraint makes emission idempotent across sweeps and workers
+    statement = insert(DeadlineEvent.__table__).values([{
+        'entity_type': entity_type,
+        'entity_id': entity_id,
+        'event': event,
+        'due_date': due_date,
+        'created_at': datetime.utcnow()
+    } for _, event, entity_type, entity_id, due_date in triggers]).on_conflict_do_nothing().returning(
+        DeadlineEvent.__table__.c.entity_type,
+        DeadlineEvent.__table__.c.entity_id,
+        DeadlineEvent.__table__.c.event,
+        DeadlineEvent.__table__.c.due_date
+    )
+    emitted = db.session.execute(statement).fetchall()
+    if not emitted:
+        return 0
+    
+    users = recipients({(row.entity_type, row.entity_id) for row in emitted})
+    notification_types = {'overdue': 'deadline_overdue', 'at_risk': 'deadline_at_risk'}
+    
+    disabled = set(db.session.query(NotificationSetting.user_id, NotificationSetting.notification_type).filter(
+        NotificationSetting.is_enabled.is_(False),
+        NotificationSetting.notification_type.in_(notification_types.values())
+    ))
+    
+    notifications = []
+    for row in emitted:
+        label = 'Milestone' if row.entity_type == 'milestone' else 'Action item'
+        notification_type = notification_types[row.event]
+        for user_id in users.get((row.entity_type, row.entity_id), ()):
+            if (user_id, notification_type) in disabled:
+                continue
+            if row.event == 'overdue':
+                title = f'{label} overdue'
+                message = f'{label} #{row.entity_id} was due on {row.due_date.isoformat()}.'
+            else:
+                title = f'{label} due soon'
+                message = f'{label} #{row.entity_id} is due on {row.due_date.isoformat()}.'
+            notifications.append({
+                'user_id': user_id,
+                'notification_type': notification_type,
+                'title': title,
+                'message': message,
+                'is_read': False,
+                'created_at': datetime.utcnow()
+            })
+    
+    if notifications:
+        db.session.execute(Notification.__table__.insert(), notifications)
+    return len(emitted)
+
+
+def sweep_deadlines(today=None):
+    today = today or utc_today()
+    started = datetime.utcnow()
+    
+    _heap.load(today)
+    triggers = still_open(_heap.pop_due(today))
+    emitted = emit_events(triggers)
+    _heap.last_sweep = started
+    
+    return {'triggers': len(triggers), 'events_emitted': emitted, 'heap_size': len(_heap.heap)}
+
+
+@job_handler('sweep_deadlines')
+def sweep_deadlines_job(payload, report_progress):
+    result = sweep_deadlines()
+    db.session.commit()
+    return result
+
+
+def upcoming_deadlines(user, days=14, limit=100):
+    """Open action items assigned to the user and open milestones of their projects, soonest first."""
+    today = utc_today()
+    horizon = today + timedelta(days=days)
+    
+    actions = db.session.query(
+        ActionItem.id, ActionItem.project_id, ActionItem.action_point, ActionItem.target_date, ActionItem.status, ActionItem.severity
+    ).filter(
+        ActionItem.assigned_to == user.id, open_action_items(), ActionItem.target_date <= horizon
+    ).order_by(ActionItem.target_date).limit(limit).all()
+    
+    member_projects = select(ProjectUser.project_id).where(ProjectUser.user_id == user.id)
+    milestones = db.session.query(
+        Milestone.id, ProjectPlan.project_id, Milestone.name, Milestone.due_date, Milestone.status
+    ).join(
+        ProjectPlan, ProjectPlan.id == Milestone.project_plan_id
+    ).filter(
+        ProjectPlan.project_id.in_(member_projects), open_milestones(), Milestone.due_date <= horizon
+    ).order_by(Milestone.due_date).limit(limit).all()
+    
+    deadlines = [{
+        'entity_type': 'action_item',
+        'entity_id': row.id,
+        'project_id': row.project_id,
+        'title': row.action_point,
+        'due_date': row.target_date.isoformat(),
+        'status': row.status,
+        'severity': row.severity,
+        'overdue': row.target_date < today
+    } for row in actions] + [{
+        'entity_type': 'milestone',
+        'entity_id': row.id,
+        'project_id': row.project_id,
+        'title': row.name,
+        'due_date': row.due_date.isoformat(),
+        'status': row.status,
+        'severity': None,
+        'overdue': row.due_date < today
+    } for row in milestones]
+    
+    return sorted(deadlines, key=lambda item: item['due_date'])[:limit]
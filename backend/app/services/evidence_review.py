@@ -0,0 +1,120 @@
+# services/evidence_review.py
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import select, update, values, column, func, case, Integer, String, Text
+
+from app.models.models import db, ProjectEvidence, EvidenceUpload, ActionItem, ActionEvidence, AuditLog
+from app.services.changes import record_changes
+from app.utils.policy import get_principal
+
+REVIEW_DECISIONS = {'approve': 'approved', 'reject': 'rejected'}
+PENDING_STATUSES = ('pending', 'submitted')
+
+# kind -> (upload model, how an upload reaches its project)
+REVIEW_TARGETS = {
+    'evidence_upload': (EvidenceUpload, EvidenceUpload.project_evidence_id, ProjectEvidence),
+    'action_evidence': (ActionEvidence, ActionEvidence.action_item_id, ActionItem),
+}
+
+
+def parse_decisions(items):
+    """Validate [{id, decision, comments}] and keep the last decision per id."""
+    decisions = {}
+    for item in items:
+        decision = REVIEW_DECISIONS.get(item.get('decision'))
+        if not decision or not isinstance(item.get('id'), int):
+            raise ValueError(f"Invalid review item: {item}")
+        decisions[item['id']] = (decision, item.get('comments'))
+    return decisions
+
+
+def recompute_evidence_status(project_evidence_ids):
+    """Set each parent's status from all of its uploads with one UPDATE: approved wins, then pending, then rejected."""
+    if not project_evidence_ids:
+        return []
+    
+    def any_upload(condition):
+        return select(func.count()).where(
+            EvidenceUpload.project_evidence_id == ProjectEvidence.id, condition
+        ).scalar_subquery() > 0
+    
+    status = case(
+        (any_upload(EvidenceUpload.status == 'approved'), 'approved'),
+        (any_upload(db.or_(EvidenceUpload.status.is_(None), EvidenceUpload.status.in_(PENDING_STATUSES))), 'submitted'),
+        (any_upload(EvidenceUpload.status == 'rejected'), 'rejected'),
+        else_=ProjectEvidence.status
+    )
+    statement = update(ProjectEvidence).where(
+        ProjectEvidence.id.in_(project_evidence_ids)
+    ).values(
+        status=status, updated_at=datetime.utcnow()
+    ).returning(ProjectEvidence.id, ProjectEvidence.project_id, ProjectEvidence.status)
+    
+    return db.session.execute(statement.execution_options(synchronize_session=False)).fetchall()
+
+
+def review_uploads(kind, items, reviewer, ip_address=None, user_agent=None):
+    """Apply a batch of review decisions with one UPDATE ... FROM (VALUES ...) RETURNING.
+
+    Uploads the reviewer cannot reach are left alone and reported as skipped.
+    Audit rows go in with one multi-row INSERT and every affected parent
+    ProjectEvidence is recomputed once. The caller commits.
+    """
+    model, parent_column, parent_model = REVIEW_TARGETS[kind]
+    decisions = parse_decisions(items)
+    if not decisions:
+        return {'reviewed': [], 'skipped': [], 'project_evidence': []}
+    
+    now = datetime.utcnow()
+    table = model.__table__
+    batch = values(
+        column('id', Integer), column('status', String), column('comments', Text), name='decisions'
+    ).data([(upload_id, decision, comments) for upload_id, (decision, comments) in decisions.items()])
+    
+    statement = update(table).where(
+        table.c.id == batch.c.id
+    ).values(
+        status=batch.c.status,
+        comments=func.coalesce(batch.c.comments, table.c.comments),
+        reviewed_by=reviewer.id,
+        reviewed_at=now
+    )
+    
+    projects = get_principal(reviewer).project_ids('evidence:review')
+    if projects is not None:
+        statement = statement.where(
+            table.c[parent_column.key].in_(select(parent_model.id).where(parent_model.project_id.in_(projects)))
+        )
+    
+    reviewed = db.session.execute(statement.returning(
+        table.c.id, table.c[parent_column.key], table.c.status
+    )).fetchall()
+    
+    if reviewed:
+        db.session.execute(AuditLog.__table__.insert(), [{
+            'user_id': reviewer.id,
+            'action': f'{kind}_{status}',
+            'entity_type': kind,
+            'entity_id': upload_id,
+            'details': {'parent_id': parent_id, 'status': status, 'comments': decisions[upload_id][1]},
+            'ip_address': ip_address,
+            'user_agent': user_agent,
+            'created_at': now
+        } for upload_id, parent_id, status in reviewed])
+    
+    parents = []
+    if kind == 'evidence_upload':
+        parents = recompute_evidence_status(sorted({parent_id for _, parent_id, _ in reviewed}))
+        by_project = defaultdict(list)
+        for evidence_id, project_id, _ in parents:
+            by_project[project_id].append(evidence_id)
+        for project_id, evidence_ids in by_project.items():
+            record_changes('project_evidence', evidence_ids, 'updated', project_id=project_id, user_id=reviewer.id)
+    
+    reviewed_ids = {row[0] for row in reviewed}
+    return {
+        'reviewed': [{'id': upload_id, 'parent_id': parent_id, 'status': status} for upload_id, parent_id, status in reviewed],
+        'skipped': sorted(set(decisions) - reviewed_ids),
+        'project_evidence': [{'id': evidence_id, 'status': status} for evidence_id, _, status in parents]
+    }
@@ -0,0 +1,188 @@
+# services/exports.py
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+import csv
+import io
+import os
+import tempfile
+
+from app.models.models import db, ActionItem, Requirement, ScanResult, Vulnerability, TestingScope
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = 1000
+
+# Rows per XLSX worksheet, header included; longer exports continue on further sheets
+XLSX_MAX_ROWS = 1048576
+
+ACTION_ITEM_COLUMNS = {
+    'id': ActionItem.id,
+    'requirement_number': Requirement.requirement_number,
+    'observation': ActionItem.observation,
+    'action_point': ActionItem.action_point,
+    'severity': ActionItem.severity,
+    'status': ActionItem.status,
+    'assigned_to': ActionItem.assigned_to,
+    'department': ActionItem.department,
+    'target_date': ActionItem.target_date,
+    'is_evidence_required': ActionItem.is_evidence_required,
+    'created_at': ActionItem.created_at,
+    'updated_at': ActionItem.updated_at,
+}
+
+SCAN_RESULT_COLUMNS = {
+    'id': ScanResult.id,
+    'scan_date': ScanResult.scan_date,
+    'status': ScanResult.status,
+    'scope_type': TestingScope.scope_type,
+    'scope_value': TestingScope.scope_value,
+    'cve_id': Vulnerability.cve_id,
+    'name': Vulnerability.name,
+    'cvss_score': Vulnerability.cvss_score,
+    'affected_systems': Vulnerability.affected_systems,
+    'affected_system': ScanResult.affected_system,
+    'first_seen_at': ScanResult.first_seen_at,
+    'last_seen_at': ScanResult.last_seen_at,
+    'vulnerability_status': Vulnerability.status,
+    'date_published': Vulnerability.date_published,
+    'date_patched': Vulnerability.date_patched,
+    'remediation_steps': Vulnerability.remediation_steps,
+    'proof_of_concept': ScanResult.proof_of_concept,
+}
+
+# Scan findings have no severity column, so severity filters map to CVSS bands
+CVSS_SEVERITY_BANDS = {
+    'critical': (9.0, None),
+    'high': (7.0, 9.0),
+    'medium': (4.0, 7.0),
+    'low': (0.0, 4.0),
+}
+
+
+def select_columns(available, requested):
+    """Return (names, columns) for the requested subset, keeping the caller's order."""
+    if not requested:
+        return list(available.keys()), list(available.values())
+    
+    names = [name.strip() for name in requested.split(',') if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+    return names, [available[name] for name in names]
+
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+
+def action_items_query(project_id, columns, filters):
+    query = db.session.query(*columns).select_from(ActionItem).outerjoin(
+        Requirement, Requirement.id == ActionItem.requirement_id
+    ).filter(ActionItem.project_id == project_id)
+    
+    if filters.get('severity'):
+        query = query.filter(ActionItem.severity.in_(filters['severity'].split(',')))
+    if filters.get('status'):
+        query = query.filter(ActionItem.status.in_(filters['status'].split(',')))
+    if filters.get('department'):
+        query = query.filter(ActionItem.department.in_(filters['department'].split(',')))
+    if filters.get('target_date_from'):
+        query = query.filter(ActionItem.target_date >= parse_date(filters['target_date_from']))
+    if filters.get('target_date_to'):
+        query = query.filter(ActionItem.target_date <= parse_date(filters['target_date_to']))
+    
+    return query.order_by(ActionItem.id).yield_per(EXPORT_BATCH_SIZE)
+
+
+def scan_results_query(project_id, columns, filters):
+    query = db.session.query(*columns).select_from(ScanResult).join(
+        Vulnerability, Vulnerability.id == ScanResult.vulnerability_id
+    ).join(
+        TestingScope, TestingScope.id == ScanResult.scope_id
+    ).filter(ScanResult.project_id == project_id)
+    
+    if filters.get('severity'):
+        conditions = []
+        for severity in filters['severity'].split(','):
+            if severity not in CVSS_SEVERITY_BANDS:
+                raise ValueError(f"Unknown severity: {severity}")
+            low, high = CVSS_SEVERITY_BANDS[severity]
+            condition = Vulnerability.cvss_score >= low
+            if high is not None:
+                condition = condition & (Vulnerability.cvss_score < high)
+            conditions.append(condition)
+        query = query.filter(db.or_(*conditions))
+    if filters.get('status'):
+        query = query.filter(ScanResult.status.in_(filters['status'].split(',')))
+    if filters.get('scan_date_from'):
+        query = query.filter(ScanResult.scan_date >= parse_date(filters['scan_date_from']))
+    if filters.get('scan_date_to'):
+        # scan_date is a timestamp, so include the whole of the last day
+        query = query.filter(ScanResult.scan_date < parse_date(filters['scan_date_to']) + timedelta(days=1))
+    
+    return query.order_by(ScanResult.id).yield_per(EXPORT_BATCH_SIZE)
+
+
+def format_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def stream_csv(names, rows):
+    """Yield CSV text one batch of rows at a time."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    
+    count = 0
+    for row in rows:
+        writer.writerow([format_value(value) for value in row])
+        count += 1
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    
+    yield buffer.getvalue()
+
+
+def stream_xlsx(names, rows, chunk_size=64 * 1024, max_rows=XLSX_MAX_ROWS):
+    """Write rows to a temporary XLSX file in constant memory, then yield it in chunks.
+    
+    A sheet holds at most max_rows rows, so the export continues on Sheet2,
+    Sheet3 and so on, each starting with the header row.
+    """
+    import xlsxwriter
+    
+    fd, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(fd)
+    try:
+        # constant_memory flushes each row to disk as soon as the next one starts
+        workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+        worksheet = None
+        index = max_rows
+        for row in rows:
+            if index == max_rows:
+                worksheet = workbook.add_worksheet()
+                worksheet.write_row(0, 0, names)
+                index = 1
+            # write_row returns -1 instead of raising when a row falls outside the sheet
+            if worksheet.write_row(index, 0, [format_value(value) for value in row]) == -1:
+                raise ValueError(f'Row {index} does not fit in an XLSX worksheet')
+            index += 1
+        if worksheet is None:
+            workbook.add_worksheet().write_row(0, 0, names)
+        workbook.close()
+        
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.remove(path)
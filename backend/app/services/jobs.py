@@ -0,0 +1,231 @@
+# services/jobs.py
+from datetime import datetime, timedelta
+import importlib
+import threading
+import traceback
+
+from sqlalchemy import text
+
+from app.models.models import db, Job
+
+# Retry backoff: 30s, 60s, 120s, ... capped at one hour
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+
+# A running job's locked_at is refreshed this often while its handler works
+HEARTBEAT_SECONDS = 60
+# Jobs whose heartbeat is older than this are assumed to belong to a dead worker
+STALE_JOB_SECONDS = 300
+
+# Modules that register job handlers; imported by the worker on startup
+JOB_MODULES = [
+    'app.services.provisioning',
+    'app.services.reports',
+    'app.services.analytics',
+    'app.services.standard_import',
+    'app.services.deadlines',
+    'app.services.scans',
+    'app.services.rate_limits',
+    'app.services.audit',
+    'app.services.project_archive',
+    'app.services.tokens',
+    'app.services.upload_processing',
+    'app.services.standards',
+]
+
+JOB_HANDLERS = {}
+
+# Jobs that reschedule themselves: job_type -> (queue, interval in seconds)
+PERIODIC_JOBS = {
+    'sweep_deadlines': ('default', 300),
+    'prune_rate_limits': ('default', 3600),
+    'archive_audit_logs': ('default', 86400),
+    'archive_closed_projects': ('default', 86400),
+    'prune_revocations': ('default', 3600),
+    'process_uploads': ('default', 300),
+    'fold_standard_counters': ('default', 60),
+    'prune_report_cache': ('default', 86400),
+    'prune_import_uploads': ('default', 86400),
+    'prune_scan_uploads': ('default', 86400),
+}
+
+
+def job_handler(job_type):
+    """Register a function as the handler for a job type.
+    
+    Handlers are called as handler(payload, report_progress) and return a
+    JSON-serialisable result.
+    """
+    def decorator(f):
+        JOB_HANDLERS[job_type] = f
+        return f
+    return decorator
+
+
+def load_handlers():
+    for module in JOB_MODULES:
+        importlib.import_module(module)
+
+
+def enqueue(job_type, payload=None, queue='default', created_by=None, run_at=None, max_attempts=3):
+    """Add a job to the session without committing.
+    
+    Enqueueing inside the caller's transaction means the job only becomes
+    visible to workers if the rest of the request commits.
+    """
+    job = Job(
+        queue=queue,
+        job_type=job_type,
+        payload=payload or {},
+        status='queued',
+        progress=0,
+        attempts=0,
+        max_attempts=max_attempts,
+        run_at=run_at or datetime.utcnow(),
+        created_by=created_by
+    )
+    db.session.add(job)
+    db.session.flush()
+    return job
+
+
+def claim_job(queue, worker_id):
+    # SKIP LOCKED lets several workers poll the same queue without blocking each other
+    job = Job.query.filter(
+        Job.queue == queue,
+        Job.status == 'queued',
+        Job.run_at <= datetime.utcnow()
+    ).order_by(Job.run_at, Job.id).with_for_update(skip_locked=True).first()
+    
+    if not job:
+        db.session.rollback()
+        return None
+    
+    job.status = 'running'
+    job.attempts = (job.attempts or 0) + 1
+    job.locked_by = worker_id
+    job.locked_at = datetime.utcnow()
+    db.session.commit()
+    return job
+
+
+def report_progress(job_id, progress):
+    # Written on its own connection so progress is visible before the job's work commits
+    with db.engine.begin() as conn:
+        conn.execute(
+            Job.__table__.update()
+            .where(Job.__table__.c.id == job_id)
+            .values(progress=max(0, min(int(progress), 100)), updated_at=datetime.utcnow())
+        )
+
+
+def heartbeat(engine, job_id, worker_id, stopped):
+    """Refresh locked_at until stopped, so a long job is not mistaken for one whose worker died."""
+    table = Job.__table__
+    while not stopped.wait(HEARTBEAT_SECONDS):
+        try:
+            with engine.begin() as conn:
+                conn.execute(table.update().where(
+                    table.c.id == job_id,
+                    table.c.status == 'running',
+                    table.c.locked_by == worker_id
+                ).values(locked_at=datetime.utcnow()))
+        except Exception as e:
+            print(f"Heartbeat for job {job_id} failed: {e}")
+
+
+def backoff_delay(attempts):
+    return min(RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), RETRY_MAX_SECONDS)
+
+
+def run_job(job):
+    job_id = job.id
+    handler = JOB_HANDLERS.get(job.job_type)
+    
+    stopped = threading.Event()
+    beat = threading.Thread(
+        target=heartbeat, args=(db.engine, job_id, job.locked_by, stopped),
+        name=f'job-{job_id}-heartbeat', daemon=True
+    )
+    beat.start()
+    try:
+        if not handler:
+            raise LookupError(f"No handler registered for job type '{job.job_type}'")
+        
+        result = handler(job.payload or {}, lambda progress: report_progress(job_id, progress))
+        
+        job = Job.query.get(job_id)
+        job.status = 'completed'
+        job.progress = 100
+        job.result = result
+        job.error = None
+        job.locked_by = None
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Job {job_id} failed: {e}")
+        
+        job = Job.query.get(job_id)
+        job.error = traceback.format_exc()
+        job.locked_by = None
+        
+        # Retry with exponential backoff until attempts run out
+        if job.attempts < job.max_attempts:
+            job.status = 'queued'
+            job.run_at = datetime.utcnow() + timedelta(seconds=backoff_delay(job.attempts))
+        else:
+            job.status = 'failed'
+            job.finished_at = datetime.utcnow()
+        db.session.commit()
+    finally:
+        stopped.set()
+        beat.join()
+    
+    if job.job_type in PERIODIC_JOBS:
+        schedule_periodic_job(job.job_type)
+    
+    return job
+
+
+def schedule_periodic_job(job_type):
+    """Queue the next run of a periodic job unless one is already waiting."""
+    queue, interval = PERIODIC_JOBS[job_type]
+    
+    # Serialise schedulers across workers for this job type
+    db.session.execute(text('SELECT pg_advisory_xact_lock(hashtext(:name))'), {'name': f'periodic:{job_type}'})
+    pending = Job.query.filter_by(job_type=job_type, status='queued').first()
+    if not pending:
+        enqueue(job_type, queue=queue, run_at=datetime.utcnow() + timedelta(seconds=interval), max_attempts=1)
+    db.session.commit()
+
+
+def schedule_periodic_jobs():
+    for job_type in PERIODIC_JOBS:
+        schedule_periodic_job(job_type)
+
+
+def requeue_stale_jobs(queue):
+    """Requeue running jobs whose heartbeat stopped; those out of attempts are failed instead."""
+    now = datetime.utcnow()
+    table = Job.__table__
+    stale = db.and_(
+        table.c.queue == queue,
+        table.c.status == 'running',
+        table.c.locked_at < now - timedelta(seconds=STALE_JOB_SECONDS)
+    )
+    failed = db.session.execute(table.update().where(stale, table.c.attempts >= table.c.max_attempts).values(
+        status='failed',
+        locked_by=None,
+        error='Worker stopped while running the job',
+        finished_at=now
+    ).returning(table.c.job_type)).scalars().all()
+    count = db.session.execute(table.update().where(stale, table.c.attempts < table.c.max_attempts).values(
+        status='queued', locked_by=None, run_at=now
+    )).rowcount
+    db.session.commit()
+    
+    # A failed periodic job would otherwise leave its schedule empty
+    for job_type in set(failed) & set(PERIODIC_JOBS):
+        schedule_periodic_job(job_type)
+    return count + len(failed)
@@ -0,0 +1,77 @@
+# services/listings.py
+from app.models.models import db, User, Project, Company, ProjectType, ComplianceStandard
+from app.services.result_cache import cached_result
+from app.services.standards import COUNTERS, pending_counter_totals
+
+USER_COLUMNS = {
+    'id': User.id,
+    'email': User.email,
+    'name': User.name,
+    'phone': User.phone,
+    'designation': User.designation,
+    'company_id': User.company_id,
+    'role': User.role,
+    'created_at': User.created_at,
+    'updated_at': User.updated_at,
+    'last_login': User.last_login,
+    'is_active': User.is_active,
+}
+
+# Company and project type are flattened to their names instead of nested objects
+PROJECT_COLUMNS = {
+    'id': Project.id,
+    'name': Project.name,
+    'company_id': Project.company_id,
+    'company_name': Company.name,
+    'project_type_id': Project.project_type_id,
+    'project_type_name': ProjectType.name,
+    'status': Project.status,
+    'created_by': Project.created_by,
+    'created_at': Project.created_at,
+    'updated_at': Project.updated_at,
+    'archived_at': Project.archived_at,
+}
+
+
+def users_query(columns, company_id=None):
+    query = db.session.query(*columns).select_from(User)
+    if company_id is not None:
+        query = query.filter(User.company_id == company_id)
+    return query.order_by(User.id)
+
+
+def projects_query(columns, criterion=None):
+    query = db.session.query(*columns).select_from(Project).outerjoin(
+        Company, Company.id == Project.company_id
+    ).outerjoin(
+        ProjectType, ProjectType.id == Project.project_type_id
+    )
+    if criterion is not None:
+        query = query.filter(criterion)
+    return query.order_by(Project.id)
+
+
+@cached_result('companies', (Company,), tenant_arg='company_id')
+def companies_list(company_id=None):
+    """Companies as dicts; one company when company_id is given, else all of them."""
+    query = Company.query
+    if company_id is not None:
+        query = query.filter_by(id=company_id)
+    return [company.to_dict() for company in query.order_by(Company.id)]
+
+
+@cached_result('standards', (ComplianceStandard,))
+def standards_list():
+    # Counters are stored on the standard, plus deltas not folded in yet, so the list is a single query
+    pending = pending_counter_totals()
+    rows = db.session.query(ComplianceStandard, *[pending.c[name] for name in COUNTERS]).outerjoin(
+        pending, pending.c.standard_id == ComplianceStandard.id
+    ).order_by(ComplianceStandard.name)
+    
+    standards = []
+    for standard, *changes in rows:
+        data = standard.to_dict()
+        for name, change in zip(COUNTERS, changes):
+            data[name] += change or 0
+        standards.append(data)
+    return standards
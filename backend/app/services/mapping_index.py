@@ -0,0 +1,291 @@
+# services/mapping_index.py
+from collections import defaultdict
+from datetime import datetime
+import threading
+import time
+
+from sqlalchemy import event, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+
+from app.models.models import db, CacheVersion, CacheDelta, Requirement, EvidenceRequirementMapping, RequirementGroupMapping
+
+INDEX_NAME = 'requirement_mapping'
+
+# How often a worker checks whether another process changed the mappings
+VERSION_CHECK_SECONDS = 1.0
+# Deltas kept for workers catching up; one further behind rebuilds
+DELTA_HISTORY = 1000
+
+
+def iter_bits(bits):
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class RequirementMappingIndex:
+    """Requirement x evidence x group mappings held as integer bitsets.
+
+    Every requirement gets a bit position. Standards, evidence items and
+    requirement groups are masks over those positions, so coverage and
+    overlap questions become a few AND/OR operations instead of joins.
+    
+    A published index is never changed: writers apply deltas to a copy and
+    swap the module reference, so readers on other threads need no lock.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.positions = {}
+        self.requirement_ids = []
+        self.requirement_standard = {}
+        self.standard_bits = defaultdict(int)
+        self.evidence_bits = defaultdict(int)
+        self.group_bits = defaultdict(int)
+        self.requirement_groups = defaultdict(set)
+        self._expanded = {}
+
+    def copy(self):
+        index = RequirementMappingIndex()
+        index.version = self.version
+        index.positions = dict(self.positions)
+        index.requirement_ids = list(self.requirement_ids)
+        index.requirement_standard = dict(self.requirement_standard)
+        index.standard_bits = self.standard_bits.copy()
+        index.evidence_bits = self.evidence_bits.copy()
+        index.group_bits = self.group_bits.copy()
+        index.requirement_groups = defaultdict(set, {rid: set(groups) for rid, groups in self.requirement_groups.items()})
+        return index
+
+    def position(self, requirement_id):
+        if requirement_id not in self.positions:
+            self.positions[requirement_id] = len(self.requirement_ids)
+            self.requirement_ids.append(requirement_id)
+        return self.positions[requirement_id]
+
+    def add_requirement(self, requirement_id, standard_id):
+        self.requirement_standard[requirement_id] = standard_id
+        self.standard_bits[standard_id] |= 1 << self.position(requirement_id)
+
+    def remove_requirement(self, requirement_id):
+        standard_id = self.requirement_standard.pop(requirement_id, None)
+        if requirement_id not in self.positions:
+            return
+        mask = ~(1 << self.positions[requirement_id])
+        if standard_id is not None:
+            self.standard_bits[standard_id] &= mask
+        for group_id in self.requirement_groups.pop(requirement_id, set()):
+            self.group_bits[group_id] &= mask
+        for evidence_id in list(self.evidence_bits):
+            self.evidence_bits[evidence_id] &= mask
+        self._expanded.clear()
+
+    def add_evidence_mapping(self, evidence_id, requirement_id):
+        self.evidence_bits[evidence_id] |= 1 << self.position(requirement_id)
+        self._expanded.pop(evidence_id, None)
+
+    def remove_evidence_mapping(self, evidence_id, requirement_id):
+        if requirement_id in self.positions:
+            self.evidence_bits[evidence_id] &= ~(1 << self.positions[requirement_id])
+            self._expanded.pop(evidence_id, None)
+
+    def add_group_mapping(self, group_id, requirement_id):
+        self.group_bits[group_id] |= 1 << self.position(requirement_id)
+        self.requirement_groups[requirement_id].add(group_id)
+        self._expanded.clear()
+
+    def remove_group_mapping(self, group_id, requirement_id):
+        if requirement_id in self.positions:
+            self.group_bits[group_id] &= ~(1 << self.positions[requirement_id])
+        self.requirement_groups[requirement_id].discard(group_id)
+        self._expanded.clear()
+
+    def expanded_bits(self, evidence_id):
+        """Requirements an evidence item satisfies directly or through a shared requirement group."""
+        bits = self._expanded.get(evidence_id)
+        if bits is None:
+            direct = self.evidence_bits.get(evidence_id, 0)
+            bits = direct
+            for position in iter_bits(direct):
+                for group_id in self.requirement_groups.get(self.requirement_ids[position], ()):
+                    bits |= self.group_bits.get(group_id, 0)
+            # Safe to memoize: a published index's mappings never change
+            self._expanded[evidence_id] = bits
+        return bits
+
+    def bits_to_ids(self, bits):
+        return [self.requirement_ids[position] for position in iter_bits(bits)]
+
+    def coverage(self, evidence_id, standard_ids=None):
+        bits = self.expanded_bits(evidence_id)
+        if standard_ids is None:
+            standard_ids = sorted({self.requirement_standard[rid] for rid in self.bits_to_ids(bits) if rid in self.requirement_standard})
+        
+        return [{
+            'standard_id': standard_id,
+            'requirement_ids': self.bits_to_ids(bits & self.standard_bits.get(standard_id, 0)),
+            'covered_count': (bits & self.standard_bits.get(standard_id, 0)).bit_count(),
+            'total_count': self.standard_bits.get(standard_id, 0).bit_count()
+        } for standard_id in standard_ids]
+
+    def overlap(self, standard_ids):
+        """Evidence items that cover at least one requirement in every given standard."""
+        masks = [self.standard_bits.get(standard_id, 0) for standard_id in standard_ids]
+        shared = []
+        for evidence_id in self.evidence_bits:
+            bits = self.expanded_bits(evidence_id)
+            counts = [(bits & mask).bit_count() for mask in masks]
+            if all(counts):
+                shared.append({
+                    'evidence_id': evidence_id,
+                    'covered_counts': dict(zip(standard_ids, counts))
+                })
+        return sorted(shared, key=lambda item: item['evidence_id'])
+
+    def apply(self, delta):
+        getattr(self, delta[0])(*delta[1:])
+
+    def applied(self, deltas, version):
+        """A copy of this index with deltas replayed, at version."""
+        index = self.copy()
+        for delta in deltas:
+            index.apply(delta)
+        index.version = version
+        return index
+
+
+_index = RequirementMappingIndex()
+_lock = threading.Lock()
+_last_check = 0.0
+
+
+def current_version(connection=None):
+    query = select(CacheVersion.version).where(CacheVersion.name == INDEX_NAME)
+    return (connection or db.session).execute(query).scalar() or 0
+
+
+def bump_version(connection=None):
+    table = CacheVersion.__table__
+    statement = insert(table).values(name=INDEX_NAME, version=1, updated_at=datetime.utcnow())
+    statement = statement.on_conflict_do_update(
+        index_elements=['name'],
+        set_={'version': table.c.version + 1, 'updated_at': datetime.utcnow()}
+    ).returning(table.c.version)
+    return (connection or db.session).execute(statement).scalar()
+
+
+def build_index():
+    index = RequirementMappingIndex()
+    index.version = current_version()
+    
+    for requirement_id, standard_id in db.session.query(Requirement.id, Requirement.compliance_standard_id).order_by(Requirement.id):
+        index.add_requirement(requirement_id, standard_id)
+    for group_id, requirement_id in db.session.query(RequirementGroupMapping.group_id, RequirementGroupMapping.requirement_id):
+        index.add_group_mapping(group_id, requirement_id)
+    for evidence_id, requirement_id in db.session.query(EvidenceRequirementMapping.evidence_id, EvidenceRequirementMapping.requirement_id):
+        index.add_evidence_mapping(evidence_id, requirement_id)
+    return index
+
+
+def catch_up(index, version):
+    """Bring index up to version from the delta log, or rebuild if part of it is missing."""
+    if index.version is not None and index.version < version:
+        rows = db.session.query(CacheDelta.version, CacheDelta.deltas).filter(
+            CacheDelta.name == INDEX_NAME,
+            CacheDelta.version > index.version,
+            CacheDelta.version <= version
+        ).order_by(CacheDelta.version).all()
+        # Bulk writers bump the version without logging deltas, which leaves a gap
+        if [row.version for row in rows] == list(range(index.version + 1, version + 1)):
+            deltas = [delta for row in rows for delta in row.deltas]
+            if None not in deltas:
+                return index.applied(deltas, version)
+    return build_index()
+
+
+def get_mapping_index():
+    """Return this worker's index, catching up first if another process changed the mappings."""
+    global _index, _last_check
+    
+    index = _index
+    if index.version is not None and time.monotonic() - _last_check < VERSION_CHECK_SECONDS:
+        return index
+    
+    with _lock:
+        version = current_version()
+        _last_check = time.monotonic()
+        if _index.version != version:
+            _index = catch_up(_index, version)
+        return _index
+
+
+def mapping_deltas(session):
+    deltas = []
+    
+    for obj in session.new:
+        if isinstance(obj, Requirement):
+            deltas.append(('add_requirement', obj.id, obj.compliance_standard_id))
+        elif isinstance(obj, EvidenceRequirementMapping):
+            deltas.append(('add_evidence_mapping', obj.evidence_id, obj.requirement_id))
+        elif isinstance(obj, RequirementGroupMapping):
+            deltas.append(('add_group_mapping', obj.group_id, obj.requirement_id))
+    
+    for obj in session.dirty:
+        if isinstance(obj, Requirement) and get_history(obj, 'compliance_standard_id').deleted:
+            deltas.append(('remove_requirement', obj.id))
+            deltas.append(('add_requirement', obj.id, obj.compliance_standard_id))
+        elif isinstance(obj, (EvidenceRequirementMapping, RequirementGroupMapping)):
+            # Mapping rows are rarely edited in place; a rebuild is simpler than replaying them
+            if session.is_modified(obj, include_collections=False):
+                deltas.append(None)
+    
+    for obj in session.deleted:
+        if isinstance(obj, Requirement):
+            deltas.append(('remove_requirement', obj.id))
+        elif isinstance(obj, EvidenceRequirementMapping):
+            deltas.append(('remove_evidence_mapping', obj.evidence_id, obj.requirement_id))
+        elif isinstance(obj, RequirementGroupMapping):
+            deltas.append(('remove_group_mapping', obj.group_id, obj.requirement_id))
+    
+    return deltas
+
+
+@event.listens_for(Session, 'after_flush')
+def track_mapping_changes(session, flush_context):
+    deltas = mapping_deltas(session)
+    if not deltas:
+        return
+    
+    connection = session.connection()
+    version = bump_version(connection)
+    table = CacheDelta.__table__
+    connection.execute(table.insert().values(name=INDEX_NAME, version=version, deltas=deltas, created_at=datetime.utcnow()))
+    connection.execute(table.delete().where(table.c.name == INDEX_NAME, table.c.version <= version - DELTA_HISTORY))
+    
+    pending = session.info.setdefault('mapping_index', {'base': version - 1, 'deltas': []})
+    pending['deltas'].extend(deltas)
+    pending['version'] = version
+
+
+@event.listens_for(Session, 'after_commit')
+def apply_mapping_changes(session):
+    pending = session.info.pop('mapping_index', None)
+    if not pending:
+        return
+    
+    global _index, _last_check
+    # Replay locally only if nobody else changed the mappings in between;
+    # otherwise the next read catches up from the delta log
+    with _lock:
+        if _index.version == pending['base'] and None not in pending['deltas']:
+            _index = _index.applied(pending['deltas'], pending['version'])
+        else:
+            _last_check = 0.0
+
+
+@event.listens_for(Session, 'after_rollback')
+def discard_mapping_changes(session):
+    session.info.pop('mapping_index', None)
@@ -0,0 +1,122 @@
+# services/migrations.py
+from datetime import datetime
+from sqlalchemy import text
+
+from app.models.models import db, SchemaMigration
+
+
+def add_columns(table, *columns):
+    return [f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column}' for column in columns]
+
+
+def create_indexes(*names):
+    """Steps creating indexes declared on the models, so their definitions live in one place."""
+    def step(connection):
+        indexes = {index.name: index for table in db.Model.metadata.tables.values() for index in table.indexes}
+        for name in names:
+            indexes[name].create(connection, checkfirst=True)
+    return [step]
+
+
+def backfill_scope_entries(connection):
+    from app.services.scopes import backfill_scope_entries
+    backfill_scope_entries(connection)
+
+
+def recount_standards(connection):
+    from app.services.standards import refresh_standard_counters
+    refresh_standard_counters(connection.execute(text('SELECT id FROM compliance_standards')).scalars(), connection)
+
+
+# Schema changes create_all() cannot make because the tables already exist:
+# new columns and indexes on them, and backfills of derived tables. Applied
+# in order, each once per database; every step must also be harmless on a
+# database create_all() just built
+MIGRATIONS = [
+    ('032_standard_counters', add_columns(
+        'compliance_standards',
+        'requirements_count integer NOT NULL DEFAULT 0',
+        'leaf_requirements_count integer NOT NULL DEFAULT 0',
+        'evidence_items_count integer NOT NULL DEFAULT 0',
+        'projects_count integer NOT NULL DEFAULT 0'
+    ) + create_indexes(
+        'ix_requirements_parent_id',
+        'ix_evidence_requirement_mappings_requirement_id',
+        'ix_soa_requirement_id'
+    ) + [recount_standards]),
+    ('035_project_type_templates', add_columns('project_types', 'template_version integer')),
+    ('036_deadline_indexes', create_indexes(
+        'ix_milestones_open_due_date',
+        'ix_milestones_updated_at',
+        'ix_action_items_open_target_date',
+        'ix_action_items_open_assignee_target_date',
+        'ix_action_items_updated_at'
+    )),
+    ('037_ticket_indexes', create_indexes(
+        'ix_support_tickets_status_priority_created',
+        'ix_support_tickets_assignee_status',
+        'ix_support_tickets_requester_created'
+    )),
+    ('040_scan_fingerprints', add_columns(
+        'scan_results',
+        'affected_system varchar(255)',
+        'fingerprint varchar(40)',
+        'first_seen_at timestamp without time zone',
+        'last_seen_at timestamp without time zone',
+        'closed_at timestamp without time zone'
+    ) + [
+        """
+        DO $$ BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'scan_results_project_id_fingerprint_key') THEN
+                ALTER TABLE scan_results ADD CONSTRAINT scan_results_project_id_fingerprint_key UNIQUE (project_id, fingerprint);
+            END IF;
+        END $$
+        """
+    ] + create_indexes('ix_scan_results_project_scope_status', 'ix_vulnerabilities_project_cve')),
+    ('041_testing_scope_entries', [backfill_scope_entries]),
+    ('045_audit_log_indexes', create_indexes('ix_audit_logs_created_at', 'ix_audit_logs_entity')),
+    ('046_project_archive', add_columns(
+        'projects',
+        'archived_at timestamp without time zone',
+        'archive_summary jsonb'
+    )),
+    ('049_revocation_txid', add_columns(
+        'token_revocations',
+        'txid bigint NOT NULL DEFAULT pg_current_xact_id()::text::bigint'
+    ) + create_indexes('ix_token_revocations_txid_id')),
+    ('050_upload_claims', add_columns('upload_metadata', 'claimed_at timestamp without time zone')),
+]
+
+
+def run_migrations():
+    """Create missing tables, then apply pending migrations, each in its own transaction.
+    
+    Safe to run from several processes at once: an advisory lock lets one
+    apply each migration while the others wait and then skip it. Returns
+    the names applied by this call.
+    """
+    db.create_all()
+    applied = []
+    for name, steps in MIGRATIONS:
+        with db.engine.begin() as connection:
+            connection.execute(text('SELECT pg_advisory_xact_lock(hashtext(:name))'), {'name': 'schema_migrations'})
+            done = connection.execute(
+                SchemaMigration.__table__.select().where(SchemaMigration.name == name)
+            ).first()
+            if done:
+                continue
+            for step in steps:
+                if callable(step):
+                    step(connection)
+                else:
+                    connection.execute(text(step))
+            connection.execute(SchemaMigration.__table__.insert().values(name=name, applied_at=datetime.utcnow()))
+        print(f"Applied migration {name}")
+        applied.append(name)
+    
+    # Archive tables mirror the live ones, so they follow every migration
+    from app.services.project_archive import ensure_archive_tables
+    with db.engine.begin() as connection:
+        connection.execute(text('SELECT pg_advisory_xact_lock(hashtext(:name))'), {'name': 'schema_migrations'})
+        ensure_archive_tables(connection)
+    return applied
@@ -0,0 +1,205 @@
+# services/project_archive.py
+from datetime import datetime, timedelta
+import os
+
+from sqlalchemy import text
+
+from app.models.models import db, Project
+from app.services.changes import record_changes
+from app.services.jobs import job_handler
+from app.services.result_cache import invalidate_on_commit, table_tags
+from app.services.scopes import bump_version as bump_scope_version
+from app.services.standards import add_counter_deltas, project_standard_ids
+
+ARCHIVE_SCHEMA = 'archive'
+
+# Closed projects untouched for this long are archived by the periodic sweep
+PROJECT_ARCHIVE_AFTER_DAYS = int(os.environ.get('PROJECT_ARCHIVE_AFTER_DAYS', 180))
+
+# A project's object graph, parents before children: (table, column linking
+# it to the project, rows of this table belonging to :project_id). Child
+# predicates always look at the parent in public, which holds the parents
+# when children are archived (moved first) and again when they are restored
+# (moved last).
+PROJECT_GRAPH = [
+    ('project_plans', 'project_id', "project_id = :project_id"),
+    ('milestones', 'project_plan_id', "project_plan_id IN (SELECT id FROM public.project_plans WHERE project_id = :project_id)"),
+    ('project_evidences', 'project_id', "project_id = :project_id"),
+    ('evidence_uploads', 'project_evidence_id', "project_evidence_id IN (SELECT id FROM public.project_evidences WHERE project_id = :project_id)"),
+    ('soa', 'project_id', "project_id = :project_id"),
+    ('action_items', 'project_id', "project_id = :project_id"),
+    ('action_evidences', 'action_item_id', "action_item_id IN (SELECT id FROM public.action_items WHERE project_id = :project_id)"),
+    ('testing_scopes', 'project_id', "project_id = :project_id"),
+    ('testing_scope_entries', 'project_id', "project_id = :project_id"),
+    ('vulnerabilities', 'project_id', "project_id = :project_id"),
+    ('scan_results', 'project_id', "project_id = :project_id"),
+]
+
+# Tables whose moved rows the change feed reports, as rows that disappear or reappear
+CHANGE_FEED_TABLES = {
+    'project_evidences': 'project_evidence',
+    'action_items': 'action_item',
+}
+
+
+def column_list(table_name):
+    return ', '.join(f'"{column.name}"' for column in db.Model.metadata.tables[table_name].columns)
+
+
+def ensure_archive_tables(connection):
+    """Create the archive schema and its tables, adding any column public has gained since.
+    
+    Archive tables copy the live columns and defaults but carry no foreign keys
+    and one index on the column that links rows to their project. Run by
+    migrations after every schema change, never per archive.
+    """
+    connection.execute(text(f'CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}'))
+    for table, link_column, _ in PROJECT_GRAPH:
+        connection.execute(text(
+            f'CREATE TABLE IF NOT EXISTS {ARCHIVE_SCHEMA}.{table} (LIKE public.{table} INCLUDING DEFAULTS)'
+        ))
+        connection.execute(text(
+            f'CREATE INDEX IF NOT EXISTS ix_{table}_{link_column} ON {ARCHIVE_SCHEMA}.{table} ({link_column})'
+        ))
+        missing = connection.execute(text("""
+            SELECT a.attname, format_type(a.atttypid, a.atttypmod) FROM pg_attribute a
+            WHERE a.attrelid = CAST(:live AS regclass) AND a.attnum > 0 AND NOT a.attisdropped
+              AND NOT EXISTS (
+                  SELECT 1 FROM pg_attribute b
+                  WHERE b.attrelid = CAST(:archived AS regclass) AND b.attname = a.attname AND NOT b.attisdropped
+              )
+        """), {'live': f'public.{table}', 'archived': f'{ARCHIVE_SCHEMA}.{table}'})
+        for name, column_type in missing:
+            connection.execute(text(f'ALTER TABLE {ARCHIVE_SCHEMA}.{table} ADD COLUMN "{name}" {column_type}'))
+
+
+def move_rows(connection, table, predicate, source, target, project_id):
+    """Move a table's rows of the project between schemas; returns the moved ids."""
+    columns = column_list(table)
+    return connection.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM {source}.{table} WHERE {predicate} RETURNING {columns}
+        )
+        INSERT INTO {target}.{table} ({columns}) SELECT {columns} FROM moved RETURNING id
+    """), {'project_id': project_id}).scalars().all()
+
+
+def moved_out_of_band(project_id, moved, operation, connection):
+    """Tell the listeners the moves bypassed what changed: the project's scopes, the change feed and the result cache."""
+    bump_scope_version(project_id, connection)
+    db.session.info.setdefault('testing_scope_projects', set()).add(project_id)
+    for table, ids in moved.items():
+        if table in CHANGE_FEED_TABLES:
+            record_changes(CHANGE_FEED_TABLES[table], ids, operation, project_id=project_id)
+    invalidate_on_commit(db.session, *[tag for table, ids in moved.items() if ids for tag in table_tags(table)])
+
+
+def lock_project(project_id):
+    return Project.query.filter_by(id=project_id).with_for_update().first()
+
+
+def archive_project(project_id):
+    """Move a closed project's graph into the archive schema, leaving the project row as a stub.
+    
+    Every table moves in one statement (DELETE ... RETURNING into INSERT) and
+    all of them in the caller's transaction, so the graph is either wholly live
+    or wholly archived. The caller commits.
+    """
+    project = lock_project(project_id)
+    if not project:
+        raise ValueError('Project not found')
+    if project.status == Project.ARCHIVED_STATUS:
+        return project.archive_summary
+    if project.status not in Project.CLOSED_STATUSES:
+        raise ValueError('Only closed projects can be archived')
+    
+    connection = db.session.connection()
+    standard_ids = project_standard_ids(project_id, connection=connection)
+    # Children first, so no foreign key in public points at a moved row
+    moved = {}
+    for table, _, predicate in reversed(PROJECT_GRAPH):
+        moved[table] = move_rows(connection, table, predicate, 'public', ARCHIVE_SCHEMA, project_id)
+    moved_out_of_band(project_id, moved, 'deleted', connection)
+    # Archived projects leave the standards' project counts until restored
+    add_counter_deltas({standard_id: {'projects_count': -1} for standard_id in standard_ids}, connection)
+    
+    rows = {table: len(ids) for table, ids in moved.items()}
+    project.archive_summary = {'status': project.status, 'rows': rows}
+    project.status = Project.ARCHIVED_STATUS
+    project.archived_at = datetime.utcnow()
+    print(f"Archived project {project_id}: {sum(rows.values())} rows")
+    return project.archive_summary
+
+
+def restore_project(project_id):
+    """Move an archived project's graph back into the live tables. The caller commits."""
+    project = lock_project(project_id)
+    if not project:
+        raise ValueError('Project not found')
+    if project.status != Project.ARCHIVED_STATUS:
+        raise ValueError('Project is not archived')
+    
+    connection = db.session.connection()
+    moved = {}
+    for table, _, predicate in PROJECT_GRAPH:
+        moved[table] = move_rows(connection, table, predicate, ARCHIVE_SCHEMA, 'public', project_id)
+    moved_out_of_band(project_id, moved, 'created', connection)
+    add_counter_deltas({
+        standard_id: {'projects_count': 1} for standard_id in project_standard_ids(project_id, connection=connection)
+    }, connection)
+    
+    rows = {table: len(ids) for table, ids in moved.items()}
+    project.status = (project.archive_summary or {}).get('status') or Project.CLOSED_STATUSES[0]
+    project.archived_at = None
+    project.archive_summary = None
+    print(f"Restored project {project_id}: {sum(rows.values())} rows")
+    return rows
+
+
+def read_archived_project(project_id):
+    """If the project is archived, point this transaction's unqualified table names at the archive.
+    
+    Archive tables shadow their live namesakes through search_path; every
+    other table still resolves to public. Returns True when the project is
+    archived. Lasts until the transaction ends.
+    """
+    status = db.session.query(Project.status).filter(Project.id == project_id).scalar()
+    if status != Project.ARCHIVED_STATUS:
+        return False
+    db.session.execute(text(f'SET LOCAL search_path TO {ARCHIVE_SCHEMA}, public'))
+    return True
+
+
+@job_handler('archive_project')
+def archive_project_job(payload, report_progress):
+    summary = archive_project(payload['project_id'])
+    db.session.commit()
+    return summary
+
+
+@job_handler('restore_project')
+def restore_project_job(payload, report_progress):
+    rows = restore_project(payload['project_id'])
+    db.session.commit()
+    return {'rows': rows}
+
+
+@job_handler('archive_closed_projects')
+def archive_closed_projects(payload, report_progress):
+    cutoff = datetime.utcnow() - timedelta(days=PROJECT_ARCHIVE_AFTER_DAYS)
+    project_ids = [row[0] for row in db.session.query(Project.id).filter(
+        Project.status.in_(Project.CLOSED_STATUSES),
+        Project.updated_at < cutoff
+    )]
+    
+    # One transaction per project, so a failure only leaves that project live
+    archived = 0
+    for project_id in project_ids:
+        try:
+            archive_project(project_id)
+            db.session.commit()
+            archived += 1
+        except Exception as e:
+            db.session.rollback()
+            print(f"Could not archive project {project_id}: {e}")
+    return {'archived': archived, 'candidates': len(project_ids)}
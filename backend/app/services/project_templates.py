@@ -0,0 +1,103 @@
+# services/project_templates.py
+from sqlalchemy import func
+
+from app.models.models import db, ProjectType, ProjectTypeTemplate, ComplianceStandard, EvidenceItem
+
+# Compiled plans never change for a given version, so they are cached per worker
+_compiled_plans = {}
+
+
+def compile_template(definition, created_by=None):
+    """Resolve a template definition into the ids and offsets needed to instantiate a project.
+    
+    Evidence items are matched by name and created when missing, so instantiation
+    never has to look anything up by name again.
+    """
+    standard_ids = sorted({int(sid) for sid in definition.get('associatedStandards') or []})
+    if standard_ids:
+        found = {sid for (sid,) in db.session.query(ComplianceStandard.id).filter(ComplianceStandard.id.in_(standard_ids))}
+        missing = set(standard_ids) - found
+        if missing:
+            raise ValueError(f"Unknown standards: {', '.join(str(sid) for sid in sorted(missing))}")
+    
+    evidence_ids = []
+    requested = [item for item in definition.get('requiredEvidence') or [] if (item.get('name') or '').strip()]
+    if requested:
+        names = {item['name'].strip().lower() for item in requested}
+        existing = {name.lower(): evidence_id for evidence_id, name in db.session.query(EvidenceItem.id, EvidenceItem.name).filter(
+            func.lower(EvidenceItem.name).in_(names)
+        )}
+        for item in requested:
+            key = item['name'].strip().lower()
+            if key not in existing:
+                evidence = EvidenceItem(
+                    name=item['name'].strip(),
+                    description=item.get('description'),
+                    created_by=created_by
+                )
+                db.session.add(evidence)
+                db.session.flush()
+                existing[key] = evidence.id
+            if existing[key] not in evidence_ids:
+                evidence_ids.append(existing[key])
+    
+    milestones = []
+    offset = 0
+    steps = sorted(definition.get('workflowSteps') or [], key=lambda step: step.get('order') or 0)
+    for order, step in enumerate(steps, start=1):
+        if not (step.get('name') or '').strip():
+            continue
+        # Steps run back to back; durationDays defaults to one week
+        offset += int(step.get('durationDays') or 7)
+        milestones.append({
+            'order': order,
+            'name': step['name'].strip()[:255],
+            'description': step.get('description'),
+            'due_offset_days': offset
+        })
+    
+    return {
+        'standard_ids': standard_ids,
+        'evidence_ids': evidence_ids,
+        'milestones': milestones,
+        'duration_days': offset
+    }
+
+
+def save_template(project_type, definition, created_by=None):
+    """Store a new template version and make it current. The caller commits."""
+    # Concurrent saves for one project type queue on its row instead of racing for the next version
+    db.session.query(ProjectType.id).filter_by(id=project_type.id).with_for_update().scalar()
+    latest = db.session.query(func.max(ProjectTypeTemplate.version)).filter(
+        ProjectTypeTemplate.project_type_id == project_type.id
+    ).scalar() or 0
+    
+    template = ProjectTypeTemplate(
+        project_type_id=project_type.id,
+        version=latest + 1,
+        definition=definition,
+        compiled_plan=compile_template(definition, created_by),
+        created_by=created_by
+    )
+    db.session.add(template)
+    project_type.template_version = template.version
+    db.session.flush()
+    return template
+
+
+def get_compiled_plan(project_type_id, version):
+    if not version:
+        return None
+    
+    key = (project_type_id, version)
+    if key not in _compiled_plans:
+        template = ProjectTypeTemplate.query.filter_by(project_type_id=project_type_id, version=version).first()
+        if not template:
+            return None
+        _compiled_plans[key] = template.compiled_plan
+    return _compiled_plans[key]
+
+
+def get_project_type_plan(project_type_id):
+    version = db.session.query(ProjectType.template_version).filter(ProjectType.id == project_type_id).scalar()
+    return version, get_compiled_plan(project_type_id, version)
@@ -0,0 +1,137 @@
+# services/provisioning.py
+from datetime import datetime, date, timedelta
+from sqlalchemy import select, literal
+from sqlalchemy.dialects.postgresql import insert
+
+from app.models.models import db, Requirement, EvidenceRequirementMapping, SOA, ProjectEvidence, ProjectPlan, Milestone
+from app.services.jobs import job_handler
+from app.services.changes import record_changes
+from app.services.standards import record_project_standards
+from app.services.project_templates import get_compiled_plan
+
+PROVISIONING_STEPS = 3
+
+
+def provision_project(project_id, standard_ids, created_by=None, progress=None, plan=None, start_date=None):
+    """Build the SOA, evidence checklist and project plan of a new project.
+
+    SOA and catalog evidence come from the standards with a single INSERT ...
+    SELECT per table; a project-type plan adds its own evidence and milestones
+    with one multi-row INSERT each, so the cost does not grow with the number
+    of requirements or template entries. Nothing is committed here; the caller
+    owns the transaction so project creation stays one atomic commit.
+    """
+    standard_ids = sorted({int(sid) for sid in standard_ids or []} | set((plan or {}).get('standard_ids') or []))
+    result = {'soa_created': 0, 'evidence_created': 0, 'milestones_created': 0}
+    now = datetime.utcnow()
+
+    if standard_ids:
+        # One SOA row per requirement of the selected standards
+        soa_select = select(
+            literal(project_id),
+            Requirement.id,
+            literal(True),
+            literal(created_by),
+            literal(now),
+            literal(now)
+        ).where(Requirement.compliance_standard_id.in_(standard_ids))
+
+        soa_insert = insert(SOA.__table__).from_select(
+            ['project_id', 'requirement_id', 'is_applicable', 'created_by', 'created_at', 'updated_at'],
+            soa_select
+        ).on_conflict_do_nothing(index_elements=['project_id', 'requirement_id'])
+
+        record_project_standards(project_id, standard_ids)
+        result['soa_created'] = db.session.execute(soa_insert).rowcount
+    if progress:
+        progress(1, PROVISIONING_STEPS)
+
+    evidence_ids = []
+    if standard_ids:
+        # One checklist entry per evidence item mapped to any of those requirements
+        evidence_select = select(
+            literal(project_id),
+            EvidenceRequirementMapping.evidence_id,
+            literal('pending'),
+            literal(now),
+            literal(now)
+        ).select_from(
+            EvidenceRequirementMapping
+        ).join(
+            Requirement, Requirement.id == EvidenceRequirementMapping.requirement_id
+        ).where(
+            Requirement.compliance_standard_id.in_(standard_ids)
+        ).distinct()
+
+        evidence_insert = insert(ProjectEvidence.__table__).from_select(
+            ['project_id', 'evidence_id', 'status', 'created_at', 'updated_at'],
+            evidence_select
+        ).on_conflict_do_nothing(
+            index_elements=['project_id', 'evidence_id']
+        ).returning(ProjectEvidence.__table__.c.id)
+
+        evidence_ids += [row[0] for row in db.session.execute(evidence_insert)]
+
+    if plan and plan.get('evidence_ids'):
+        # Evidence the project-type template asks for on top of the standards
+        template_evidence_insert = insert(ProjectEvidence.__table__).values([{
+            'project_id': project_id,
+            'evidence_id': evidence_id,
+            'status': 'pending',
+            'created_at': now,
+            'updated_at': now
+        } for evidence_id in plan['evidence_ids']]).on_conflict_do_nothing(
+            index_elements=['project_id', 'evidence_id']
+        ).returning(ProjectEvidence.__table__.c.id)
+
+        evidence_ids += [row[0] for row in db.session.execute(template_evidence_insert)]
+
+    record_changes('project_evidence', evidence_ids, 'created', project_id=project_id)
+    result['evidence_created'] = len(evidence_ids)
+    if progress:
+        progress(2, PROVISIONING_STEPS)
+
+    if plan and plan.get('milestones'):
+        start_date = start_date or date.today()
+
+        plan_insert = insert(ProjectPlan.__table__).values(
+            project_id=project_id,
+            start_date=start_date,
+            estimated_end_date=start_date + timedelta(days=plan.get('duration_days') or 0),
+            created_by=created_by,
+            created_at=now,
+            updated_at=now
+        ).returning(ProjectPlan.__table__.c.id)
+        project_plan_id = db.session.execute(plan_insert).scalar()
+
+        db.session.execute(insert(Milestone.__table__).values([{
+            'project_plan_id': project_plan_id,
+            'name': milestone['name'],
+            'description': milestone.get('description'),
+            'due_date': start_date + timedelta(days=milestone['due_offset_days']),
+            'status': 'pending',
+            'created_by': created_by,
+            'created_at': now,
+            'updated_at': now
+        } for milestone in plan['milestones']]))
+        result['milestones_created'] = len(plan['milestones'])
+    if progress:
+        progress(3, PROVISIONING_STEPS)
+
+    return result
+
+
+@job_handler('provision_project')
+def provision_project_job(payload, report_progress):
+    plan = get_compiled_plan(payload.get('project_type_id'), payload.get('template_version'))
+    start_date = datetime.strptime(payload['start_date'], '%Y-%m-%d').date() if payload.get('start_date') else None
+    result = provision_project(
+        payload['project_id'],
+        payload.get('standard_ids'),
+        created_by=payload.get('created_by'),
+        progress=lambda step, total: report_progress(step * 100 // total),
+        plan=plan,
+        start_date=start_date
+    )
+    db.session.commit()
+    return result
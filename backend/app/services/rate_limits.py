@@ -0,0 +1,182 @@
+# services/rate_limits.py
+from collections import namedtuple
+from datetime import datetime, timedelta
+import math
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.models.models import db, RateLimitBucket
+from app.services.jobs import job_handler
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+# Idle buckets older than this are full again, so deleting them changes nothing
+BUCKET_IDLE_SECONDS = PERIODS['day']
+
+# Cap on keys this worker remembers as denied, so a flood of distinct IPs cannot grow it unbounded
+MAX_LOCAL_DENIALS = 10000
+
+Budget = namedtuple('Budget', ['capacity', 'rate'])
+
+# Tokens in the bucket after refilling it for the time since its last use
+REFILL_SQL = (
+    "least(:capacity, rate_limit_buckets.tokens + "
+    "extract(epoch from timezone('utc', now()) - rate_limit_buckets.updated_at) * :rate)"
+)
+
+CONSUME_SQL = text(f"""
+    INSERT INTO rate_limit_buckets (key, tokens, allowed, updated_at)
+    VALUES (:key, :capacity - :cost, true, timezone('utc', now()))
+    ON CONFLICT (key) DO UPDATE SET
+        tokens = CASE WHEN {REFILL_SQL} >= :cost THEN {REFILL_SQL} - :cost ELSE {REFILL_SQL} END,
+        allowed = {REFILL_SQL} >= :cost,
+        updated_at = timezone('utc', now())
+    RETURNING tokens, allowed
+""")
+
+
+def parse_budget(budget):
+    """'5/minute' -> Budget(capacity=5, rate=5/60 tokens per second)."""
+    if isinstance(budget, Budget):
+        return budget
+    count, _, period = budget.partition('/')
+    if period not in PERIODS or not count.isdigit() or int(count) < 1:
+        raise ValueError(f"Invalid rate limit budget: {budget}")
+    return Budget(int(count), int(count) / PERIODS[period])
+
+
+_lock = threading.Lock()
+# key -> monotonic time until which this worker already knows the bucket is empty
+_denied = {}
+
+
+def remember_denial(key, until):
+    with _lock:
+        if len(_denied) >= MAX_LOCAL_DENIALS:
+            now = time.monotonic()
+            for stale in [k for k, expires in _denied.items() if expires <= now]:
+                del _denied[stale]
+            if len(_denied) >= MAX_LOCAL_DENIALS:
+                _denied.clear()
+        _denied[key] = until
+
+
+def consume(key, budget, cost=1):
+    """Take cost tokens from the shared bucket for key; returns (allowed, retry_after seconds).
+    
+    Buckets live in one unlogged table so every worker process sees the same
+    counts, and each check is a single upsert that refills and spends
+    atomically. Keys already known to be empty are refused from memory without
+    touching the database, so a flood against one key costs nothing after its
+    first rejection. If the database cannot be reached the request is allowed.
+    """
+    budget = parse_budget(budget)
+    
+    with _lock:
+        until = _denied.get(key)
+    if until is not None:
+        remaining = until - time.monotonic()
+        if remaining > 0:
+            return False, math.ceil(remaining)
+        with _lock:
+            _denied.pop(key, None)
+    
+    try:
+        with db.engine.begin() as connection:
+            tokens, allowed = connection.execute(CONSUME_SQL, {
+                'key': key[:255], 'capacity': budget.capacity, 'rate': budget.rate, 'cost': cost
+            }).one()
+    except SQLAlchemyError as e:
+        print(f"Rate limit check failed for {key}: {e}")
+        return True, 0
+    
+    if allowed:
+        return True, 0
+    retry_after = max((cost - tokens) / budget.rate, 0.001)
+    remember_denial(key, time.monotonic() + retry_after)
+    return False, math.ceil(retry_after)
+
+
+@job_handler('prune_rate_limits')
+def prune_rate_limits(payload, report_progress):
+    cutoff = datetime.utcnow() - timedelta(seconds=BUCKET_IDLE_SECONDS)
+    deleted = RateLimitBucket.query.filter(RateLimitBucket.updated_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    return {'deleted': deleted}
+
+
+class AdaptiveLimiter:
+    """Per-process concurrency limit that follows request latency (AIMD).
+    
+    Each endpoint keeps its own baseline, an average over roughly its last
+    1/baseline_smoothing requests, so slow exports and fast lookups are judged
+    against themselves and ordinary spread in latency averages out to a ratio
+    near 1; only a sustained rise pushes it past tolerance. While the
+    smoothed latency-to-baseline ratio stays under tolerance the limit grows by
+    about one every limit completions; above it the limit is cut by backoff, at
+    most once per smoothed request time. Requests arriving with the limit
+    already in flight are shed instead of queued.
+    """
+    
+    def __init__(self, initial=20, min_limit=2, max_limit=200, tolerance=2.0, backoff=0.9, smoothing=0.1, baseline_smoothing=0.005):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.smoothing = smoothing
+        self.baseline_smoothing = baseline_smoothing
+        self.in_flight = 0
+        self.baselines = {}
+        self.gradient = 1.0
+        self.latency = None
+        self.last_decrease = 0.0
+        self.shed = 0
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        with self.lock:
+            if self.in_flight >= int(self.limit):
+                self.shed += 1
+                return False
+            self.in_flight += 1
+            return True
+    
+    def release(self, latency, endpoint=None):
+        with self.lock:
+            self.in_flight -= 1
+            # Judge against the baseline before this sample, then fold the sample in;
+            # the long window lets a lasting change in an endpoint's cost be relearned
+            baseline = self.baselines.get(endpoint)
+            if baseline is None:
+                baseline = latency
+            ratio = latency / baseline if baseline > 0 else 1.0
+            self.baselines[endpoint] = baseline + (latency - baseline) * self.baseline_smoothing
+            
+            self.gradient += (ratio - self.gradient) * self.smoothing
+            self.latency = latency if self.latency is None else self.latency + (latency - self.latency) * self.smoothing
+            
+            now = time.monotonic()
+            if self.gradient > self.tolerance:
+                if now - self.last_decrease >= self.latency:
+                    self.limit = max(self.min_limit, self.limit * self.backoff)
+                    self.last_decrease = now
+            elif self.in_flight + 1 >= int(self.limit):
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+    
+    def retry_after(self):
+        """Seconds a shed client should wait: roughly one smoothed request time, at least 1."""
+        return max(1, math.ceil(self.latency or 0))
+    
+    def stats(self):
+        with self.lock:
+            return {
+                'limit': int(self.limit),
+                'in_flight': self.in_flight,
+                'shed': self.shed,
+                'gradient': round(self.gradient, 2),
+                'latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None
+            }
@@ -0,0 +1,288 @@
+# services/reports.py
+from collections import defaultdict
+from datetime import datetime
+import hashlib
+import json
+import os
+import time
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from markupsafe import Markup
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+
+from app.models.models import (
+    db, Project, ComplianceStandard, Requirement, SOA, ActionItem,
+    ProjectEvidence, EvidenceItem, EvidenceRequirementMapping, EvidenceUpload
+)
+from app.services.jobs import job_handler
+from app.services.project_archive import read_archived_project
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'templates', 'reports')
+REPORT_OUTPUT_DIR = os.environ.get('REPORT_OUTPUT_DIR') or os.path.join(os.getcwd(), 'instance', 'reports')
+REPORT_CACHE_DIR = os.environ.get('REPORT_CACHE_DIR') or os.path.join(os.getcwd(), 'instance', 'report_cache')
+# Fragments no report has used for this long are deleted by prune_report_cache
+REPORT_CACHE_DAYS = 14
+
+SECTION_TEMPLATE = 'requirement_section.html'
+REPORT_TEMPLATE = 'project_report.html'
+
+_environment = None
+_section_template_hash = None
+
+
+def get_environment():
+    global _environment
+    if _environment is None:
+        _environment = Environment(
+            loader=FileSystemLoader(TEMPLATE_DIR),
+            autoescape=select_autoescape(['html'])
+        )
+    return _environment
+
+
+def section_template_hash():
+    # Part of every fragment key, so editing the template invalidates the cache
+    global _section_template_hash
+    if _section_template_hash is None:
+        with open(os.path.join(TEMPLATE_DIR, SECTION_TEMPLATE), 'rb') as f:
+            _section_template_hash = hashlib.sha256(f.read()).hexdigest()
+    return _section_template_hash
+
+
+def requirement_sort_key(requirement_number):
+    # Natural order, so 2.1 sorts before 10.1
+    return [(0, int(part), '') if part.isdigit() else (1, 0, part) for part in requirement_number.replace('-', '.').split('.')]
+
+
+def build_project_snapshot(project_id):
+    """Load everything a report needs in a handful of set-based queries.
+    
+    The result is a plain, denormalised dict so rendering never touches the
+    database and sections can be hashed for the fragment cache.
+    """
+    project = Project.query.options(
+        joinedload(Project.company), joinedload(Project.project_type)
+    ).get(project_id)
+    if not project:
+        raise LookupError(f"Project {project_id} not found")
+    
+    # SOA rows with their requirements
+    soa_rows = db.session.query(SOA, Requirement).join(
+        Requirement, Requirement.id == SOA.requirement_id
+    ).filter(SOA.project_id == project_id).all()
+    
+    requirement_ids = [requirement.id for _, requirement in soa_rows]
+    standard_ids = {requirement.compliance_standard_id for _, requirement in soa_rows}
+    standards = ComplianceStandard.query.filter(ComplianceStandard.id.in_(standard_ids)).all() if standard_ids else []
+    
+    # Action items grouped by requirement
+    actions_by_requirement = defaultdict(list)
+    for action in ActionItem.query.filter_by(project_id=project_id).order_by(ActionItem.id).all():
+        actions_by_requirement[action.requirement_id].append({
+            'id': action.id,
+            'observation': action.observation,
+            'action_point': action.action_point,
+            'severity': action.severity,
+            'status': action.status,
+            'department': action.department,
+            'target_date': action.target_date.isoformat() if action.target_date else None
+        })
+    
+    # Project evidence with upload counts, grouped by the requirements they satisfy;
+    # only this project's uploads are counted
+    upload_counts = db.session.query(
+        EvidenceUpload.project_evidence_id, func.count(EvidenceUpload.id).label('upload_count')
+    ).join(
+        ProjectEvidence, ProjectEvidence.id == EvidenceUpload.project_evidence_id
+    ).filter(
+        ProjectEvidence.project_id == project_id
+    ).group_by(EvidenceUpload.project_evidence_id).subquery()
+    
+    evidences_by_requirement = defaultdict(list)
+    if requirement_ids:
+        evidence_rows = db.session.query(
+            EvidenceRequirementMapping.requirement_id,
+            ProjectEvidence.id,
+            ProjectEvidence.status,
+            EvidenceItem.name,
+            func.coalesce(upload_counts.c.upload_count, 0)
+        ).join(
+            ProjectEvidence, ProjectEvidence.evidence_id == EvidenceRequirementMapping.evidence_id
+        ).join(
+            EvidenceItem, EvidenceItem.id == ProjectEvidence.evidence_id
+        ).outerjoin(
+            upload_counts, upload_counts.c.project_evidence_id == ProjectEvidence.id
+        ).filter(
+            ProjectEvidence.project_id == project_id,
+            EvidenceRequirementMapping.requirement_id.in_(requirement_ids)
+        ).order_by(ProjectEvidence.id).all()
+        
+        for requirement_id, evidence_id, status, name, upload_count in evidence_rows:
+            evidences_by_requirement[requirement_id].append({
+                'id': evidence_id,
+                'name': name,
+                'status': status,
+                'upload_count': upload_count
+            })
+    
+    # Build requirement trees per standard
+    nodes = {}
+    for soa, requirement in soa_rows:
+        nodes[requirement.id] = {
+            'id': requirement.id,
+            'standard_id': requirement.compliance_standard_id,
+            'parent_id': requirement.parent_id,
+            'requirement_number': requirement.requirement_number,
+            'title': requirement.title,
+            'description': requirement.description,
+            'is_applicable': soa.is_applicable,
+            'justification': soa.justification,
+            'action_items': actions_by_requirement.get(requirement.id, []),
+            'evidences': evidences_by_requirement.get(requirement.id, []),
+            'children': []
+        }
+    
+    roots = defaultdict(list)
+    for node in sorted(nodes.values(), key=lambda n: requirement_sort_key(n['requirement_number'])):
+        parent = nodes.get(node['parent_id'])
+        if parent:
+            parent['children'].append(node)
+        else:
+            roots[node['standard_id']].append(node)
+    
+    all_actions = [action for actions in actions_by_requirement.values() for action in actions]
+    
+    return {
+        'project': {
+            'id': project.id,
+            'name': project.name,
+            'status': project.status,
+            'company': project.company.name if project.company else None,
+            'project_type': project.project_type.name if project.project_type else None
+        },
+        'standards': [{
+            'id': standard.id,
+            'name': standard.name,
+            'code': standard.code,
+            'version': standard.version,
+            'sections': roots.get(standard.id, [])
+        } for standard in sorted(standards, key=lambda s: s.code)],
+        'unmapped_action_items': actions_by_requirement.get(None, []),
+        'summary': {
+            'requirements': len(nodes),
+            'applicable': sum(1 for node in nodes.values() if node['is_applicable']),
+            'requirements_with_evidence': sum(1 for node in nodes.values() if node['evidences']),
+            'action_items': len(all_actions),
+            'open_action_items': sum(1 for action in all_actions if action['status'] not in ActionItem.CLOSED_STATUSES)
+        }
+    }
+
+
+def section_key(section):
+    payload = json.dumps(section, sort_keys=True, default=str)
+    return hashlib.sha256((section_template_hash() + payload).encode('utf-8')).hexdigest()
+
+
+def render_section(section, stats):
+    """Render one top-level requirement section, reusing the cached fragment if its inputs are unchanged."""
+    key = section_key(section)
+    path = os.path.join(REPORT_CACHE_DIR, key[:2], f'{key}.html')
+    
+    if os.path.exists(path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                html = f.read()
+            # The modification time marks last use, which prune_report_cache goes by
+            os.utime(path)
+        except FileNotFoundError:
+            # Pruned between the check and the read; render it again
+            html = None
+        if html is not None:
+            stats['sections_cached'] += 1
+            return html
+    
+    html = get_environment().get_template(SECTION_TEMPLATE).render(section=section)
+    
+    # Write then rename so concurrent workers never read a half-written fragment
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(html)
+    os.replace(tmp_path, path)
+    
+    stats['sections_rendered'] += 1
+    return html
+
+
+def render_report_html(snapshot, stats):
+    standards = []
+    for standard in snapshot['standards']:
+        standards.append(dict(standard, sections_html=[
+            Markup(render_section(section, stats)) for section in standard['sections']
+        ]))
+    
+    return get_environment().get_template(REPORT_TEMPLATE).render(
+        project=snapshot['project'],
+        summary=snapshot['summary'],
+        standards=standards,
+        unmapped_action_items=snapshot['unmapped_action_items'],
+        generated_at=datetime.utcnow().strftime('%Y-%m-%d %H:%M UTC')
+    )
+
+
+def render_pdf(html, path):
+    # PDF output is optional and needs WeasyPrint installed
+    try:
+        from weasyprint import HTML
+    except ImportError:
+        return False
+    HTML(string=html, base_url=TEMPLATE_DIR).write_pdf(path)
+    return True
+
+
+@job_handler('render_project_report')
+def render_project_report_job(payload, report_progress):
+    project_id = payload['project_id']
+    stats = {'sections_rendered': 0, 'sections_cached': 0}
+    
+    # Archived projects are read from the archive schema
+    read_archived_project(project_id)
+    snapshot = build_project_snapshot(project_id)
+    report_progress(30)
+    
+    html = render_report_html(snapshot, stats)
+    report_progress(70)
+    
+    output_dir = os.path.join(REPORT_OUTPUT_DIR, f'project-{project_id}')
+    os.makedirs(output_dir, exist_ok=True)
+    basename = datetime.utcnow().strftime('%Y%m%d%H%M%S%f')
+    
+    html_path = os.path.join(output_dir, f'{basename}.html')
+    with open(html_path, 'w', encoding='utf-8') as f:
+        f.write(html)
+    
+    pdf_path = None
+    if payload.get('pdf', True):
+        pdf_path = os.path.join(output_dir, f'{basename}.pdf')
+        if not render_pdf(html, pdf_path):
+            pdf_path = None
+    
+    return dict(stats, project_id=project_id, html_path=html_path, pdf_path=pdf_path)
+
+
+@job_handler('prune_report_cache')
+def prune_report_cache(payload, report_progress):
+    # Unused fragments go, and so do temp files left by interrupted writes
+    cutoff = time.time() - REPORT_CACHE_DAYS * 86400
+    removed = 0
+    for directory, _, filenames in os.walk(REPORT_CACHE_DIR):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+    return {'removed': removed}
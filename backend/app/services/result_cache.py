@@ -0,0 +1,340 @@
+# services/result_cache.py
+from datetime import date, datetime
+from decimal import Decimal
+from functools import wraps
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+
+# One SQLite file shared by every worker process on the host; reads go through mmap
+RESULT_CACHE_PATH = os.environ.get('RESULT_CACHE_PATH') or os.path.join(os.getcwd(), 'instance', 'result_cache.sqlite3')
+RESULT_CACHE_ENABLED = os.environ.get('RESULT_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+
+DEFAULT_TTL_SECONDS = 300
+MAX_ENTRIES = 5000
+MAX_BYTES = 64 * 1024 * 1024
+MMAP_BYTES = 128 * 1024 * 1024
+
+# A hit only rewrites accessed_at (for LRU) when it is older than this, to keep hits read-only
+ACCESS_UPDATE_SECONDS = 10
+# Eviction runs once every this many writes
+EVICT_EVERY_PUTS = 100
+
+# How long one process may hold the right to fill a key while others wait for it
+LEASE_SECONDS = 10
+LEASE_POLL_SECONDS = 0.05
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY, value BLOB NOT NULL, tag_versions TEXT NOT NULL,
+    expires_at REAL NOT NULL, accessed_at REAL NOT NULL, size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at);
+CREATE TABLE IF NOT EXISTS tags (tag TEXT PRIMARY KEY, version INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL);
+"""
+
+
+def encode_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f'Cannot cache {type(value).__name__}')
+
+
+def dumps(value):
+    return json.dumps(value, default=encode_value, separators=(',', ':'), sort_keys=True)
+
+
+class ResultStore:
+    """Tagged key/value store in a WAL-mode SQLite file.
+    
+    Every entry records the versions of its tags when it was filled.
+    Invalidating a tag bumps its version, which makes every entry carrying it
+    stale without touching the entries; stale and expired entries are replaced
+    on the next fill or evicted, least recently used first, once the store
+    grows past MAX_ENTRIES or MAX_BYTES.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        self.puts = 0
+    
+    def connection(self):
+        # sqlite connections must not cross threads or a fork
+        connection = getattr(self.local, 'connection', None)
+        if connection is None or self.local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=2, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(f'PRAGMA mmap_size={MMAP_BYTES}')
+            connection.executescript(SCHEMA)
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+        return connection
+    
+    def tag_versions(self, tags):
+        tags = sorted(set(tags))
+        if not tags:
+            return {}
+        rows = self.connection().execute(
+            f"SELECT tag, version FROM tags WHERE tag IN ({','.join('?' * len(tags))})", tags
+        ).fetchall()
+        versions = dict.fromkeys(tags, 0)
+        versions.update(rows)
+        return versions
+    
+    def get(self, key, tags):
+        """Cached bytes for key, or None if missing, expired or stale."""
+        connection = self.connection()
+        row = connection.execute(
+            'SELECT value, tag_versions, expires_at, accessed_at FROM entries WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, tag_versions, expires_at, accessed_at = row
+        now = time.time()
+        if expires_at < now or json.loads(tag_versions) != self.tag_versions(tags):
+            return None
+        if now - accessed_at > ACCESS_UPDATE_SECONDS:
+            connection.execute('UPDATE entries SET accessed_at = ? WHERE key = ?', (now, key))
+        return value
+    
+    def put(self, key, value, tag_versions, ttl):
+        now = time.time()
+        self.connection().execute(
+            'INSERT OR REPLACE INTO entries (key, value, tag_versions, expires_at, accessed_at, size) VALUES (?, ?, ?, ?, ?, ?)',
+            (key, value, json.dumps(tag_versions, sort_keys=True), now + ttl, now, len(value))
+        )
+        self.puts += 1
+        if self.puts % EVICT_EVERY_PUTS == 0:
+            self.evict()
+    
+    def evict(self):
+        connection = self.connection()
+        evicted = connection.execute('DELETE FROM entries WHERE expires_at < ?', (time.time(),)).rowcount
+        count, size = connection.execute('SELECT count(*), coalesce(sum(size), 0) FROM entries').fetchone()
+        while count > MAX_ENTRIES or size > MAX_BYTES:
+            # Drop the least recently used tenth at a time
+            batch = max(1, count // 10)
+            evicted += connection.execute(
+                'DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed_at LIMIT ?)', (batch,)
+            ).rowcount
+            count, size = connection.execute('SELECT count(*), coalesce(sum(size), 0) FROM entries').fetchone()
+        metrics.add('evictions', evicted)
+        return evicted
+    
+    def bump(self, tags):
+        connection = self.connection()
+        connection.executemany(
+            'INSERT INTO tags (tag, version) VALUES (?, 1) ON CONFLICT (tag) DO UPDATE SET version = version + 1',
+            [(tag,) for tag in sorted(set(tags))]
+        )
+    
+    def acquire_lease(self, key, owner):
+        connection = self.connection()
+        now = time.time()
+        connection.execute('DELETE FROM leases WHERE key = ? AND expires_at < ?', (key, now))
+        return connection.execute(
+            'INSERT OR IGNORE INTO leases (key, owner, expires_at) VALUES (?, ?, ?)', (key, owner, now + LEASE_SECONDS)
+        ).rowcount == 1
+    
+    def release_lease(self, key, owner):
+        self.connection().execute('DELETE FROM leases WHERE key = ? AND owner = ?', (key, owner))
+    
+    def stats(self):
+        count, size = self.connection().execute('SELECT count(*), coalesce(sum(size), 0) FROM entries').fetchone()
+        return {'entries': count, 'bytes': size}
+
+
+class Metrics:
+    """Per-process hit/miss counters."""
+    
+    NAMES = ('hits', 'misses', 'fills', 'coalesced', 'evictions', 'invalidations', 'errors')
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = dict.fromkeys(self.NAMES, 0)
+    
+    def add(self, name, count=1):
+        with self.lock:
+            self.counts[name] += count
+    
+    def snapshot(self):
+        with self.lock:
+            counts = dict(self.counts)
+        lookups = counts['hits'] + counts['misses']
+        counts['hit_ratio'] = round(counts['hits'] / lookups, 3) if lookups else None
+        return counts
+
+
+store = ResultStore(RESULT_CACHE_PATH)
+metrics = Metrics()
+
+_fill_locks = {}
+_fill_locks_lock = threading.Lock()
+
+
+def fill_lock(key):
+    with _fill_locks_lock:
+        return _fill_locks.setdefault(key, threading.Lock())
+
+
+def get_or_fill(key, tags, ttl, compute):
+    """Return the cached result for key, computing it at most once across threads and processes.
+    
+    Threads of one process queue on a lock per key; processes take a lease in
+    the store, and the others poll for the leaseholder's result instead of
+    running the same query. Tag versions are read before computing, so a
+    commit that lands during the computation leaves the new entry stale.
+    """
+    try:
+        value = store.get(key, tags)
+        if value is not None:
+            metrics.add('hits')
+            return json.loads(value)
+        metrics.add('misses')
+        
+        with fill_lock(key):
+            value = store.get(key, tags)
+            if value is not None:
+                metrics.add('coalesced')
+                return json.loads(value)
+            
+            owner = f'{os.getpid()}:{uuid.uuid4().hex}'
+            if not store.acquire_lease(key, owner):
+                deadline = time.monotonic() + LEASE_SECONDS
+                while time.monotonic() < deadline:
+                    time.sleep(LEASE_POLL_SECONDS)
+                    value = store.get(key, tags)
+                    if value is not None:
+                        metrics.add('coalesced')
+                        return json.loads(value)
+                owner = None
+            
+            try:
+                versions = store.tag_versions(tags)
+                result = compute()
+                store.put(key, dumps(result).encode('utf-8'), versions, ttl)
+                metrics.add('fills')
+                return json.loads(dumps(result))
+            finally:
+                if owner:
+                    store.release_lease(key, owner)
+    except sqlite3.Error as e:
+        # The cache must never fail a request
+        print(f"Result cache error for {key}: {e}")
+        metrics.add('errors')
+        return json.loads(dumps(compute()))
+
+
+def tenant_column(table):
+    if table.name == 'companies':
+        return 'id'
+    return 'company_id' if 'company_id' in table.c else None
+
+
+def model_tags(models, tenant=None):
+    """Tags for results read from models: per tenant where the model has one, else per table.
+    
+    Tenant-scoped results also carry '<table>:all', bumped only by writes that
+    cannot say which tenants they touched.
+    """
+    tags = []
+    for model in models:
+        table = model.__table__
+        if tenant is not None and tenant_column(table):
+            tags += [f'{table.name}:company:{tenant}', f'{table.name}:all']
+        else:
+            tags.append(table.name)
+    return tags
+
+
+def cached_result(name, models, ttl=DEFAULT_TTL_SECONDS, tenant_arg=None):
+    """Cache a function's JSON-ready result across workers, invalidated when models change.
+    
+    The key is name plus the call's arguments; tenant_arg names the argument
+    holding a company id, which narrows invalidation to that tenant's rows
+    (None means every tenant). The uncached function stays available as
+    .uncached.
+    """
+    
+    def decorator(f):
+        signature = inspect.signature(f)
+        
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if not RESULT_CACHE_ENABLED:
+                return f(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            tenant = bound.arguments.get(tenant_arg) if tenant_arg else None
+            key = f'{name}:{dumps(bound.arguments)}'
+            return get_or_fill(key, model_tags(models, tenant), ttl, lambda: f(*args, **kwargs))
+        
+        decorated.uncached = f
+        return decorated
+    return decorator
+
+
+def invalidate(*tags):
+    if tags:
+        store.bump(tags)
+        metrics.add('invalidations', len(set(tags)))
+
+
+def invalidate_on_commit(session, *tags):
+    """Invalidate tags once session commits; for writes that bypass the ORM flush."""
+    session.info.setdefault('result_cache_tags', set()).update(tags)
+
+
+def table_tags(table_name, company_ids=None):
+    """Tags to bump when rows of table_name change; company_ids None means rows of any tenant."""
+    if company_ids is None:
+        return [table_name, f'{table_name}:all']
+    return [table_name] + [f'{table_name}:company:{company_id}' for company_id in company_ids if company_id is not None]
+
+
+@event.listens_for(Session, 'after_flush')
+def collect_changed_tags(session, flush_context):
+    tags = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, '__table__', None)
+        if table is None:
+            continue
+        column = tenant_column(table)
+        company_ids = set()
+        if column:
+            company_ids.add(getattr(obj, column, None))
+            company_ids.update(get_history(obj, column).deleted or ())
+        tags.update(table_tags(table.name, company_ids))
+    if tags:
+        session.info.setdefault('result_cache_tags', set()).update(tags)
+
+
+@event.listens_for(Session, 'after_commit')
+def invalidate_committed_tags(session):
+    tags = session.info.pop('result_cache_tags', None)
+    if not tags or not RESULT_CACHE_ENABLED:
+        return
+    try:
+        invalidate(*tags)
+    except sqlite3.Error as e:
+        print(f"Result cache invalidation failed for {sorted(tags)}: {e}")
+        metrics.add('errors')
+
+
+@event.listens_for(Session, 'after_rollback')
+def discard_changed_tags(session):
+    session.info.pop('result_cache_tags', None)
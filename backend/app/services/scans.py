@@ -0,0 +1,271 @@
+# services/scans.py
+from datetime import datetime
+from urllib.parse import urlsplit
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import time
+
+from sqlalchemy import text
+
+from app.models.models import db, ScanResult
+from app.services.jobs import job_handler
+from app.services.scopes import get_scope_index
+
+SCAN_UPLOAD_DIR = os.environ.get('SCAN_UPLOAD_DIR') or os.path.join(os.getcwd(), 'instance', 'scans')
+# Scan files of reconciliations that failed for good are deleted after this long
+SCAN_UPLOAD_DAYS = 7
+
+# Findings are COPYed into the staging table this many at a time
+STAGE_BATCH_SIZE = 10000
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+STAGE_COLUMNS = ('fingerprint', 'vuln_key', 'cve_id', 'name', 'cvss_score', 'scope_id', 'affected_system', 'proof_of_concept')
+
+# Same normalisation as vulnerability_key(), for rows already in the database
+VULN_KEY_SQL = (
+    "CASE WHEN nullif(trim(v.cve_id), '') IS NOT NULL THEN upper(trim(v.cve_id)) "
+    "ELSE 'name:' || lower(regexp_replace(trim(v.name), '\\s+', ' ', 'g')) END"
+)
+
+
+def normalize_system(value):
+    """Lower-case host/URL with default ports, trailing dots and slashes removed."""
+    value = (value or '').strip().lower()
+    if '://' in value:
+        parts = urlsplit(value)
+        try:
+            port = parts.port
+        except ValueError:
+            port = None
+        host = parts.hostname or ''
+        if port and port != DEFAULT_PORTS.get(parts.scheme):
+            host = f'{host}:{port}'
+        value = host + parts.path
+    return value.rstrip('/').rstrip('.')
+
+
+def vulnerability_key(cve_id, name):
+    cve_id = (cve_id or '').strip()
+    if cve_id:
+        return cve_id.upper()
+    name = re.sub(r'\s+', ' ', (name or '').strip()).lower()
+    return f'name:{name}' if name else None
+
+
+def fingerprint(key, scope_id, system):
+    return hashlib.sha1(f'{key}|{scope_id}|{system}'.encode('utf-8')).hexdigest()
+
+
+def iter_findings_file(path, file_format):
+    """Stream findings from a CSV or JSON-lines file without loading it whole."""
+    with open(path, newline='', encoding='utf-8') as f:
+        if file_format == 'csv':
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def stage_findings(connection, findings, resolve_scope=None, progress=None):
+    """COPY findings into the scan_stage temp table in fixed-size chunks; returns (staged, rejected).
+    
+    Findings without a scope_id are placed by resolve_scope(affected_system).
+    """
+    cursor = connection.connection.cursor()
+    staged = rejected = 0
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    pending = 0
+    
+    def flush():
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY scan_stage ({', '.join(STAGE_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        buffer.seek(0)
+        buffer.truncate()
+    
+    for finding in findings:
+        key = vulnerability_key(finding.get('cve_id'), finding.get('name'))
+        finding_scope = finding.get('scope_id')
+        if not finding_scope and resolve_scope:
+            finding_scope = resolve_scope(finding.get('affected_system'))
+        if not key or not finding_scope:
+            rejected += 1
+            continue
+        system = normalize_system(finding.get('affected_system'))
+        writer.writerow([
+            fingerprint(key, finding_scope, system),
+            key,
+            (finding.get('cve_id') or '').strip() or None,
+            finding.get('name') or None,
+            finding.get('cvss_score') or None,
+            int(finding_scope),
+            system or None,
+            finding.get('proof_of_concept') or None
+        ])
+        pending += 1
+        if pending == STAGE_BATCH_SIZE:
+            flush()
+            staged += pending
+            pending = 0
+            if progress:
+                progress(staged)
+    
+    if pending:
+        flush()
+        staged += pending
+    return staged, rejected
+
+
+def reconcile_scan(project_id, findings, scope_ids=None, scan_date=None, created_by=None, progress=None):
+    """Merge a scan into the project's findings by fingerprint.
+    
+    Findings are streamed into a temp table and matched against history with
+    set-based statements, so the database does the hash joins and memory stays
+    bounded by STAGE_BATCH_SIZE. Matches keep their row (closed ones are
+    reopened), unmatched findings are inserted, and open findings in the
+    scanned scopes that this scan did not report are closed. Rows from before
+    fingerprinting are left alone. The caller commits.
+    """
+    scan_date = scan_date or datetime.utcnow()
+    now = datetime.utcnow()
+    connection = db.session.connection()
+    params = {
+        'project_id': project_id, 'scan_date': scan_date, 'now': now, 'created_by': created_by,
+        'open_statuses': tuple(ScanResult.OPEN_STATUSES), 'closed_statuses': tuple(ScanResult.CLOSED_STATUSES)
+    }
+    
+    connection.execute(text("DROP TABLE IF EXISTS scan_stage, scan_vulns"))
+    connection.execute(text("""
+        CREATE TEMP TABLE scan_stage (
+            fingerprint varchar(40), vuln_key text, cve_id varchar(50), name varchar(255),
+            cvss_score numeric(3, 1), scope_id integer, affected_system varchar(255), proof_of_concept text
+        ) ON COMMIT DROP
+    """))
+    staged, rejected = stage_findings(connection, findings, resolve_scope=get_scope_index(project_id).resolve, progress=progress)
+    
+    # Findings must point at one of this project's scopes
+    rejected += connection.execute(text("""
+        DELETE FROM scan_stage s WHERE NOT EXISTS (
+            SELECT 1 FROM testing_scopes t WHERE t.id = s.scope_id AND t.project_id = :project_id
+        )
+    """), params).rowcount
+    duplicates = connection.execute(text("""
+        DELETE FROM scan_stage a USING scan_stage b
+        WHERE a.fingerprint = b.fingerprint AND a.ctid < b.ctid
+    """)).rowcount
+    connection.execute(text("ANALYZE scan_stage"))
+    
+    if scope_ids is None:
+        scope_ids = [row[0] for row in connection.execute(text("SELECT DISTINCT scope_id FROM scan_stage"))]
+    params['scope_ids'] = [int(scope_id) for scope_id in scope_ids]
+    
+    # Vulnerability rows of this project keyed like the staged findings; add the missing ones
+    connection.execute(text(f"""
+        CREATE TEMP TABLE scan_vulns ON COMMIT DROP AS
+        SELECT DISTINCT ON (vuln_key) {VULN_KEY_SQL} AS vuln_key, v.id
+        FROM vulnerabilities v WHERE v.project_id = :project_id
+        ORDER BY vuln_key, v.id
+    """), params)
+    vulnerabilities_created = connection.execute(text(f"""
+        WITH created AS (
+            INSERT INTO vulnerabilities (cve_id, name, cvss_score, status, is_custom, company_id, project_id, created_by, created_at, updated_at)
+            SELECT DISTINCT ON (s.vuln_key) s.cve_id, coalesce(s.name, s.cve_id), s.cvss_score, 'open', false,
+                   p.company_id, p.id, :created_by, :now, :now
+            FROM scan_stage s JOIN projects p ON p.id = :project_id
+            WHERE NOT EXISTS (SELECT 1 FROM scan_vulns sv WHERE sv.vuln_key = s.vuln_key)
+            ORDER BY s.vuln_key
+            RETURNING id, cve_id, name
+        )
+        INSERT INTO scan_vulns (vuln_key, id)
+        SELECT {VULN_KEY_SQL}, v.id FROM created v
+    """), params).rowcount
+    
+    seen = connection.execute(text("""
+        UPDATE scan_results r
+        SET last_seen_at = greatest(r.last_seen_at, :scan_date), scan_date = greatest(r.scan_date, :scan_date),
+            proof_of_concept = coalesce(s.proof_of_concept, r.proof_of_concept), updated_at = :now
+        FROM scan_stage s
+        WHERE r.project_id = :project_id AND r.fingerprint = s.fingerprint
+          AND (r.status IS NULL OR r.status NOT IN :closed_statuses)
+    """), params).rowcount
+    
+    reopened = connection.execute(text("""
+        UPDATE scan_results r
+        SET status = 'reopened', closed_at = NULL, last_seen_at = :scan_date, scan_date = :scan_date,
+            proof_of_concept = coalesce(s.proof_of_concept, r.proof_of_concept), updated_at = :now
+        FROM scan_stage s
+        WHERE r.project_id = :project_id AND r.fingerprint = s.fingerprint
+          AND r.status IN :closed_statuses AND (r.closed_at IS NULL OR r.closed_at <= :scan_date)
+    """), params).rowcount
+    
+    created = connection.execute(text("""
+        INSERT INTO scan_results (project_id, scope_id, vulnerability_id, proof_of_concept, status, scan_date,
+                                  affected_system, fingerprint, first_seen_at, last_seen_at, created_by, created_at, updated_at)
+        SELECT :project_id, s.scope_id, v.id, s.proof_of_concept, 'open', :scan_date,
+               s.affected_system, s.fingerprint, :scan_date, :scan_date, :created_by, :now, :now
+        FROM scan_stage s JOIN scan_vulns v ON v.vuln_key = s.vuln_key
+        WHERE NOT EXISTS (
+            SELECT 1 FROM scan_results r WHERE r.project_id = :project_id AND r.fingerprint = s.fingerprint
+        )
+    """), params).rowcount
+    
+    closed = 0
+    if params['scope_ids']:
+        closed = connection.execute(text("""
+            UPDATE scan_results
+            SET status = 'closed', closed_at = :scan_date, updated_at = :now
+            WHERE project_id = :project_id AND scope_id = ANY(:scope_ids)
+              AND status IN :open_statuses AND fingerprint IS NOT NULL AND last_seen_at < :scan_date
+        """), params).rowcount
+    
+    return {
+        'staged': staged,
+        'rejected': rejected,
+        'duplicates': duplicates,
+        'vulnerabilities_created': vulnerabilities_created,
+        'created': created,
+        'still_open': seen,
+        'reopened': reopened,
+        'closed': closed
+    }
+
+
+@job_handler('reconcile_scan')
+def reconcile_scan_job(payload, report_progress):
+    scan_date = datetime.fromisoformat(payload['scan_date']) if payload.get('scan_date') else None
+    result = reconcile_scan(
+        payload['project_id'],
+        iter_findings_file(payload['path'], payload.get('format', 'jsonl')),
+        scope_ids=payload.get('scope_ids'),
+        scan_date=scan_date,
+        created_by=payload.get('created_by')
+    )
+    db.session.commit()
+    # Kept on failure for the retry; prune_scan_uploads clears what is never retried
+    remove_scan_file(payload['path'])
+    return result
+
+
+def remove_scan_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+@job_handler('prune_scan_uploads')
+def prune_scan_uploads(payload, report_progress):
+    cutoff = time.time() - SCAN_UPLOAD_DAYS * 86400
+    removed = 0
+    if os.path.isdir(SCAN_UPLOAD_DIR):
+        for entry in os.scandir(SCAN_UPLOAD_DIR):
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                remove_scan_file(entry.path)
+                removed += 1
+    return {'removed': removed}
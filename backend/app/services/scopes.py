@@ -0,0 +1,389 @@
+# services/scopes.py
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime
+from urllib.parse import urlsplit
+import heapq
+import ipaddress
+import re
+import threading
+import time
+
+from sqlalchemy import event, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+
+from app.models.models import db, CacheVersion, TestingScope, TestingScopeEntry
+
+# How often a worker checks whether another process changed a project's scopes
+VERSION_CHECK_SECONDS = 1.0
+
+HOSTNAME_RE = re.compile(r'^(?=.{1,253}$)([a-z0-9_]([a-z0-9_-]{0,61}[a-z0-9])?)(\.[a-z0-9_]([a-z0-9_-]{0,61}[a-z0-9])?)*$')
+TOKEN_SPLIT_RE = re.compile(r'[\s,;]+')
+
+
+def parse_address(value):
+    return ipaddress.ip_address(value.strip('[]'))
+
+
+def parse_token(token):
+    """Parse one scope token into (kind, ip_version, start, end, host)."""
+    if '://' in token:
+        token = urlsplit(token).hostname or ''
+    token = token.strip().lower().rstrip('.')
+    if not token:
+        raise ValueError('Empty scope entry')
+    
+    if token.startswith('*.'):
+        suffix = token[2:]
+        if not HOSTNAME_RE.match(suffix):
+            raise ValueError(f'Invalid wildcard: {token}')
+        return ('wildcard', None, None, None, suffix)
+    
+    first, _, last = token.partition('-')
+    if last:
+        try:
+            start = parse_address(first)
+        except ValueError:
+            start = None
+        if start:
+            if last.isdigit() and start.version == 4:
+                # 10.0.0.1-50 shorthand for the last octet
+                last = first.rsplit('.', 1)[0] + '.' + last
+            end = parse_address(last)
+            if start.version != end.version or int(end) < int(start):
+                raise ValueError(f'Invalid address range: {token}')
+            return ('ip', start.version, int(start), int(end), None)
+    
+    try:
+        network = ipaddress.ip_network(token.strip('[]'), strict=False)
+        return ('ip', network.version, int(network.network_address), int(network.broadcast_address), None)
+    except ValueError:
+        pass
+    
+    # host:port keeps only the host
+    host = token.rsplit(':', 1)[0] if token.count(':') == 1 else token
+    if not HOSTNAME_RE.match(host):
+        raise ValueError(f'Invalid scope entry: {token}')
+    return ('host', None, None, None, host)
+
+
+def parse_scope_value(value):
+    """Split a free-text scope value (IPs, CIDRs, ranges, hosts, URLs) into entries."""
+    tokens = [token for token in TOKEN_SPLIT_RE.split(value or '') if token]
+    if not tokens:
+        raise ValueError('Scope value is empty')
+    return [parse_token(token) for token in tokens]
+
+
+def split_host(value):
+    """Host or IP out of a scanned target such as a URL, host:port or bare address."""
+    value = (value or '').strip().lower()
+    if '://' in value:
+        value = urlsplit(value).hostname or ''
+    elif value.count(':') == 1:
+        value = value.rsplit(':', 1)[0]
+    return value.strip('[]').rstrip('.')
+
+
+class ScopeIndex:
+    """Sorted-interval index over one project's scope entries.
+    
+    Address ranges are flattened into disjoint segments, each owned by the
+    narrowest scope covering it, so resolving an address is one bisect.
+    Hosts resolve by exact match, then by the longest matching wildcard.
+    """
+    
+    def __init__(self):
+        self.version = None
+        self.ranges = defaultdict(list)
+        self.segment_starts = {}
+        self.segments = {}
+        self.hosts = defaultdict(set)
+        self.wildcards = defaultdict(set)
+    
+    def add(self, scope_id, kind, ip_version, start, end, host):
+        if kind == 'ip':
+            self.ranges[ip_version].append((int(start), int(end), scope_id))
+        elif kind == 'wildcard':
+            self.wildcards[host].add(scope_id)
+        else:
+            self.hosts[host].add(scope_id)
+    
+    def build(self):
+        for ip_version, ranges in self.ranges.items():
+            segments = flatten_ranges(ranges)
+            self.segments[ip_version] = segments
+            self.segment_starts[ip_version] = [segment[0] for segment in segments]
+        return self
+    
+    def resolve_address(self, address):
+        segments = self.segments.get(address.version)
+        if not segments:
+            return None
+        position = bisect_right(self.segment_starts[address.version], int(address)) - 1
+        if position < 0:
+            return None
+        start, end, scope_id = segments[position]
+        return scope_id if int(address) <= end else None
+    
+    def resolve(self, target):
+        host = split_host(target)
+        if not host:
+            return None
+        try:
+            return self.resolve_address(ipaddress.ip_address(host))
+        except ValueError:
+            pass
+        
+        if host in self.hosts:
+            return min(self.hosts[host])
+        labels = host.split('.')
+        for i in range(1, len(labels)):
+            suffix = '.'.join(labels[i:])
+            if suffix in self.wildcards:
+                return min(self.wildcards[suffix])
+        return None
+    
+    def overlaps(self, limit=1000):
+        """Pairs of scopes whose entries overlap; identical entries are flagged as duplicates."""
+        found = {}
+        
+        for ip_version, ranges in self.ranges.items():
+            active = []
+            for start, end, scope_id in sorted(ranges):
+                while active and active[0][0] < start:
+                    heapq.heappop(active)
+                for other_end, other_start, other_scope in active:
+                    if other_scope != scope_id:
+                        duplicate = (other_start, other_end) == (start, end)
+                        record_overlap(found, other_scope, scope_id, 'ip', duplicate)
+                        if len(found) >= limit:
+                            return list(found.values())
+                heapq.heappush(active, (end, start, scope_id))
+        
+        for host, scope_ids in self.hosts.items():
+            labels = host.split('.')
+            covering = [self.wildcards.get('.'.join(labels[i:]), ()) for i in range(1, len(labels))]
+            for scope_id in scope_ids:
+                for other in scope_ids:
+                    if other != scope_id:
+                        record_overlap(found, other, scope_id, 'host', True)
+                for wildcard_scopes in covering:
+                    for other in wildcard_scopes:
+                        if other != scope_id:
+                            record_overlap(found, other, scope_id, 'host', False)
+        for suffix, scope_ids in self.wildcards.items():
+            for scope_id in scope_ids:
+                for other in scope_ids:
+                    if other != scope_id:
+                        record_overlap(found, other, scope_id, 'wildcard', True)
+        
+        return list(found.values())[:limit]
+
+
+def record_overlap(found, first, second, kind, duplicate):
+    key = (min(first, second), max(first, second))
+    entry = found.setdefault(key, {'scope_ids': list(key), 'kinds': [], 'duplicate': False})
+    if kind not in entry['kinds']:
+        entry['kinds'].append(kind)
+    entry['duplicate'] = entry['duplicate'] or duplicate
+
+
+def flatten_ranges(ranges):
+    """Turn possibly nested ranges into disjoint (start, end, scope_id) segments, narrowest scope winning."""
+    boundaries = sorted({start for start, _, _ in ranges} | {end + 1 for _, end, _ in ranges})
+    by_start = sorted(ranges)
+    active = []
+    segments = []
+    i = 0
+    
+    for position, point in enumerate(boundaries[:-1]):
+        while i < len(by_start) and by_start[i][0] <= point:
+            start, end, scope_id = by_start[i]
+            heapq.heappush(active, (end - start, scope_id, end))
+            i += 1
+        while active and active[0][2] < point:
+            heapq.heappop(active)
+        if not active:
+            continue
+        
+        segment_end = boundaries[position + 1] - 1
+        scope_id = active[0][1]
+        if segments and segments[-1][2] == scope_id and segments[-1][1] == point - 1:
+            segments[-1] = (segments[-1][0], segment_end, scope_id)
+        else:
+            segments.append((point, segment_end, scope_id))
+    
+    return segments
+
+
+def version_name(project_id):
+    return f'testing_scopes:{project_id}'
+
+
+def current_version(project_id, connection=None):
+    query = select(CacheVersion.version).where(CacheVersion.name == version_name(project_id))
+    return (connection or db.session).execute(query).scalar() or 0
+
+
+def bump_version(project_id, connection=None):
+    table = CacheVersion.__table__
+    statement = insert(table).values(name=version_name(project_id), version=1, updated_at=datetime.utcnow())
+    statement = statement.on_conflict_do_update(
+        index_elements=['name'],
+        set_={'version': table.c.version + 1, 'updated_at': datetime.utcnow()}
+    ).returning(table.c.version)
+    return (connection or db.session).execute(statement).scalar()
+
+
+def build_index(project_id):
+    index = ScopeIndex()
+    index.version = current_version(project_id)
+    rows = db.session.query(
+        TestingScopeEntry.scope_id, TestingScopeEntry.kind, TestingScopeEntry.ip_version,
+        TestingScopeEntry.range_start, TestingScopeEntry.range_end, TestingScopeEntry.host
+    ).filter(TestingScopeEntry.project_id == project_id)
+    for row in rows:
+        index.add(*row)
+    return index.build()
+
+
+_lock = threading.Lock()
+_indexes = {}
+
+
+def get_scope_index(project_id):
+    """Return this worker's index for a project, rebuilding it if the scopes changed."""
+    with _lock:
+        cached = _indexes.get(project_id)
+    if cached and time.monotonic() - cached[1] < VERSION_CHECK_SECONDS:
+        return cached[0]
+    
+    version = current_version(project_id)
+    if cached and cached[0].version == version:
+        index = cached[0]
+    else:
+        index = build_index(project_id)
+    with _lock:
+        _indexes[project_id] = (index, time.monotonic())
+    return index
+
+
+def check_scope_value(project_id, value, exclude_scope_id=None):
+    """Parse a candidate scope value and report which existing scopes it overlaps."""
+    entries = parse_scope_value(value)
+    index = get_scope_index(project_id)
+    
+    # Existing entries minus the scope being edited, plus the candidate as scope 0
+    candidate = ScopeIndex()
+    for ip_version, ranges in index.ranges.items():
+        candidate.ranges[ip_version] = [r for r in ranges if r[2] != exclude_scope_id]
+    for host, scope_ids in index.hosts.items():
+        candidate.hosts[host] = scope_ids - {exclude_scope_id}
+    for suffix, scope_ids in index.wildcards.items():
+        candidate.wildcards[suffix] = scope_ids - {exclude_scope_id}
+    for entry in entries:
+        candidate.add(0, *entry)
+    
+    overlaps = [overlap for overlap in candidate.overlaps() if 0 in overlap['scope_ids']]
+    for overlap in overlaps:
+        overlap['scope_id'] = max(overlap.pop('scope_ids'))
+    return entries, overlaps
+
+
+def entry_rows(scope):
+    return [{
+        'scope_id': scope.id,
+        'project_id': scope.project_id,
+        'kind': kind,
+        'ip_version': ip_version,
+        'range_start': start,
+        'range_end': end,
+        'host': host
+    } for kind, ip_version, start, end, host in parse_scope_value(scope.scope_value)]
+
+
+def backfill_scope_entries(connection):
+    """Parse entries for scopes that have none, e.g. ones saved before entries were kept.
+    
+    Unparseable scopes are retried each run and still resolve nothing.
+    Returns the number of scopes filled in.
+    """
+    table = TestingScopeEntry.__table__
+    scopes = connection.execute(
+        select(TestingScope.id, TestingScope.project_id, TestingScope.scope_value).where(
+            ~select(table.c.id).where(table.c.scope_id == TestingScope.id).exists()
+        )
+    ).all()
+    
+    rows = []
+    projects = set()
+    filled = 0
+    for scope in scopes:
+        try:
+            scope_rows = entry_rows(scope)
+        except ValueError:
+            continue
+        rows += scope_rows
+        projects.add(scope.project_id)
+        filled += 1
+    if rows:
+        connection.execute(table.insert(), rows)
+    for project_id in projects:
+        bump_version(project_id, connection)
+    return filled
+
+
+@event.listens_for(Session, 'after_flush')
+def maintain_scope_entries(session, flush_context):
+    changed = [scope for scope in session.new if isinstance(scope, TestingScope)]
+    changed += [
+        scope for scope in session.dirty
+        if isinstance(scope, TestingScope) and (get_history(scope, 'scope_value').deleted or get_history(scope, 'project_id').deleted)
+    ]
+    deleted = [scope for scope in session.deleted if isinstance(scope, TestingScope)]
+    if not changed and not deleted:
+        return
+    
+    connection = session.connection()
+    table = TestingScopeEntry.__table__
+    projects = set()
+    
+    scope_ids = [scope.id for scope in changed + deleted]
+    connection.execute(table.delete().where(table.c.scope_id.in_(scope_ids)))
+    
+    rows = []
+    for scope in changed:
+        try:
+            rows += entry_rows(scope)
+        except ValueError:
+            # Unparseable free text stays on the scope but resolves nothing
+            pass
+        projects.add(scope.project_id)
+        old_project = get_history(scope, 'project_id').deleted
+        if old_project:
+            projects.add(old_project[0])
+    if rows:
+        connection.execute(table.insert(), rows)
+    
+    projects |= {scope.project_id for scope in deleted}
+    for project_id in projects:
+        bump_version(project_id, connection)
+    session.info.setdefault('testing_scope_projects', set()).update(projects)
+
+
+@event.listens_for(Session, 'after_commit')
+def drop_changed_indexes(session):
+    projects = session.info.pop('testing_scope_projects', None)
+    if not projects:
+        return
+    with _lock:
+        for project_id in projects:
+            _indexes.pop(project_id, None)
+
+
+@event.listens_for(Session, 'after_rollback')
+def discard_scope_changes(session):
+    session.info.pop('testing_scope_projects', None)
@@ -0,0 +1,304 @@
+# services/standard_import.py
+from datetime import datetime
+import csv
+import json
+import os
+import time
+
+from sqlalchemy import text, literal_column
+from sqlalchemy.dialects.postgresql import insert
+
+from app.models.models import db, ComplianceStandard, Requirement
+from app.services.jobs import job_handler
+from app.services.standards import refresh_standard_counters
+from app.services.mapping_index import bump_version as bump_mapping_index_version
+
+IMPORT_UPLOAD_DIR = os.environ.get('IMPORT_UPLOAD_DIR') or os.path.join(os.getcwd(), 'instance', 'imports')
+# Uploads a crashed worker left behind are deleted after this long
+IMPORT_UPLOAD_DAYS = 7
+
+# Rows per multi-row INSERT
+IMPORT_BATCH_SIZE = 1000
+
+IMPORT_FORMATS = ('json', 'csv', 'oscal')
+
+REQUIREMENT_NUMBER_LENGTH = Requirement.__table__.c.requirement_number.type.length
+
+
+def requirement_number(value):
+    # Cutting a number down could merge it with another one, so long numbers are refused
+    number = str(value).strip()
+    if len(number) > REQUIREMENT_NUMBER_LENGTH:
+        raise ValueError(f'Requirement number is longer than {REQUIREMENT_NUMBER_LENGTH} characters: {number[:REQUIREMENT_NUMBER_LENGTH]}...')
+    return number
+
+
+def requirement_record(number, title, description=None, parent_number=None):
+    number = requirement_number(number)
+    return {
+        'requirement_number': number,
+        'title': (title or number).strip()[:255],
+        'description': description,
+        'parent_number': requirement_number(parent_number) if parent_number else None
+    }
+
+
+def read_json_catalog(f):
+    """Native format: {"standard": {...}, "requirements": [...]} with nested children or parent_number."""
+    data = json.load(f)
+    
+    def walk(items, parent_number=None):
+        for item in items:
+            record = requirement_record(
+                item['requirement_number'], item.get('title'), item.get('description'),
+                item.get('parent_number') or parent_number
+            )
+            yield record
+            yield from walk(item.get('children') or [], record['requirement_number'])
+    
+    return data.get('standard') or {}, walk(data.get('requirements') or [])
+
+
+def read_csv_catalog(f):
+    """CSV with requirement_number,title,description[,parent_number] columns, read row by row."""
+    def rows():
+        for row in csv.DictReader(f):
+            if row.get('requirement_number'):
+                yield requirement_record(
+                    row['requirement_number'], row.get('title'), row.get('description') or None,
+                    row.get('parent_number') or None
+                )
+    
+    return {}, rows()
+
+
+def oscal_label(control):
+    for prop in control.get('props') or []:
+        if prop.get('name') == 'label':
+            return prop.get('value')
+    return control['id']
+
+
+def oscal_prose(parts):
+    texts = []
+    for part in parts or []:
+        if part.get('prose'):
+            texts.append(part['prose'])
+        texts.extend(filter(None, [oscal_prose(part.get('parts'))]))
+    return '\n'.join(texts) or None
+
+
+def read_oscal_catalog(f):
+    """OSCAL catalog JSON: groups and (nested) controls become requirements."""
+    catalog = json.load(f)['catalog']
+    metadata = catalog.get('metadata') or {}
+    
+    def walk_controls(controls, parent_number):
+        for control in controls or []:
+            number = oscal_label(control)
+            yield requirement_record(number, control.get('title'), oscal_prose(control.get('parts')), parent_number)
+            yield from walk_controls(control.get('controls'), number)
+    
+    def walk_groups(groups, parent_number=None):
+        for group in groups or []:
+            number = oscal_label(group)
+            yield requirement_record(number, group.get('title'), oscal_prose(group.get('parts')), parent_number)
+            yield from walk_groups(group.get('groups'), number)
+            yield from walk_controls(group.get('controls'), number)
+    
+    def records():
+        yield from walk_groups(catalog.get('groups'))
+        yield from walk_controls(catalog.get('controls'), None)
+    
+    standard = {'name': metadata.get('title'), 'version': metadata.get('version')}
+    return standard, records()
+
+
+READERS = {
+    'json': read_json_catalog,
+    'csv': read_csv_catalog,
+    'oscal': read_oscal_catalog,
+}
+
+
+def infer_parents(records):
+    # CSV catalogs often omit parents; fall back to the dotted prefix (1.2.3 -> 1.2) when it exists
+    numbers = {record['requirement_number'] for record in records}
+    for record in records:
+        if record['parent_number']:
+            continue
+        prefix = record['requirement_number']
+        while '.' in prefix:
+            prefix = prefix.rsplit('.', 1)[0]
+            if prefix in numbers:
+                record['parent_number'] = prefix
+                break
+
+
+def depth_order(records):
+    # Parents must be inserted before children for the parent_id foreign key
+    by_number = {record['requirement_number']: record for record in records}
+    depths = {}
+    
+    def depth(number, seen=()):
+        if number in depths:
+            return depths[number]
+        parent = by_number[number]['parent_number']
+        if not parent or parent not in by_number or parent in seen:
+            depths[number] = 0
+        else:
+            depths[number] = depth(parent, seen + (number,)) + 1
+        return depths[number]
+    
+    return sorted(records, key=lambda record: depth(record['requirement_number']))
+
+
+def upsert_standard(standard):
+    table = ComplianceStandard.__table__
+    now = datetime.utcnow()
+    statement = insert(table).values(
+        code=standard['code'],
+        name=standard.get('name') or standard['code'],
+        description=standard.get('description'),
+        version=standard.get('version'),
+        created_by=standard.get('created_by'),
+        created_at=now,
+        updated_at=now
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=['code'],
+        set_={
+            'name': statement.excluded.name,
+            'description': db.func.coalesce(statement.excluded.description, table.c.description),
+            'version': db.func.coalesce(statement.excluded.version, table.c.version),
+            'updated_at': now
+        }
+    ).returning(table.c.id)
+    return db.session.execute(statement).scalar()
+
+
+def allocate_ids(count):
+    """Reserve a batch of requirement ids from the sequence in one round trip."""
+    if not count:
+        return []
+    rows = db.session.execute(
+        text("SELECT nextval(pg_get_serial_sequence('requirements', 'id')) FROM generate_series(1, :count)"),
+        {'count': count}
+    )
+    return [row[0] for row in rows]
+
+
+def import_standard(standard, records, infer_parent_numbers=False, created_by=None):
+    """Create or update a standard and its requirement tree from catalog records.
+    
+    Existing requirements are matched by requirement_number and only rewritten
+    when their title, description or parent changed, so re-importing the same
+    catalog is a no-op. Nothing is committed here.
+    """
+    if not standard.get('code'):
+        raise ValueError('Standard code is required')
+    
+    # Later duplicates of a requirement number win
+    records = list({record['requirement_number']: record for record in records}.values())
+    if infer_parent_numbers:
+        infer_parents(records)
+    
+    standard_id = upsert_standard(dict(standard, created_by=created_by))
+    
+    existing = dict(db.session.query(Requirement.requirement_number, Requirement.id).filter(
+        Requirement.compliance_standard_id == standard_id
+    ).all())
+    
+    new_numbers = [record['requirement_number'] for record in records if record['requirement_number'] not in existing]
+    ids = dict(existing)
+    ids.update(zip(new_numbers, allocate_ids(len(new_numbers))))
+    
+    now = datetime.utcnow()
+    rows = [{
+        'id': ids[record['requirement_number']],
+        'compliance_standard_id': standard_id,
+        'requirement_number': record['requirement_number'],
+        'title': record['title'],
+        'description': record['description'],
+        'parent_id': ids.get(record['parent_number']) if record['parent_number'] else None,
+        'created_by': created_by,
+        'created_at': now,
+        'updated_at': now
+    } for record in depth_order(records)]
+    
+    table = Requirement.__table__
+    result = {'standard_id': standard_id, 'created': 0, 'updated': 0, 'unchanged': 0}
+    
+    for start in range(0, len(rows), IMPORT_BATCH_SIZE):
+        batch = rows[start:start + IMPORT_BATCH_SIZE]
+        statement = insert(table).values(batch)
+        statement = statement.on_conflict_do_update(
+            index_elements=['compliance_standard_id', 'requirement_number'],
+            set_={
+                'title': statement.excluded.title,
+                'description': statement.excluded.description,
+                'parent_id': statement.excluded.parent_id,
+                'updated_at': now
+            },
+            # Skip rows that did not change so re-imports don't churn updated_at
+            where=db.or_(
+                table.c.title.is_distinct_from(statement.excluded.title),
+                table.c.description.is_distinct_from(statement.excluded.description),
+                table.c.parent_id.is_distinct_from(statement.excluded.parent_id)
+            )
+        ).returning(literal_column('(xmax = 0)'))
+        
+        written = [row[0] for row in db.session.execute(statement)]
+        result['created'] += sum(1 for inserted in written if inserted)
+        result['updated'] += sum(1 for inserted in written if not inserted)
+        result['unchanged'] += len(batch) - len(written)
+    
+    refresh_standard_counters([standard_id])
+    
+    # Core inserts bypass the flush hooks, so tell every worker to rebuild its mapping index
+    if result['created'] or result['updated']:
+        bump_mapping_index_version()
+    return result
+
+
+def import_standard_file(path, import_format, standard=None, created_by=None):
+    if import_format not in READERS:
+        raise ValueError(f"Unsupported import format: {import_format}")
+    
+    with open(path, newline='', encoding='utf-8') as f:
+        file_standard, records = READERS[import_format](f)
+        merged = dict(file_standard)
+        merged.update({key: value for key, value in (standard or {}).items() if value})
+        return import_standard(merged, records, infer_parent_numbers=(import_format == 'csv'), created_by=created_by)
+
+
+def remove_upload(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+@job_handler('import_standard')
+def import_standard_job(payload, report_progress):
+    # Enqueued with a single attempt, so the upload is never needed again
+    try:
+        result = import_standard_file(
+            payload['path'], payload['format'], payload.get('standard'), created_by=payload.get('created_by')
+        )
+        db.session.commit()
+    finally:
+        remove_upload(payload['path'])
+    return result
+
+
+@job_handler('prune_import_uploads')
+def prune_import_uploads(payload, report_progress):
+    cutoff = time.time() - IMPORT_UPLOAD_DAYS * 86400
+    removed = 0
+    if os.path.isdir(IMPORT_UPLOAD_DIR):
+        for entry in os.scandir(IMPORT_UPLOAD_DIR):
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                remove_upload(entry.path)
+                removed += 1
+    return {'removed': removed}
@@ -0,0 +1,230 @@
+# services/standards.py
+from collections import Counter, defaultdict
+from datetime import datetime
+from sqlalchemy import event, select, func, exists
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.orm.attributes import get_history
+
+from app.models.models import db, ComplianceStandard, Requirement, EvidenceRequirementMapping, SOA, StandardCounterDelta
+from app.services.jobs import job_handler
+from app.services.result_cache import invalidate_on_commit
+
+COUNTERS = ('requirements_count', 'leaf_requirements_count', 'evidence_items_count', 'projects_count')
+
+
+def refresh_standard_counters(standard_ids, connection=None):
+    """Recount the given standards from scratch in one statement.
+    
+    For catalog edits, imports and repairs; everyday writes go through
+    add_counter_deltas instead. Each counter is an indexed correlated
+    subquery scoped to one standard. Pending deltas of those standards are
+    dropped by the same statement, whose snapshot the recount already covers.
+    """
+    standard_ids = {sid for sid in standard_ids if sid}
+    if not standard_ids:
+        return
+    
+    standards = ComplianceStandard.__table__
+    requirements = Requirement.__table__
+    children = aliased(Requirement.__table__)
+    mappings = EvidenceRequirementMapping.__table__
+    soa = SOA.__table__
+    deltas = StandardCounterDelta.__table__
+    
+    in_standard = requirements.c.compliance_standard_id == standards.c.id
+    
+    requirements_count = select(func.count(requirements.c.id)).where(in_standard).scalar_subquery()
+    
+    leaf_requirements_count = select(func.count(requirements.c.id)).where(
+        in_standard,
+        ~exists().where(children.c.parent_id == requirements.c.id)
+    ).scalar_subquery()
+    
+    evidence_items_count = select(func.count(func.distinct(mappings.c.evidence_id))).select_from(
+        mappings.join(requirements, requirements.c.id == mappings.c.requirement_id)
+    ).where(in_standard).scalar_subquery()
+    
+    projects_count = select(func.count(func.distinct(soa.c.project_id))).select_from(
+        soa.join(requirements, requirements.c.id == soa.c.requirement_id)
+    ).where(in_standard).scalar_subquery()
+    
+    dropped = deltas.delete().where(deltas.c.standard_id.in_(standard_ids)).cte('dropped')
+    statement = standards.update().where(standards.c.id.in_(standard_ids)).values(
+        requirements_count=requirements_count,
+        leaf_requirements_count=leaf_requirements_count,
+        evidence_items_count=evidence_items_count,
+        projects_count=projects_count,
+        updated_at=datetime.utcnow()
+    ).add_cte(dropped)
+    (connection or db.session).execute(statement)
+    invalidate_on_commit(db.session, ComplianceStandard.__tablename__)
+
+
+def add_counter_deltas(deltas, connection=None):
+    """Queue counter changes, {standard_id: {counter: change}}, as rows of standard_counter_deltas."""
+    rows = []
+    for standard_id, changes in deltas.items():
+        row = {name: changes.get(name, 0) for name in COUNTERS}
+        if standard_id and any(row.values()):
+            rows.append(dict(row, standard_id=standard_id, created_at=datetime.utcnow()))
+    if rows:
+        (connection or db.session).execute(StandardCounterDelta.__table__.insert(), rows)
+        invalidate_on_commit(db.session, ComplianceStandard.__tablename__)
+
+
+def pending_counter_totals():
+    """Subquery of deltas not yet folded into compliance_standards, summed per standard_id."""
+    deltas = StandardCounterDelta.__table__
+    return select(
+        deltas.c.standard_id,
+        *[func.sum(deltas.c[name]).label(name) for name in COUNTERS]
+    ).group_by(deltas.c.standard_id).subquery('pending_counters')
+
+
+def fold_counter_deltas(connection=None):
+    """Move pending deltas into the standards' counters; returns the number of standards updated."""
+    standards = ComplianceStandard.__table__
+    deltas = StandardCounterDelta.__table__
+    
+    folded = deltas.delete().returning(deltas.c.standard_id, *[deltas.c[name] for name in COUNTERS]).cte('folded')
+    totals = select(
+        folded.c.standard_id,
+        *[func.sum(folded.c[name]).label(name) for name in COUNTERS]
+    ).group_by(folded.c.standard_id).subquery('totals')
+    statement = standards.update().where(standards.c.id == totals.c.standard_id).values(
+        {name: standards.c[name] + totals.c[name] for name in COUNTERS}
+    ).add_cte(folded)
+    return (connection or db.session).execute(statement).rowcount
+
+
+def project_standard_ids(project_id, standard_ids=None, connection=None):
+    """Standards (among standard_ids, if given) in which the project has SOA rows."""
+    query = select(Requirement.compliance_standard_id).distinct().select_from(SOA).join(
+        Requirement, Requirement.id == SOA.requirement_id
+    ).where(SOA.project_id == project_id)
+    if standard_ids is not None:
+        query = query.where(Requirement.compliance_standard_id.in_(standard_ids))
+    return set((connection or db.session).execute(query).scalars())
+
+
+def record_project_standards(project_id, standard_ids, connection=None):
+    """Count a project in the standards it is about to get SOA rows for; call before inserting them."""
+    requirements = Requirement.__table__
+    with_requirements = set((connection or db.session).execute(
+        select(ComplianceStandard.id).where(
+            ComplianceStandard.id.in_(standard_ids),
+            exists().where(requirements.c.compliance_standard_id == ComplianceStandard.id)
+        )
+    ).scalars())
+    joined = with_requirements - project_standard_ids(project_id, standard_ids, connection)
+    add_counter_deltas({standard_id: {'projects_count': 1} for standard_id in joined}, connection)
+
+
+def attribute_values(obj, attribute):
+    # Current and previous values, so moves between standards refresh both sides
+    history = get_history(obj, attribute)
+    values = set(history.added) | set(history.unchanged) | set(history.deleted)
+    if not values:
+        values.add(getattr(obj, attribute))
+    return values
+
+
+def previous_value(obj, attribute):
+    deleted = get_history(obj, attribute).deleted
+    return deleted[0] if deleted else getattr(obj, attribute)
+
+
+def key_changes(session, model, owner):
+    """Net rows added per (owner, requirement_id) by this flush, counting only rows whose keys changed."""
+    changes = Counter()
+    for obj in session.new:
+        if isinstance(obj, model):
+            changes[(getattr(obj, owner), obj.requirement_id)] += 1
+    for obj in session.deleted:
+        if isinstance(obj, model):
+            changes[(previous_value(obj, owner), previous_value(obj, 'requirement_id'))] -= 1
+    for obj in session.dirty:
+        # Edits to justification, applicability and the like leave the counters alone
+        if isinstance(obj, model) and (get_history(obj, owner).deleted or get_history(obj, 'requirement_id').deleted):
+            changes[(getattr(obj, owner), obj.requirement_id)] += 1
+            changes[(previous_value(obj, owner), previous_value(obj, 'requirement_id'))] -= 1
+    return changes
+
+
+def distinct_owner_deltas(connection, model, owner, changes):
+    """Change in distinct owners per standard, from row changes per (owner, requirement_id).
+    
+    An owner (project or evidence item) joins a standard when it goes from no
+    rows there to some, and leaves it on the way back. Rows left after the
+    flush are counted for the touched owners only, never the whole standard.
+    """
+    requirement_ids = {requirement_id for _, requirement_id in changes}
+    standard_of = dict(connection.execute(
+        select(Requirement.id, Requirement.compliance_standard_id).where(Requirement.id.in_(requirement_ids))
+    ).all())
+    
+    pair_changes = Counter()
+    for (owner_id, requirement_id), change in changes.items():
+        if requirement_id in standard_of:
+            pair_changes[(owner_id, standard_of[requirement_id])] += change
+    if not pair_changes:
+        return {}
+    
+    owner_column = getattr(model, owner)
+    after = dict(((owner_id, standard_id), count) for owner_id, standard_id, count in connection.execute(
+        select(owner_column, Requirement.compliance_standard_id, func.count()).select_from(model).join(
+            Requirement, Requirement.id == model.requirement_id
+        ).where(
+            owner_column.in_({owner_id for owner_id, _ in pair_changes}),
+            Requirement.compliance_standard_id.in_({standard_id for _, standard_id in pair_changes})
+        ).group_by(owner_column, Requirement.compliance_standard_id)
+    ))
+    
+    deltas = Counter()
+    for pair, change in pair_changes.items():
+        count = after.get(pair, 0)
+        deltas[pair[1]] += (count > 0) - (count - change > 0)
+    return deltas
+
+
+@event.listens_for(Session, 'after_flush')
+def maintain_standard_counters(session, flush_context):
+    # Requirement edits reshape leaf and distinct counts, so those standards are
+    # recounted; they are catalog edits and rare. SOA and mapping rows only
+    # move their standard's counters by deltas, and only when their keys change
+    recount = set()
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, Requirement):
+            recount |= attribute_values(obj, 'compliance_standard_id')
+    for obj in session.dirty:
+        if isinstance(obj, Requirement) and (
+            get_history(obj, 'compliance_standard_id').deleted or get_history(obj, 'parent_id').has_changes()
+        ):
+            recount |= attribute_values(obj, 'compliance_standard_id')
+    
+    soa_changes = key_changes(session, SOA, 'project_id')
+    mapping_changes = key_changes(session, EvidenceRequirementMapping, 'evidence_id')
+    recount.discard(None)
+    if not (recount or soa_changes or mapping_changes):
+        return
+    
+    connection = session.connection()
+    deltas = defaultdict(Counter)
+    if soa_changes:
+        for standard_id, change in distinct_owner_deltas(connection, SOA, 'project_id', soa_changes).items():
+            deltas[standard_id]['projects_count'] += change
+    if mapping_changes:
+        for standard_id, change in distinct_owner_deltas(connection, EvidenceRequirementMapping, 'evidence_id', mapping_changes).items():
+            deltas[standard_id]['evidence_items_count'] += change
+    
+    for standard_id in recount:
+        deltas.pop(standard_id, None)
+    refresh_standard_counters(recount, connection)
+    add_counter_deltas(deltas, connection)
+
+
+@job_handler('fold_standard_counters')
+def fold_standard_counters(payload, report_progress):
+    folded = fold_counter_deltas()
+    db.session.commit()
+    return {'standards': folded}
@@ -0,0 +1,216 @@
+# services/tickets.py
+from collections import defaultdict
+from datetime import datetime
+import os
+
+from sqlalchemy import event, select, func, literal, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+from werkzeug.utils import secure_filename
+
+from app.models.models import db, SupportTicket, SupportTicketCounter, TicketAttachment, ticket_number_seq
+from app.utils.policy import can
+
+TICKET_STATUSES = ('open', 'in_progress', 'waiting_on_customer', 'resolved', 'closed')
+TICKET_PRIORITIES = ('critical', 'high', 'medium', 'low')
+UNKNOWN = 'unknown'
+
+TICKET_UPLOAD_DIR = os.environ.get('TICKET_UPLOAD_DIR') or os.path.join(os.getcwd(), 'instance', 'ticket_attachments')
+
+
+def allocate_ticket_id():
+    # Sequence values never collide, unlike max(ticket_id) + 1
+    number = db.session.execute(select(ticket_number_seq.next_value())).scalar()
+    return f'TKT-{number:06d}'
+
+
+def counter_keys(status, requester_id, assigned_to):
+    status = status or UNKNOWN
+    keys = [('all', 0, status), ('requester', requester_id, status)]
+    if assigned_to and assigned_to != requester_id:
+        keys.append(('assignee', assigned_to, status))
+    return keys
+
+
+def previous_values(ticket):
+    values = {}
+    for attribute in ('status', 'requester_id', 'assigned_to'):
+        history = get_history(ticket, attribute)
+        if history.deleted:
+            values[attribute] = history.deleted[0]
+    return values
+
+
+@event.listens_for(Session, 'after_flush')
+def maintain_ticket_counters(session, flush_context):
+    deltas = defaultdict(int)
+    
+    for ticket in session.new:
+        if isinstance(ticket, SupportTicket):
+            for key in counter_keys(ticket.status, ticket.requester_id, ticket.assigned_to):
+                deltas[key] += 1
+    
+    for ticket in session.dirty:
+        if isinstance(ticket, SupportTicket):
+            old = previous_values(ticket)
+            if not old:
+                continue
+            for key in counter_keys(
+                old.get('status', ticket.status),
+                old.get('requester_id', ticket.requester_id),
+                old.get('assigned_to', ticket.assigned_to)
+            ):
+                deltas[key] -= 1
+            for key in counter_keys(ticket.status, ticket.requester_id, ticket.assigned_to):
+                deltas[key] += 1
+    
+    for ticket in session.deleted:
+        if isinstance(ticket, SupportTicket):
+            old = previous_values(ticket)
+            for key in counter_keys(
+                old.get('status', ticket.status),
+                old.get('requester_id', ticket.requester_id),
+                old.get('assigned_to', ticket.assigned_to)
+            ):
+                deltas[key] -= 1
+    
+    table = SupportTicketCounter.__table__
+    now = datetime.utcnow()
+    connection = session.connection() if deltas else None
+    for (scope, user_id, status), delta in deltas.items():
+        if not delta:
+            continue
+        statement = insert(table).values(
+            scope=scope, user_id=user_id, status=status, ticket_count=delta, updated_at=now
+        )
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=['scope', 'user_id', 'status'],
+            set_={
+                'ticket_count': table.c.ticket_count + statement.excluded.ticket_count,
+                'updated_at': now
+            }
+        ))
+
+
+def rebuild_ticket_counters():
+    """Recount every counter row straight from support_tickets."""
+    status = func.coalesce(SupportTicket.status, UNKNOWN)
+    now = literal(datetime.utcnow())
+    columns = ['scope', 'user_id', 'status', 'ticket_count', 'updated_at']
+    
+    SupportTicketCounter.query.delete(synchronize_session=False)
+    sources = [
+        select(literal('all'), literal(0), status, func.count(), now).group_by(status),
+        select(literal('requester'), SupportTicket.requester_id, status, func.count(), now).group_by(
+            SupportTicket.requester_id, status
+        ),
+        select(literal('assignee'), SupportTicket.assigned_to, status, func.count(), now).where(
+            SupportTicket.assigned_to.isnot(None),
+            SupportTicket.assigned_to != SupportTicket.requester_id
+        ).group_by(SupportTicket.assigned_to, status)
+    ]
+    rows = 0
+    for source in sources:
+        rows += db.session.execute(insert(SupportTicketCounter.__table__).from_select(columns, source)).rowcount
+    return rows
+
+
+def ticket_summary(user):
+    """pendingTickets/resolvedTickets for the dashboard, read from the counter table."""
+    query = db.session.query(SupportTicketCounter.status, func.sum(SupportTicketCounter.ticket_count))
+    if can(user, 'tickets:view_all'):
+        query = query.filter(SupportTicketCounter.scope == 'all')
+    else:
+        query = query.filter(
+            SupportTicketCounter.scope.in_(['requester', 'assignee']),
+            SupportTicketCounter.user_id == user.id
+        )
+    by_status = {status: int(count) for status, count in query.group_by(SupportTicketCounter.status) if count}
+    
+    resolved = sum(count for status, count in by_status.items() if status in SupportTicket.RESOLVED_STATUSES)
+    return {
+        'pendingTickets': sum(by_status.values()) - resolved,
+        'resolvedTickets': resolved,
+        'by_status': by_status
+    }
+
+
+def visible_tickets(user):
+    query = SupportTicket.query
+    if not can(user, 'tickets:view_all'):
+        query = query.filter(db.or_(SupportTicket.requester_id == user.id, SupportTicket.assigned_to == user.id))
+    return query
+
+
+def encode_cursor(ticket):
+    return f'{ticket.created_at.isoformat()}|{ticket.id}'
+
+
+def decode_cursor(cursor):
+    created_at, ticket_id = cursor.rsplit('|', 1)
+    return datetime.fromisoformat(created_at), int(ticket_id)
+
+
+def list_tickets(user, status=None, priority=None, assigned_to=None, category=None, after=None, limit=50):
+    """One page of a triage queue, newest first, using (created_at, id) as the keyset."""
+    query = visible_tickets(user)
+    
+    if status:
+        query = query.filter(SupportTicket.status.in_(status))
+    if priority:
+        query = query.filter(SupportTicket.priority.in_(priority))
+    if assigned_to:
+        query = query.filter(SupportTicket.assigned_to == assigned_to)
+    if category:
+        query = query.filter(SupportTicket.issue_category == category)
+    if after:
+        query = query.filter(tuple_(SupportTicket.created_at, SupportTicket.id) < tuple_(*decode_cursor(after)))
+    
+    tickets = query.order_by(SupportTicket.created_at.desc(), SupportTicket.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_cursor(tickets[limit - 1]) if len(tickets) > limit else None
+    return tickets[:limit], next_cursor
+
+
+def save_attachments(files):
+    """Write uploads to disk before the transaction opens; returns (path, upload) pairs."""
+    os.makedirs(TICKET_UPLOAD_DIR, exist_ok=True)
+    saved = []
+    for upload in files:
+        path = os.path.join(
+            TICKET_UPLOAD_DIR,
+            f"{datetime.utcnow().strftime('%Y%m%d%H%M%S%f')}-{secure_filename(upload.filename or 'attachment')}"
+        )
+        upload.save(path)
+        saved.append((path, upload))
+    return saved
+
+
+def remove_attachments(saved):
+    for path, _ in saved:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def create_ticket(user, data, saved_attachments=None):
+    """Add a ticket and its attachments to the session; the caller commits once."""
+    ticket = SupportTicket(
+        ticket_id=allocate_ticket_id(),
+        requester_id=user.id,
+        issue_category=data['issue_category'],
+        priority=data.get('priority') or 'medium',
+        issue_description=data['issue_description'],
+        initial_troubleshooting=data.get('initial_troubleshooting'),
+        status='open'
+    )
+    ticket.attachments = [TicketAttachment(
+        file_path=path,
+        file_name=upload.filename,
+        file_type=upload.mimetype,
+        file_size=os.path.getsize(path),
+        uploaded_by=user.id
+    ) for path, upload in saved_attachments or []]
+    
+    db.session.add(ticket)
+    db.session.flush()
+    return ticket
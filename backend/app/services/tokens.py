@@ -0,0 +1,303 @@
+# services/tokens.py
+from datetime import datetime, timedelta
+import hashlib
+import threading
+import time
+import uuid
+
+import jwt
+from flask import current_app
+from sqlalchemy import event, select, func, tuple_
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+
+from app.models.models import db, User, RefreshToken, TokenRevocation
+from app.services.changes import VISIBLE_TXID
+from app.services.jobs import job_handler
+
+ACCESS_TOKEN_MINUTES = 15
+REFRESH_TOKEN_DAYS = 14
+
+# How stale a worker's denylist may get; revocations reach every worker within this
+REVOCATION_SYNC_SECONDS = 1
+# The Bloom filter is rebuilt from unexpired revocations this often, dropping expired ones
+REVOCATION_REBUILD_SECONDS = 3600
+
+# 2**20 bits (128 KiB) and 7 probes keep false positives under 1% up to ~100k revoked tokens
+BLOOM_BITS = 1 << 20
+BLOOM_HASHES = 7
+
+
+def new_jti():
+    return uuid.uuid4().hex
+
+
+def epoch_seconds(moment):
+    # moment is naive UTC; timestamp() would read it as local time
+    return (moment - datetime(1970, 1, 1)).total_seconds()
+
+
+def access_token_lifetime():
+    return timedelta(minutes=current_app.config.get('ACCESS_TOKEN_MINUTES', ACCESS_TOKEN_MINUTES))
+
+
+def refresh_token_lifetime():
+    return timedelta(days=current_app.config.get('REFRESH_TOKEN_DAYS', REFRESH_TOKEN_DAYS))
+
+
+def decode_token(token):
+    return jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=['HS256'])
+
+
+def create_refresh_token(user_id, family_id=None):
+    """Issue a refresh token and record it in the session. The caller commits."""
+    now = datetime.utcnow()
+    jti = new_jti()
+    row = RefreshToken(
+        jti=jti,
+        family_id=family_id or jti,
+        user_id=user_id,
+        expires_at=now + refresh_token_lifetime(),
+        created_at=now
+    )
+    db.session.add(row)
+    token = jwt.encode({
+        'exp': row.expires_at,
+        'iat': epoch_seconds(now),
+        'sub': str(user_id),
+        'jti': jti,
+        'type': 'refresh'
+    }, current_app.config['JWT_SECRET_KEY'], algorithm='HS256')
+    return token, row
+
+
+def rotate_refresh_token(token):
+    """Exchange a refresh token for (user, new refresh token); raises ValueError if it cannot be used.
+    
+    A token is single use: the old row is revoked and points at its
+    replacement. A replaced token presented again means it was copied, so
+    the whole family is revoked and both holders must log in again. The
+    caller commits, including after a ValueError.
+    """
+    try:
+        payload = decode_token(token)
+    except jwt.InvalidTokenError:
+        raise ValueError('Invalid refresh token')
+    if payload.get('type') != 'refresh':
+        raise ValueError('Invalid refresh token')
+    
+    row = RefreshToken.query.filter_by(jti=payload.get('jti')).with_for_update().first()
+    if not row:
+        raise ValueError('Invalid refresh token')
+    if row.revoked_at is not None:
+        if row.replaced_by:
+            print(f"Refresh token reused for user {row.user_id}, revoking family {row.family_id}")
+            revoke_refresh_family(row.family_id)
+        raise ValueError('Refresh token has been revoked')
+    
+    user = User.query.get(row.user_id)
+    if not user or not user.is_active:
+        raise ValueError('User is inactive')
+    
+    new_token, new_row = create_refresh_token(user.id, row.family_id)
+    row.revoked_at = datetime.utcnow()
+    row.replaced_by = new_row.jti
+    return user, new_token
+
+
+def revoke_refresh_family(family_id):
+    RefreshToken.query.filter(
+        RefreshToken.family_id == family_id,
+        RefreshToken.revoked_at.is_(None)
+    ).update({'revoked_at': datetime.utcnow()}, synchronize_session=False)
+
+
+def revoke_refresh_token(token):
+    """Revoke the family of a refresh token (logout); invalid tokens are ignored."""
+    try:
+        payload = decode_token(token)
+    except jwt.InvalidTokenError:
+        return
+    row = RefreshToken.query.filter_by(jti=payload.get('jti')).first()
+    if row:
+        revoke_refresh_family(row.family_id)
+
+
+def revoke_access_token(payload, reason='logout'):
+    """Add one access token to the denylist until it expires. The caller commits."""
+    if not payload.get('jti'):
+        return
+    db.session.add(TokenRevocation(
+        jti=payload['jti'],
+        user_id=int(payload['sub']),
+        reason=reason,
+        expires_at=datetime.utcfromtimestamp(payload['exp'])
+    ))
+
+
+def revoke_user_tokens(user_id, connection=None, reason='deactivated'):
+    """Revoke every token a user holds now: access tokens via the denylist, refresh tokens in place."""
+    now = datetime.utcnow()
+    connection = connection or db.session.connection()
+    connection.execute(TokenRevocation.__table__.insert().values(
+        user_id=user_id,
+        reason=reason,
+        revoked_at=now,
+        # Older access tokens expire within one lifetime; legacy day-long tokens within a day
+        expires_at=now + max(access_token_lifetime(), timedelta(days=1))
+    ))
+    table = RefreshToken.__table__
+    connection.execute(table.update().where(
+        table.c.user_id == user_id,
+        table.c.revoked_at.is_(None)
+    ).values(revoked_at=now))
+
+
+class BloomFilter:
+    def __init__(self, bits=BLOOM_BITS, hashes=BLOOM_HASHES):
+        self.bits = bits
+        self.hashes = hashes
+        self.array = bytearray(bits // 8)
+    
+    def positions(self, value):
+        # Double hashing: probe i is h1 + i*h2, from one 128-bit digest
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+    
+    def add(self, value):
+        for position in self.positions(value):
+            self.array[position >> 3] |= 1 << (position & 7)
+    
+    def __contains__(self, value):
+        return all(self.array[position >> 3] & (1 << (position & 7)) for position in self.positions(value))
+
+
+class Denylist:
+    """Per-worker view of token_revocations, checked without touching the database.
+    
+    Revoked jtis go into a Bloom filter; a hit is confirmed with one query,
+    so a false positive costs a lookup but never rejects a valid token.
+    User-wide revocations are a dict of user id -> revoked-before time. Both
+    are fed from the table at most once per REVOCATION_SYNC_SECONDS, and
+    rebuilt hourly to shed expired rows. The cursor is (txid, id) over
+    finished transactions only, as in the change feed, so a revocation that
+    commits after a higher id was read is still picked up.
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        self.bloom = BloomFilter()
+        self.users = {}
+        self.confirmed = set()
+        self.cursor = (0, 0)
+        self.last_sync = None
+        self.built_at = None
+        self.stats = {'checks': 0, 'bloom_hits': 0, 'false_positives': 0, 'revoked': 0}
+    
+    def add(self, jti, user_id, revoked_before):
+        if jti:
+            self.bloom.add(jti)
+        elif user_id is not None:
+            self.users[user_id] = max(self.users.get(user_id, 0), revoked_before)
+    
+    def sync(self):
+        now = time.monotonic()
+        if self.last_sync is not None and now - self.last_sync < REVOCATION_SYNC_SECONDS:
+            return
+        rebuild = self.built_at is None or now - self.built_at >= REVOCATION_REBUILD_SECONDS
+        
+        table = TokenRevocation.__table__
+        query = select(table.c.txid, table.c.id, table.c.jti, table.c.user_id, table.c.revoked_at)
+        if rebuild:
+            # Expired rows are left out, but the cursor still moves past them
+            head = db.session.execute(
+                select(table.c.txid, table.c.id).where(table.c.txid < VISIBLE_TXID)
+                .order_by(table.c.txid.desc(), table.c.id.desc()).limit(1)
+            ).first()
+            cursor = tuple(head) if head else (0, 0)
+            query = query.where(
+                tuple_(table.c.txid, table.c.id) <= tuple_(*cursor),
+                table.c.expires_at > func.timezone('utc', func.now())
+            )
+        else:
+            query = query.where(table.c.txid < VISIBLE_TXID, tuple_(table.c.txid, table.c.id) > tuple_(*self.cursor))
+        rows = db.session.execute(query.order_by(table.c.txid, table.c.id)).all()
+        
+        with self.lock:
+            if rebuild:
+                stats = self.stats
+                self.reset()
+                self.stats = stats
+                self.built_at = now
+                self.cursor = cursor
+            for txid, revocation_id, jti, user_id, revoked_at in rows:
+                self.add(jti, user_id, epoch_seconds(revoked_at))
+                self.cursor = max(self.cursor, (txid, revocation_id))
+            self.last_sync = now
+    
+    def is_revoked(self, payload):
+        """True if the decoded access token has been revoked."""
+        self.sync()
+        self.stats['checks'] += 1
+        
+        issued_at = payload.get('iat')
+        user_id = int(payload['sub'])
+        # iat carries microseconds, so a token issued just after a password change in the
+        # same second survives; older whole-second iats are revoked if the second matches
+        if issued_at is not None and issued_at < self.users.get(user_id, -1):
+            self.stats['revoked'] += 1
+            return True
+        
+        jti = payload.get('jti')
+        if not jti or jti not in self.bloom:
+            return False
+        self.stats['bloom_hits'] += 1
+        if jti in self.confirmed:
+            self.stats['revoked'] += 1
+            return True
+        revoked = db.session.query(TokenRevocation.id).filter(TokenRevocation.jti == jti).first() is not None
+        if revoked:
+            with self.lock:
+                self.confirmed.add(jti)
+            self.stats['revoked'] += 1
+        else:
+            self.stats['false_positives'] += 1
+        return revoked
+    
+    def snapshot(self):
+        return dict(self.stats, users=len(self.users), cursor='.'.join(map(str, self.cursor)))
+
+
+denylist = Denylist()
+
+
+def credentials_revoked(user):
+    """Deactivation and password changes end every session the user has."""
+    if get_history(user, 'password').deleted:
+        return 'password_changed'
+    if get_history(user, 'is_active').deleted and user.is_active is False:
+        return 'deactivated'
+    return None
+
+
+@event.listens_for(Session, 'after_flush')
+def revoke_tokens_on_credential_change(session, flush_context):
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            reason = credentials_revoked(obj)
+            if reason:
+                revoke_user_tokens(obj.id, session.connection(), reason)
+
+
+@job_handler('prune_revocations')
+def prune_revocations(payload, report_progress):
+    now = datetime.utcnow()
+    revocations = TokenRevocation.query.filter(TokenRevocation.expires_at < now).delete(synchronize_session=False)
+    refresh_tokens = RefreshToken.query.filter(RefreshToken.expires_at < now).delete(synchronize_session=False)
+    db.session.commit()
+    return {'revocations': revocations, 'refresh_tokens': refresh_tokens}
@@ -0,0 +1,447 @@
+# services/upload_processing.py
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+import hashlib
+import mmap
+import os
+import re
+import shutil
+import subprocess
+import zipfile
+import zlib
+from xml.etree import ElementTree
+
+from sqlalchemy import update, bindparam, and_, or_
+
+from app.models.models import db, UploadMetadata
+from app.services.jobs import job_handler
+from app.services.upload_queue import UPLOAD_KINDS, queue_missing_uploads, request_processing
+
+THUMBNAIL_DIR = os.environ.get('UPLOAD_THUMBNAIL_DIR') or os.path.join(os.getcwd(), 'instance', 'thumbnails')
+THUMBNAIL_SIZE = (256, 256)
+
+# Worker processes per job; files are CPU-bound to hash and parse
+UPLOAD_PROCESSES = int(os.environ.get('UPLOAD_PROCESSES', 0)) or os.cpu_count() or 1
+# Files claimed per job run, and results written per UPDATE
+MAX_FILES_PER_RUN = 1000
+WRITE_BATCH_SIZE = 100
+# A claim older than this belongs to a run that died; its files are claimed again
+CLAIM_TIMEOUT_SECONDS = 3600
+
+# Caps on what a hostile file can make a processor inflate or read
+MAX_INFLATED_BYTES = 32 * 1024 * 1024
+MAX_OFFICE_PART_BYTES = 1024 * 1024
+
+# (leading bytes, MIME type); ZIP containers are refined into Office types below
+MAGIC_NUMBERS = [
+    (b'%PDF-', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'II*\x00', 'image/tiff'),
+    (b'MM\x00*', 'image/tiff'),
+    (b'BM', 'image/bmp'),
+    (b'PK\x03\x04', 'application/zip'),
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'application/x-ole-storage'),
+    (b'\x1f\x8b', 'application/gzip'),
+    (b'7z\xbc\xaf\x27\x1c', 'application/x-7z-compressed'),
+    (b'Rar!\x1a\x07', 'application/vnd.rar'),
+    (b'{\\rtf', 'application/rtf'),
+]
+
+# First file part of each Office Open XML flavour
+OOXML_TYPES = [
+    ('word/', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'),
+    ('xl/', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    ('ppt/', 'application/vnd.openxmlformats-officedocument.presentationml.presentation'),
+]
+
+OOXML_NAMESPACES = {
+    'cp': 'http://schemas.openxmlformats.org/package/2006/metadata/core-properties',
+    'dc': 'http://purl.org/dc/elements/1.1/',
+    'dcterms': 'http://purl.org/dc/terms/',
+    'ep': 'http://schemas.openxmlformats.org/officeDocument/2006/extended-properties',
+    'sheet': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main',
+}
+
+PDF_DATE = re.compile(rb"D:(\d{4})(\d{2})?(\d{2})?(\d{2})?(\d{2})?(\d{2})?([Z+\-])?(\d{2})?'?(\d{2})?")
+PDF_PAGE = re.compile(rb'/Type\s*/Page(?![a-zA-Z])')
+PDF_PAGES_COUNT = re.compile(rb'/Type\s*/Pages\b[^>]*?/Count\s+(\d+)|/Count\s+(\d+)[^>]*?/Type\s*/Pages\b', re.S)
+PDF_OBJECT_STREAM = re.compile(rb'/Type\s*/ObjStm\b.*?stream\r?\n', re.S)
+PDF_INFO_STRINGS = ('Title', 'Author', 'Creator', 'Producer')
+
+
+def utc_naive(value):
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def parse_pdf_date(raw):
+    """PDF date string (D:YYYYMMDDHHmmSSOHH'mm) as naive UTC, or None."""
+    match = PDF_DATE.search(raw)
+    if not match:
+        return None
+    year, month, day, hour, minute, second, sign, tz_hour, tz_minute = match.groups()
+    try:
+        value = datetime(
+            int(year), int(month or 1), int(day or 1),
+            int(hour or 0), int(minute or 0), int(second or 0)
+        )
+    except ValueError:
+        return None
+    if sign in (b'+', b'-'):
+        offset = timedelta(hours=int(tz_hour or 0), minutes=int(tz_minute or 0))
+        value = value - offset if sign == b'+' else value + offset
+    return value
+
+
+def parse_iso_date(text):
+    if not text:
+        return None
+    try:
+        return utc_naive(datetime.fromisoformat(text.strip().replace('Z', '+00:00')))
+    except ValueError:
+        return None
+
+
+class MappedFile:
+    """The mapped buffer as a seekable file, for readers such as zipfile that check seekable()."""
+    
+    def __init__(self, buffer):
+        self.buffer = buffer
+    
+    def seekable(self):
+        return True
+    
+    def __getattr__(self, name):
+        return getattr(self.buffer, name)
+
+
+def hash_file(buffer, result):
+    result['sha256'] = hashlib.sha256(buffer).hexdigest()
+    result['blake2b'] = hashlib.blake2b(buffer).hexdigest()
+
+
+def sniff_mime_type(buffer):
+    """MIME type from the file's leading bytes, not its name or what the client sent."""
+    head = bytes(buffer[:16])
+    for magic, mime_type in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return mime_type
+    if head[:4] == b'RIFF' and bytes(buffer[8:12]) == b'WEBP':
+        return 'image/webp'
+    sample = bytes(buffer[:4096])
+    if not sample:
+        return 'application/x-empty'
+    if b'\x00' not in sample:
+        try:
+            # A multi-byte character may be cut at the end of the sample
+            sample.decode('utf-8')
+            return 'text/plain'
+        except UnicodeDecodeError as e:
+            if e.start >= len(sample) - 3:
+                return 'text/plain'
+    return 'application/octet-stream'
+
+
+def sniff_file(buffer, result):
+    mime_type = sniff_mime_type(buffer)
+    if mime_type == 'application/zip':
+        try:
+            names = zipfile.ZipFile(MappedFile(buffer)).namelist()
+        except zipfile.BadZipFile:
+            names = []
+        if '[Content_Types].xml' in names:
+            for prefix, office_type in OOXML_TYPES:
+                if any(name.startswith(prefix) for name in names):
+                    mime_type = office_type
+                    break
+    result['mime_type'] = mime_type
+
+
+def inflated_object_streams(buffer):
+    """Decompressed PDF object streams, where PDF 1.5+ files keep most page objects."""
+    total = 0
+    for match in PDF_OBJECT_STREAM.finditer(buffer):
+        end = buffer.find(b'endstream', match.end())
+        if end < 0:
+            continue
+        try:
+            data = zlib.decompressobj().decompress(buffer[match.end():end], MAX_INFLATED_BYTES - total)
+        except zlib.error:
+            continue
+        total += len(data)
+        yield data
+        if total >= MAX_INFLATED_BYTES:
+            return
+
+
+def pdf_info_string(buffer, name):
+    match = re.search(rb'/' + name.encode('ascii') + rb'\s*\(((?:[^()\\]|\\.)*)\)', buffer, re.S)
+    if not match:
+        return None
+    raw = match.group(1)
+    if raw.startswith(b'\xfe\xff'):
+        return raw[2:].decode('utf-16-be', 'replace')
+    return raw.decode('latin-1')
+
+
+def pdf_metadata(buffer, result):
+    pages = len(PDF_PAGE.findall(buffer))
+    if not pages:
+        pages = sum(len(PDF_PAGE.findall(data)) for data in inflated_object_streams(buffer))
+    if not pages:
+        counts = [int(a or b) for a, b in PDF_PAGES_COUNT.findall(buffer)]
+        pages = max(counts) if counts else 0
+    result['page_count'] = pages or None
+    
+    for key, name in (('document_created_at', rb'/CreationDate'), ('document_modified_at', rb'/ModDate')):
+        match = re.search(name + rb'\s*\(([^)]*)\)', buffer)
+        if match:
+            result[key] = parse_pdf_date(match.group(1))
+    
+    details = result['details']
+    for name in PDF_INFO_STRINGS:
+        value = pdf_info_string(buffer, name)
+        if value:
+            details[name.lower()] = value
+    details['encrypted'] = buffer.find(b'/Encrypt') >= 0
+
+
+def read_office_part(archive, name):
+    try:
+        info = archive.getinfo(name)
+    except KeyError:
+        return None
+    if info.file_size > MAX_OFFICE_PART_BYTES:
+        return None
+    return ElementTree.fromstring(archive.read(name))
+
+
+def office_metadata(buffer, result):
+    archive = zipfile.ZipFile(MappedFile(buffer))
+    details = result['details']
+    
+    core = read_office_part(archive, 'docProps/core.xml')
+    if core is not None:
+        result['document_created_at'] = parse_iso_date(core.findtext('dcterms:created', namespaces=OOXML_NAMESPACES))
+        result['document_modified_at'] = parse_iso_date(core.findtext('dcterms:modified', namespaces=OOXML_NAMESPACES))
+        for key, path in (('title', 'dc:title'), ('author', 'dc:creator'), ('last_modified_by', 'cp:lastModifiedBy')):
+            value = core.findtext(path, namespaces=OOXML_NAMESPACES)
+            if value:
+                details[key] = value
+    
+    app = read_office_part(archive, 'docProps/app.xml')
+    if app is not None:
+        application = app.findtext('ep:Application', namespaces=OOXML_NAMESPACES)
+        if application:
+            details['application'] = application
+        pages = app.findtext('ep:Pages', namespaces=OOXML_NAMESPACES) or app.findtext('ep:Slides', namespaces=OOXML_NAMESPACES)
+        if pages and pages.isdigit():
+            result['page_count'] = int(pages)
+    
+    workbook = read_office_part(archive, 'xl/workbook.xml')
+    if workbook is not None:
+        details['sheets'] = len(workbook.findall('sheet:sheets/sheet:sheet', OOXML_NAMESPACES))
+
+
+def image_metadata(buffer, result, thumbnail_path):
+    # Image metadata and thumbnails are optional and need Pillow installed
+    try:
+        from PIL import Image
+    except ImportError:
+        return
+    buffer.seek(0)
+    with Image.open(buffer) as image:
+        result['details'].update(width=image.width, height=image.height)
+        exif = image.getexif()
+        # DateTimeOriginal lives in the Exif sub-IFD, DateTime in the main one
+        taken = exif.get_ifd(0x8769).get(36867) or exif.get(306)
+        if taken:
+            try:
+                result['document_created_at'] = datetime.strptime(str(taken).strip('\x00'), '%Y:%m:%d %H:%M:%S')
+            except ValueError:
+                pass
+        image.thumbnail(THUMBNAIL_SIZE)
+        os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
+        image.convert('RGB').save(thumbnail_path, 'PNG')
+        result['thumbnail_path'] = thumbnail_path
+
+
+def pdf_thumbnail(buffer, result, thumbnail_path):
+    # First-page previews need poppler's pdftoppm on PATH; the PDF is piped from the mapped buffer
+    if not shutil.which('pdftoppm'):
+        return
+    os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
+    prefix = thumbnail_path[:-len('.png')]
+    subprocess.run(
+        ['pdftoppm', '-png', '-singlefile', '-f', '1', '-l', '1', '-scale-to', str(max(THUMBNAIL_SIZE)), '-', prefix],
+        input=buffer, capture_output=True, timeout=60, check=True
+    )
+    result['thumbnail_path'] = thumbnail_path
+
+
+def run_processor(processor, result, *args):
+    # One processor failing (a malformed PDF, say) must not lose what the others found
+    try:
+        processor(*args)
+    except Exception as e:
+        result['details'].setdefault('errors', {})[processor.__name__] = f'{type(e).__name__}: {e}'
+
+
+def process_file(task):
+    """Hash, sniff and extract metadata from one file; runs in a pool process.
+    
+    The file is mapped once and every processor reads the same buffer, so
+    it is read from disk a single time however many processors look at it.
+    task is (metadata id, path, thumbnail path); returns the column values.
+    """
+    metadata_id, path, thumbnail_path = task
+    result = {'id': metadata_id, 'status': 'processed', 'error': None, 'details': {}}
+    try:
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+    except OSError as e:
+        return dict(result, status='failed', error=f'{type(e).__name__}: {e}')
+    
+    if buffer is None:
+        hash_file(b'', result)
+        result['mime_type'] = 'application/x-empty'
+        result['details']['size'] = 0
+        return result
+    
+    try:
+        if hasattr(mmap, 'MADV_SEQUENTIAL'):
+            buffer.madvise(mmap.MADV_SEQUENTIAL)
+        result['details']['size'] = size
+        run_processor(hash_file, result, buffer, result)
+        run_processor(sniff_file, result, buffer, result)
+        mime_type = result.get('mime_type') or ''
+        if mime_type == 'application/pdf':
+            run_processor(pdf_metadata, result, buffer, result)
+            run_processor(pdf_thumbnail, result, buffer, result, thumbnail_path)
+        elif mime_type.startswith('application/vnd.openxmlformats-officedocument.'):
+            run_processor(office_metadata, result, buffer, result)
+        elif mime_type.startswith('image/'):
+            run_processor(image_metadata, result, buffer, result, thumbnail_path)
+    finally:
+        buffer.close()
+    return result
+
+
+def thumbnail_path_for(upload_kind, upload_id):
+    return os.path.join(THUMBNAIL_DIR, upload_kind, f'{upload_id}.png')
+
+
+def claim_tasks(limit=MAX_FILES_PER_RUN):
+    """Mark up to limit pending files as processing for this run and return them as process_file tasks.
+    
+    Rows are picked with FOR UPDATE SKIP LOCKED, as jobs are, so runs that
+    overlap never pick the same file. The caller commits to publish the claim.
+    """
+    now = datetime.utcnow()
+    claimable = or_(
+        UploadMetadata.status == 'pending',
+        and_(UploadMetadata.status == 'processing', UploadMetadata.claimed_at < now - timedelta(seconds=CLAIM_TIMEOUT_SECONDS))
+    )
+    tasks = []
+    for kind, model in UPLOAD_KINDS.items():
+        rows = db.session.query(UploadMetadata.id, model.id, model.file_path).join(
+            model, and_(UploadMetadata.upload_kind == kind, UploadMetadata.upload_id == model.id)
+        ).filter(claimable).order_by(UploadMetadata.id).limit(limit - len(tasks)).with_for_update(
+            of=UploadMetadata, skip_locked=True
+        ).all()
+        tasks += [(metadata_id, path, thumbnail_path_for(kind, upload_id)) for metadata_id, upload_id, path in rows]
+        if len(tasks) >= limit:
+            break
+    
+    if tasks:
+        table = UploadMetadata.__table__
+        db.session.execute(update(table).where(table.c.id.in_([task[0] for task in tasks])).values(
+            status='processing', claimed_at=now
+        ))
+    return tasks
+
+
+def release_claims(metadata_ids):
+    """Hand claimed files that got no result back to the next run."""
+    table = UploadMetadata.__table__
+    db.session.execute(update(table).where(
+        table.c.id.in_(metadata_ids), table.c.status == 'processing'
+    ).values(status='pending', claimed_at=None))
+    db.session.commit()
+
+
+def write_results(results):
+    """Store a batch of process_file results with one executemany UPDATE."""
+    table = UploadMetadata.__table__
+    statement = update(table).where(table.c.id == bindparam('metadata_id')).values(
+        status=bindparam('status'),
+        sha256=bindparam('sha256'),
+        blake2b=bindparam('blake2b'),
+        mime_type=bindparam('mime_type'),
+        page_count=bindparam('page_count'),
+        document_created_at=bindparam('document_created_at'),
+        document_modified_at=bindparam('document_modified_at'),
+        thumbnail_path=bindparam('thumbnail_path'),
+        details=bindparam('details'),
+        error=bindparam('error'),
+        processed_at=bindparam('processed_at')
+    )
+    now = datetime.utcnow()
+    db.session.execute(statement, [{
+        'metadata_id': result['id'],
+        'status': result['status'],
+        'sha256': result.get('sha256'),
+        'blake2b': result.get('blake2b'),
+        'mime_type': result.get('mime_type'),
+        'page_count': result.get('page_count'),
+        'document_created_at': result.get('document_created_at'),
+        'document_modified_at': result.get('document_modified_at'),
+        'thumbnail_path': result.get('thumbnail_path'),
+        'details': result['details'],
+        'error': result['error'],
+        'processed_at': now
+    } for result in results])
+    db.session.commit()
+
+
+@job_handler('process_uploads')
+def process_uploads(payload, report_progress):
+    """Post-process pending uploads in a process pool, writing results back in batches."""
+    missing = queue_missing_uploads()
+    tasks = claim_tasks()
+    # Commits the claims; nothing is held open while the pool works
+    db.session.commit()
+    if not tasks:
+        return {'processed': 0, 'failed': 0, 'queued_missing': missing}
+    
+    processed = failed = 0
+    batch = []
+    try:
+        with ProcessPoolExecutor(max_workers=min(UPLOAD_PROCESSES, len(tasks))) as pool:
+            for result in pool.map(process_file, tasks, chunksize=4):
+                batch.append(result)
+                if result['status'] == 'processed':
+                    processed += 1
+                else:
+                    failed += 1
+                if len(batch) >= WRITE_BATCH_SIZE:
+                    write_results(batch)
+                    batch = []
+                    report_progress((processed + failed) * 100 / len(tasks))
+        if batch:
+            write_results(batch)
+    except Exception:
+        db.session.rollback()
+        release_claims([task[0] for task in tasks])
+        raise
+    
+    # More than one run's worth was waiting; pick up the rest straight away
+    if len(tasks) >= MAX_FILES_PER_RUN:
+        request_processing(db.session.connection())
+        db.session.commit()
+    return {'processed': processed, 'failed': failed, 'queued_missing': missing}
@@ -0,0 +1,66 @@
+# services/upload_queue.py
+from datetime import datetime
+
+from sqlalchemy import event, select, func, cast, literal
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models.models import db, EvidenceUpload, ActionEvidence, TicketAttachment, UploadMetadata, Job
+
+# Queueing side of upload post-processing. Every process saving uploads
+# loads this; the processors and their process pool live in
+# services/upload_processing.py, which only the job worker imports
+
+# kind -> model holding the uploaded file's path
+UPLOAD_KINDS = {
+    'evidence_upload': EvidenceUpload,
+    'action_evidence': ActionEvidence,
+    'ticket_attachment': TicketAttachment,
+}
+
+
+def request_processing(connection):
+    """Make sure a process_uploads job runs now: pull a waiting one forward, or queue one."""
+    jobs = Job.__table__
+    now = datetime.utcnow()
+    waiting = connection.execute(jobs.update().where(
+        jobs.c.job_type == 'process_uploads',
+        jobs.c.status == 'queued'
+    ).values(run_at=func.least(jobs.c.run_at, now))).rowcount
+    if not waiting:
+        connection.execute(jobs.insert().values(
+            queue='default', job_type='process_uploads', payload={}, status='queued',
+            progress=0, attempts=0, max_attempts=3, run_at=now, created_at=now
+        ))
+
+
+@event.listens_for(Session, 'after_flush')
+def queue_new_uploads(session, flush_context):
+    rows = [
+        {'upload_kind': kind, 'upload_id': obj.id, 'status': 'pending', 'details': {}, 'created_at': datetime.utcnow()}
+        for obj in session.new
+        for kind, model in UPLOAD_KINDS.items() if isinstance(obj, model)
+    ]
+    if not rows:
+        return
+    connection = session.connection()
+    connection.execute(insert(UploadMetadata.__table__).values(rows).on_conflict_do_nothing(
+        index_elements=['upload_kind', 'upload_id']
+    ))
+    request_processing(connection)
+
+
+def queue_missing_uploads():
+    """Add pending metadata rows for uploads that have none, e.g. those saved before processing existed."""
+    table = UploadMetadata.__table__
+    added = 0
+    for kind, model in UPLOAD_KINDS.items():
+        missing = select(
+            literal(kind), model.id, literal('pending'), cast('{}', table.c.details.type), func.timezone('utc', func.now())
+        ).where(~select(table.c.id).where(
+            table.c.upload_kind == kind, table.c.upload_id == model.id
+        ).exists())
+        added += db.session.execute(insert(table).from_select(
+            ['upload_kind', 'upload_id', 'status', 'details', 'created_at'], missing
+        ).on_conflict_do_nothing(index_elements=['upload_kind', 'upload_id'])).rowcount
+    return added
@@ -0,0 +1,24 @@
+# utils/archived_projects.py
+from flask import jsonify, request
+
+from app.services.project_archive import read_archived_project
+
+
+def archive_safe(f):
+    """Mark a non-GET project route (report generation, restore) as allowed on archived projects."""
+    f.archive_safe = True
+    return f
+
+
+def init_archived_project_reads(app):
+    """Serve requests for archived projects from the archive schema and refuse writes to them."""
+    
+    @app.before_request
+    def route_archived_project():
+        project_id = (request.view_args or {}).get('project_id')
+        if project_id is None or not read_archived_project(project_id):
+            return None
+        view = app.view_functions.get(request.endpoint)
+        if request.method in ('GET', 'HEAD', 'OPTIONS') or getattr(view, 'archive_safe', False):
+            return None
+        return jsonify({'message': 'Project is archived!'}), 409
@@ -0,0 +1,86 @@
+# utils/auth.py
+from flask import jsonify, request, current_app, g
+from datetime import datetime
+import jwt
+from functools import wraps
+
+from app.models.models import User
+from app.services.tokens import access_token_lifetime, denylist, epoch_seconds, new_jti
+from app.utils.policy import can_project
+
+# Helper function to create a JWT token
+
+def create_token(user_id, role):
+    # Short-lived access token; clients renew it with their refresh token
+    now = datetime.utcnow()
+    payload = {
+        'exp': now + access_token_lifetime(),
+        # Fractional, so revocations can tell tokens issued within the same second apart
+        'iat': epoch_seconds(now),
+        'sub': str(user_id),  # Convert user_id to string
+        'role': role,
+        'jti': new_jti(),
+        'type': 'access'
+    }
+    return jwt.encode(
+        payload,
+        current_app.config['JWT_SECRET_KEY'],
+        algorithm='HS256'
+    )
+
+# WSGI environ key under which /api/batch hands its already authenticated user to sub-requests
+BATCH_USER_ENVIRON = 'compliancepro.batch_user'
+
+# Decorator to verify JWT token
+
+def token_required(f):
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        batch_user = request.environ.get(BATCH_USER_ENVIRON)
+        if batch_user is not None:
+            return f(batch_user, *args, **kwargs)
+        
+        token = None
+        auth_header = request.headers.get('Authorization')
+        
+        if auth_header and auth_header.startswith('Bearer '):
+            token = auth_header.split(' ')[1]
+        
+        if not token:
+            print("No token found")
+            return jsonify({'message': 'Token is missing!'}), 401
+        
+        try:
+            data = jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=['HS256'])
+            if data.get('type') == 'refresh':
+                return jsonify({'message': 'Invalid token!'}), 401
+            if denylist.is_revoked(data):
+                print(f"Revoked token for user: {data.get('sub')}")
+                return jsonify({'message': 'Token has been revoked!'}), 401
+            
+            current_user = User.query.get(data['sub'])
+            
+            if not current_user:
+                print(f"User not found for id: {data.get('sub')}")
+                return jsonify({'message': 'User not found!'}), 401
+                
+            if not current_user.is_active:
+                return jsonify({'message': 'User is inactive!'}), 401
+            
+            g.token = data
+            
+        except jwt.ExpiredSignatureError:
+            print("Token expired")
+            return jsonify({'message': 'Token has expired!'}), 401
+        except jwt.InvalidTokenError as e:
+            print(f"Invalid token: {e}")
+            return jsonify({'message': 'Invalid token!'}), 401
+            
+        return f(current_user, *args, **kwargs)
+    
+    return decorated
+
+# Helper to check project-level access, same rules as the project list
+
+def can_access_project(user, project, action='project:view'):
+    return can_project(user, project.id, action)
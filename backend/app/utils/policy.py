@@ -0,0 +1,255 @@
+# utils/policy.py
+from collections import defaultdict
+from datetime import datetime
+from functools import wraps
+import threading
+import time
+
+from flask import jsonify
+from sqlalchemy import event, select, null
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+
+from app.models.models import db, CacheVersion, Project, ProjectUser, User
+
+CACHE_NAME = 'project_access'
+
+# How often a worker checks whether another process changed a company's memberships
+VERSION_CHECK_SECONDS = 1.0
+
+# Every global permission a route can ask for
+PERMISSIONS = (
+    'users:list', 'users:create', 'companies:create', 'projects:create',
+    'analytics:backfill', 'jobs:view_all', 'project_types:edit',
+    'standards:import', 'tickets:manage', 'tickets:rebuild_counters',
+    'audit_logs:view', 'audit_logs:archive', 'projects:archive',
+    # Cross-company scope: reading every company's data, creating users and projects in any company
+    'companies:view_all', 'companies:assign',
+    'tickets:view_all', 'changes:view_company', 'projects:view_company',
+)
+
+# Global permissions per user role; '*' grants everything
+ROLE_PERMISSIONS = {
+    'super_admin': {'*'},
+    'client_admin': {
+        'users:list', 'users:create', 'projects:create', 'projects:archive',
+        'changes:view_company', 'projects:view_company',
+    },
+}
+
+# Project-level permissions per ProjectUser role. super_admin holds them on
+# every project, and roles with projects:view_company on every project of
+# their company; None means any membership of the project.
+PROJECT_PERMISSIONS = {
+    'project:view': None,
+    'project:export': None,
+    'project:report': None,
+    'project:edit': {'project_owner'},
+    'evidence:review': {'project_owner'},
+    'scan:import': {'project_owner', 'contributor'},
+}
+ALL_PROJECT_ROLES = object()
+
+
+class Principal:
+    """A user's permissions plus the project ids they can reach, as sets per project role.
+    
+    Memory follows the number of reachable projects, not the largest id.
+    Reachable ids per action are merged once and kept, sorted, for IN lists.
+    Loaded with one query and cached per worker until the company's
+    memberships change.
+    """
+    
+    def __init__(self, user):
+        self.user_id = user.id
+        self.role = user.role
+        self.company_id = user.company_id
+        self.permissions = ROLE_PERMISSIONS.get(user.role, set())
+        # project role -> project ids; ALL_PROJECT_ROLES holds company-wide access
+        self.project_roles = defaultdict(set)
+        # action -> (frozenset, sorted list) of reachable ids
+        self.reachable = {}
+    
+    @property
+    def is_global(self):
+        return '*' in self.permissions
+    
+    def can(self, action):
+        return self.is_global or action in self.permissions
+    
+    def ids_for(self, action):
+        cached = self.reachable.get(action)
+        if cached is None:
+            roles = PROJECT_PERMISSIONS[action]
+            ids = set()
+            for role, role_ids in self.project_roles.items():
+                if role is ALL_PROJECT_ROLES or roles is None or role in roles:
+                    ids |= role_ids
+            # Loaded principals are never changed, so racing threads store equal values
+            cached = self.reachable[action] = (frozenset(ids), sorted(ids))
+        return cached
+    
+    def can_project(self, project_id, action='project:view'):
+        if self.is_global:
+            return True
+        return project_id in self.ids_for(action)[0]
+    
+    def project_ids(self, action='project:view'):
+        """Reachable project ids, sorted, or None when every project is reachable."""
+        if self.is_global:
+            return None
+        return self.ids_for(action)[1]
+    
+    def project_filter(self, column, action='project:view'):
+        """SQL criterion limiting column to reachable projects, or None for no limit."""
+        ids = self.project_ids(action)
+        return None if ids is None else column.in_(ids)
+
+
+def load_principal(user):
+    principal = Principal(user)
+    if principal.is_global:
+        return principal
+    
+    if principal.can('projects:view_company'):
+        query = select(Project.id, null()).where(Project.company_id == user.company_id).union_all(
+            select(ProjectUser.project_id, ProjectUser.role).where(ProjectUser.user_id == user.id)
+        )
+    else:
+        query = select(ProjectUser.project_id, ProjectUser.role).where(ProjectUser.user_id == user.id)
+    
+    for project_id, role in db.session.execute(query):
+        principal.project_roles[ALL_PROJECT_ROLES if role is None else role].add(project_id)
+    return principal
+
+
+def company_key(company_id):
+    # Users and projects without a company share key 0
+    return company_id or 0
+
+
+def version_name(company_id):
+    return f'{CACHE_NAME}:{company_key(company_id)}'
+
+
+def current_version(company_id, connection=None):
+    query = select(CacheVersion.version).where(CacheVersion.name == version_name(company_id))
+    return (connection or db.session).execute(query).scalar() or 0
+
+
+def bump_version(company_id, connection=None):
+    table = CacheVersion.__table__
+    statement = insert(table).values(name=version_name(company_id), version=1, updated_at=datetime.utcnow())
+    statement = statement.on_conflict_do_update(
+        index_elements=['name'],
+        set_={'version': table.c.version + 1, 'updated_at': datetime.utcnow()}
+    ).returning(table.c.version)
+    return (connection or db.session).execute(statement).scalar()
+
+
+_lock = threading.Lock()
+# company key -> {(user id, role, company id): principal}
+_principals = defaultdict(dict)
+# company key -> (version, monotonic time it was read)
+_versions = {}
+
+
+def get_principal(user):
+    """Return the cached principal for a user, reloading it if their company's memberships changed.
+    
+    A principal only depends on its user's memberships and, for client
+    admins, on the projects of their company, so changes are tracked per
+    company and a new project elsewhere leaves this cache alone.
+    """
+    company = company_key(user.company_id)
+    with _lock:
+        checked = _versions.get(company)
+    if checked is None or time.monotonic() - checked[1] >= VERSION_CHECK_SECONDS:
+        version = current_version(company)
+        with _lock:
+            if checked is None or version != checked[0]:
+                _principals.pop(company, None)
+            _versions[company] = (version, time.monotonic())
+    
+    key = (user.id, user.role, user.company_id)
+    with _lock:
+        principal = _principals[company].get(key)
+    if principal is None:
+        principal = load_principal(user)
+        with _lock:
+            _principals[company][key] = principal
+    return principal
+
+
+def can(user, action):
+    return get_principal(user).can(action)
+
+
+def can_project(user, project_id, action='project:view'):
+    return get_principal(user).can_project(project_id, action)
+
+
+def permission_required(action):
+    """Route decorator, placed below token_required, for a global permission."""
+    if action not in PERMISSIONS:
+        raise ValueError(f"Unknown permission: {action}")
+    
+    def decorator(f):
+        @wraps(f)
+        def decorated(current_user, *args, **kwargs):
+            if not can(current_user, action):
+                return jsonify({'message': 'Unauthorized!'}), 403
+            return f(current_user, *args, **kwargs)
+        return decorated
+    return decorator
+
+
+def changed_companies(session):
+    """Companies whose principals this flush changes: the members' for memberships, the owner's for projects."""
+    companies = set()
+    member_ids = set()
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, Project):
+            companies |= set(get_history(obj, 'company_id').sum()) | {obj.company_id}
+        elif isinstance(obj, ProjectUser):
+            member_ids |= set(get_history(obj, 'user_id').sum()) | {obj.user_id}
+    for obj in session.dirty:
+        if isinstance(obj, ProjectUser) and any(
+            get_history(obj, attribute).deleted for attribute in ('project_id', 'user_id', 'role')
+        ):
+            member_ids |= set(get_history(obj, 'user_id').sum())
+        if isinstance(obj, Project) and get_history(obj, 'company_id').deleted:
+            companies |= set(get_history(obj, 'company_id').sum())
+    
+    member_ids.discard(None)
+    if member_ids:
+        companies |= set(session.connection().execute(
+            select(User.company_id).distinct().where(User.id.in_(member_ids))
+        ).scalars())
+    return {company_key(company_id) for company_id in companies}
+
+
+@event.listens_for(Session, 'after_flush')
+def track_membership_changes(session, flush_context):
+    companies = changed_companies(session)
+    for company_id in companies:
+        bump_version(company_id, session.connection())
+    if companies:
+        session.info.setdefault('project_access_companies', set()).update(companies)
+
+
+@event.listens_for(Session, 'after_commit')
+def invalidate_principals(session):
+    companies = session.info.pop('project_access_companies', None)
+    if not companies:
+        return
+    with _lock:
+        for company in companies:
+            _principals.pop(company, None)
+            _versions.pop(company, None)
+
+
+@event.listens_for(Session, 'after_rollback')
+def discard_membership_changes(session):
+    session.info.pop('project_access_companies', None)
@@ -0,0 +1,110 @@
+# utils/rate_limit.py
+from functools import wraps
+import time
+
+from flask import current_app, g, jsonify, request
+
+from app.models.models import User
+from app.utils.auth import BATCH_USER_ENVIRON
+from app.services.rate_limits import AdaptiveLimiter, consume, parse_budget
+
+
+def client_ip(current_user):
+    return request.remote_addr
+
+
+def request_email(current_user):
+    data = request.get_json(silent=True) or {}
+    email = data.get('email')
+    return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+
+def user_tenant(current_user):
+    if current_user is None:
+        return None
+    return f'company{current_user.company_id}' if current_user.company_id else f'user{current_user.id}'
+
+
+def user_id(current_user):
+    return current_user.id if current_user is not None else None
+
+
+# What a budget can be keyed by; a key that resolves to None is not limited
+KEY_FUNCTIONS = {
+    'ip': client_ip,
+    'email': request_email,
+    'tenant': user_tenant,
+    'user': user_id,
+}
+
+
+def too_many_requests(retry_after):
+    return jsonify({'message': 'Too many requests!'}), 429, {'Retry-After': str(retry_after)}
+
+
+def rate_limit(name=None, cost=1, **budgets):
+    """Route decorator declaring token-bucket budgets, e.g. @rate_limit(ip='20/minute', email='5/minute').
+    
+    Budgets with the same name share buckets across routes. On routes behind
+    token_required, place it below that decorator so tenant/user keys resolve.
+    """
+    for kind in budgets:
+        if kind not in KEY_FUNCTIONS:
+            raise ValueError(f"Unknown rate limit key: {kind}")
+    budgets = {kind: parse_budget(budget) for kind, budget in budgets.items()}
+    
+    def decorator(f):
+        scope = name or f'{f.__module__.rsplit(".", 1)[-1]}.{f.__name__}'
+        
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if current_app.config.get('RATE_LIMITS_ENABLED', True):
+                current_user = args[0] if args and isinstance(args[0], User) else None
+                for kind, budget in budgets.items():
+                    value = KEY_FUNCTIONS[kind](current_user)
+                    if value is None:
+                        continue
+                    allowed, retry_after = consume(f'{scope}:{kind}:{value}', budget, cost)
+                    if not allowed:
+                        print(f"Rate limited {scope} for {kind} {value}")
+                        return too_many_requests(retry_after)
+            return f(*args, **kwargs)
+        return decorated
+    return decorator
+
+
+def shed_exempt(f):
+    """Mark a route (health checks, say) as never shed by the concurrency limiter."""
+    f.shed_exempt = True
+    return f
+
+
+def init_load_shedding(app):
+    """Install the adaptive concurrency limiter around every request of this process."""
+    limiter = AdaptiveLimiter(
+        initial=app.config.get('CONCURRENCY_LIMIT_INITIAL', 20),
+        max_limit=app.config.get('CONCURRENCY_LIMIT_MAX', 200)
+    )
+    app.extensions['load_shedder'] = limiter
+    
+    @app.before_request
+    def shed_load():
+        view = app.view_functions.get(request.endpoint)
+        if request.method == 'OPTIONS' or view is None or getattr(view, 'shed_exempt', False):
+            return None
+        # Batch sub-requests run inside the slot their /api/batch request already holds
+        if BATCH_USER_ENVIRON in request.environ:
+            return None
+        if not limiter.acquire():
+            retry_after = limiter.retry_after()
+            return jsonify({'message': 'Server is busy, please retry later!'}), 503, {'Retry-After': str(retry_after)}
+        g.load_shed_started = time.perf_counter()
+        return None
+    
+    @app.teardown_request
+    def record_latency(exc):
+        started = g.pop('load_shed_started', None)
+        if started is not None:
+            limiter.release(time.perf_counter() - started, request.endpoint)
+    
+    return limiter
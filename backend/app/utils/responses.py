@@ -0,0 +1,158 @@
+# utils/responses.py
+from datetime import date, datetime
+from decimal import Decimal
+import json
+import zlib
+
+from flask import Response, jsonify, request, stream_with_context
+
+# Rows encoded per chunk written to the response
+CHUNK_ROWS = 1000
+
+COLUMNAR_MIMETYPE = 'application/vnd.compliancepro.columnar+json'
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack')
+
+# ?format= values and the Accept types that select them
+LIST_FORMATS = {
+    'json': ('application/json',),
+    'columnar': (COLUMNAR_MIMETYPE,),
+    'msgpack': MSGPACK_MIMETYPES,
+}
+
+
+def encode_value(value):
+    """Fallback for values json/msgpack cannot encode natively."""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f'Cannot encode {type(value).__name__}')
+
+
+def dumps(value):
+    return json.dumps(value, default=encode_value, separators=(',', ':'))
+
+
+def negotiate_format():
+    """Pick a list format from ?format=, then the Accept header; None if the format is unknown."""
+    requested = request.args.get('format')
+    if requested:
+        return requested if requested in LIST_FORMATS else None
+    
+    offered = [mimetype for mimetypes in LIST_FORMATS.values() for mimetype in mimetypes]
+    best = request.accept_mimetypes.best_match(offered, default='application/json')
+    for name, mimetypes in LIST_FORMATS.items():
+        if best in mimetypes:
+            return name
+    return 'json'
+
+
+def negotiate_encoding():
+    accepted = request.accept_encodings
+    if accepted['br'] and accepted['br'] >= accepted['gzip']:
+        try:
+            import brotli  # noqa: F401
+            return 'br'
+        except ImportError:
+            pass
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress_chunks(chunks, encoding):
+    """Compress a stream of chunks as it is written; each chunk is flushed so clients see rows early."""
+    if encoding == 'br':
+        import brotli
+        compressor = brotli.Compressor(quality=4)
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+    else:
+        # wbits 31 writes a gzip header and trailer
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+def chunked(rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == CHUNK_ROWS:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def stream_objects(key, names, rows):
+    yield f'{{{dumps(key)}:['.encode('utf-8')
+    separator = ''
+    for batch in chunked(rows):
+        body = ','.join(dumps(dict(zip(names, row))) for row in batch)
+        yield (separator + body).encode('utf-8')
+        separator = ','
+    yield b']}'
+
+
+def stream_columnar(names, rows):
+    yield f'{{"columns":{dumps(names)},"rows":['.encode('utf-8')
+    separator = ''
+    for batch in chunked(rows):
+        body = ','.join(dumps(list(row)) for row in batch)
+        yield (separator + body).encode('utf-8')
+        separator = ','
+    yield b']}'
+
+
+def stream_msgpack(names, rows):
+    """{columns, rows} as MessagePack. The row count leads the array, so rows are collected first."""
+    import msgpack
+    
+    packer = msgpack.Packer(default=encode_value)
+    rows = [tuple(row) for row in rows]
+    yield packer.pack_map_header(2) + packer.pack('columns') + packer.pack(list(names)) + packer.pack('rows')
+    yield packer.pack_array_header(len(rows))
+    for batch in chunked(rows):
+        yield b''.join(packer.pack(row) for row in batch)
+
+
+def list_response(key, names, rows, objects=None, headers=None):
+    """Render a list endpoint from result rows in the format the client negotiated.
+    
+    names and rows come straight from a column query, so the columnar and
+    MessagePack shapes never build per-row dicts. objects, if given, builds the
+    endpoint's existing {key: [...]} payload for plain JSON clients; otherwise
+    that shape is streamed from the rows too. The body is compressed with
+    brotli or gzip when the client accepts it. headers are added to the response.
+    """
+    list_format = negotiate_format()
+    if list_format is None:
+        return jsonify({'message': 'Unsupported list format!'}), 400
+    
+    if list_format == 'msgpack':
+        try:
+            import msgpack  # noqa: F401
+        except ImportError:
+            return jsonify({'message': 'MessagePack is not available!'}), 406
+        body, mimetype = stream_msgpack(names, rows), MSGPACK_MIMETYPES[0]
+    elif list_format == 'columnar':
+        body, mimetype = stream_columnar(names, rows), COLUMNAR_MIMETYPE
+    elif objects is not None:
+        body, mimetype = iter([dumps({key: objects()}).encode('utf-8')]), 'application/json'
+    else:
+        body, mimetype = stream_objects(key, names, rows), 'application/json'
+    
+    headers = dict(headers or {}, Vary='Accept, Accept-Encoding')
+    encoding = negotiate_encoding()
+    if encoding:
+        body = compress_chunks(body, encoding)
+        headers['Content-Encoding'] = encoding
+    
+    return Response(stream_with_context(body), mimetype=mimetype, headers=headers)
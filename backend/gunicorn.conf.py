@@ -0,0 +1,21 @@
+# gunicorn.conf.py
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY') or multiprocessing.cpu_count() * 2 + 1)
+wsgi_app = 'wsgi:app'
+# Threads give each worker concurrent requests for the adaptive concurrency limiter to manage
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Build the app and load catalog caches once in the master; workers share them copy-on-write
+preload_app = True
+raw_env = ['PRELOAD_CACHES=1']
+
+
+def post_fork(server, worker):
+    # Never reuse a connection the master opened while preloading
+    from wsgi import app
+    from app.models.models import db
+    with app.app_context():
+        db.get_engine(app).dispose()
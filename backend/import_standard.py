@@ -0,0 +1,31 @@
+# import_standard.py
+import argparse
+
+from app import create_app
+from app.models.models import db
+from app.services.standard_import import IMPORT_FORMATS, import_standard_file
+
+app = create_app(register_routes=False)
+
+def main():
+    """Load a standard catalog file into compliance_standards/requirements"""
+    parser = argparse.ArgumentParser(description='Import a compliance standard catalog')
+    parser.add_argument('path')
+    parser.add_argument('--format', choices=IMPORT_FORMATS, default='json')
+    parser.add_argument('--code', help='Standard code, required unless the file provides it')
+    parser.add_argument('--name')
+    parser.add_argument('--version')
+    args = parser.parse_args()
+    
+    with app.app_context():
+        result = import_standard_file(args.path, args.format, {
+            'code': args.code,
+            'name': args.name,
+            'version': args.version
+        })
+        db.session.commit()
+        print(f"Imported standard {result['standard_id']}: "
+              f"{result['created']} created, {result['updated']} updated, {result['unchanged']} unchanged")
+
+if __name__ == "__main__":
+    main()
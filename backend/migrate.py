@@ -0,0 +1,10 @@
+# migrate.py
+from app import create_app
+from app.services.migrations import run_migrations
+
+app = create_app(register_routes=False)
+
+if __name__ == '__main__':
+    with app.app_context():
+        applied = run_migrations()
+    print(f"Database is up to date ({len(applied)} migrations applied)")
@@ -0,0 +1,29 @@
+import random
+
+from app.services.rate_limits import AdaptiveLimiter
+
+
+def run(limiter, latencies, concurrency=10):
+    """Replay latencies with up to concurrency requests in flight, as a steady stream of clients would."""
+    for latency in latencies:
+        while limiter.in_flight < concurrency and limiter.acquire():
+            pass
+        limiter.release(latency, 'projects.get_projects')
+
+
+def test_steady_load_keeps_limit():
+    random.seed(1)
+    limiter = AdaptiveLimiter(initial=20)
+    run(limiter, [random.lognormvariate(-9, 0.6) for _ in range(20000)])
+    
+    assert limiter.limit >= 20
+    assert limiter.gradient < limiter.tolerance
+
+
+def test_sustained_slowdown_lowers_limit():
+    random.seed(2)
+    limiter = AdaptiveLimiter(initial=20)
+    run(limiter, [random.lognormvariate(-9, 0.6) for _ in range(5000)])
+    run(limiter, [random.lognormvariate(-9, 0.6) * 5 for _ in range(200)])
+    
+    assert limiter.limit < 20
@@ -0,0 +1,87 @@
+# worker.py
+from multiprocessing import Process
+import os
+import signal
+import socket
+import time
+
+from app import create_app
+from app.services.jobs import load_handlers, claim_job, run_job, requeue_stale_jobs, schedule_periodic_jobs
+
+# Number of worker processes per queue, e.g. JOB_QUEUE_CONCURRENCY="default=4,reports=1"
+DEFAULT_QUEUE_CONCURRENCY = {
+    'default': 2,
+    'provisioning': 2,
+    'reports': 1,
+}
+
+POLL_INTERVAL_SECONDS = 1.0
+STALE_CHECK_SECONDS = 60
+
+
+def create_worker_app():
+    return create_app(register_routes=False)
+
+
+def queue_concurrency():
+    setting = os.environ.get('JOB_QUEUE_CONCURRENCY')
+    if not setting:
+        return dict(DEFAULT_QUEUE_CONCURRENCY)
+    
+    concurrency = {}
+    for entry in setting.split(','):
+        queue, _, count = entry.partition('=')
+        if queue.strip():
+            concurrency[queue.strip()] = int(count or 1)
+    return concurrency
+
+
+def work(queue, worker_id):
+    """Poll a single queue and run jobs one at a time until terminated."""
+    # Each process builds its own app so no database connection is shared across fork
+    app = create_worker_app()
+    
+    with app.app_context():
+        load_handlers()
+        schedule_periodic_jobs()
+        print(f"Worker {worker_id} listening on queue '{queue}'")
+        
+        last_stale_check = 0
+        while True:
+            if time.time() - last_stale_check > STALE_CHECK_SECONDS:
+                requeue_stale_jobs(queue)
+                last_stale_check = time.time()
+            
+            job = claim_job(queue, worker_id)
+            if job:
+                print(f"Worker {worker_id} running job {job.id} ({job.job_type})")
+                run_job(job)
+            else:
+                time.sleep(POLL_INTERVAL_SECONDS)
+
+
+def main():
+    host = socket.gethostname()
+    processes = []
+    
+    for queue, count in queue_concurrency().items():
+        for i in range(count):
+            worker_id = f"{host}:{os.getpid()}:{queue}:{i}"
+            process = Process(target=work, args=(queue, worker_id), daemon=True)
+            process.start()
+            processes.append(process)
+    
+    def shutdown(signum, frame):
+        for process in processes:
+            process.terminate()
+        raise SystemExit(0)
+    
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    
+    for process in processes:
+        process.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,14 @@
+# wsgi.py
+import gc
+import time
+
+started = time.perf_counter()
+from app import create_app  # noqa: E402
+
+app = create_app()
+app.config['STARTUP_TIMINGS']['process_seconds'] = round(time.perf_counter() - started, 4)
+
+if app.config.get('PRELOAD_CACHES'):
+    # Keep the preloaded objects out of GC bookkeeping so forked workers
+    # do not dirty (and copy) the pages they live on
+    gc.freeze()
@@ -63,7 +63,7 @@ const raciData = [
 const COLORS = ['#76ABAE', '#31363F', '#5f8a8c', '#4a4f57', '#9bc3c5'];
 const STATUS_COLORS = ['#4caf50', '#ff9800', '#f44336']; // Green, Orange, Red
 
-const ProjectTypeDistribution = () => {
+const ProjectTypeDistribution = ({ data = projectTypeData }) => {
   const theme = useTheme();
   
   return (
@@ -71,7 +71,7 @@ const ProjectTypeDistribution = () => {
       <ResponsiveContainer width="100%" height="100%">
         <PieChart>
           <Pie
-            data={projectTypeData}
+            data={data}
             cx="50%"
             cy="50%"
             labelLine={false}
@@ -81,7 +81,7 @@ const ProjectTypeDistribution = () => {
             dataKey="value"
             label={({ name, percent }) => `${name} ${(percent * 100).toFixed(0)}%`}
           >
-            {projectTypeData.map((entry, index) => (
+            {data.map((entry, index) => (
               <Cell key={`cell-${index}`} fill={COLORS[index % COLORS.length]} />
             ))}
           </Pie>
@@ -99,14 +99,14 @@ const ProjectTypeDistribution = () => {
   );
 };
 
-const CompanyProjectsChart = () => {
+const CompanyProjectsChart = ({ data = companyProjectsData }) => {
   const theme = useTheme();
   
   return (
     <Box sx={{ height: 300, mt: 2 }}>
       <ResponsiveContainer width="100%" height="100%">
         <BarChart
-          data={companyProjectsData}
+          data={data}
           margin={{
             top: 5,
             right: 30,
@@ -292,7 +292,7 @@ const RACIDistributionChart = () => {
   );
 };
 
-const DistributionCharts = () => {
+const DistributionCharts = ({ distribution }) => {
   const [tabValue, setTabValue] = useState(0);
 
   const handleTabChange = (event, newValue) => {
@@ -325,9 +325,9 @@ const DistributionCharts = () => {
             </Tabs>
           </Box>
           
-          {tabValue === 0 && <CompanyProjectsChart />}
+          {tabValue === 0 && <CompanyProjectsChart data={distribution?.company_projects} />}
           {tabValue === 1 && <RACIDistributionChart />}
-          {tabValue === 2 && <ProjectTypeDistribution />}
+          {tabValue === 2 && <ProjectTypeDistribution data={distribution?.project_type} />}
           
           <Box sx={{ display: 'flex', justifyContent: 'flex-end', mt: 2 }}>
             <Button color="primary" size="small">
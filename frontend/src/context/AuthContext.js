@@ -1,6 +1,6 @@
 // context/AuthContext.js
 import React, { createContext, useContext, useState, useEffect } from 'react';
-import { authService } from '../services/api';
+import { authService, bootService } from '../services/api';
 
 // Create the AuthContext
 const AuthContext = createContext(null);
@@ -13,6 +13,7 @@ export const AuthProvider = ({ children }) => {
   const [token, setToken] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [bootData, setBootData] = useState(null);
 
   // Initialize auth state from localStorage
   useEffect(() => {
@@ -27,15 +28,18 @@ export const AuthProvider = ({ children }) => {
     setLoading(false);
   }, []);
 
-  // Verify token validity and fetch user profile
+  // Verify token validity and fetch the user profile, together with the
+  // first screen's data so the app boots in a single request
   useEffect(() => {
     const verifyToken = async () => {
       if (!token) return;
 
       try {
-        const { user: profile } = await authService.getProfile();
-        setUser(profile);
-        localStorage.setItem('user', JSON.stringify(profile));
+        const data = await bootService.load();
+        if (!data.me) throw new Error('Profile unavailable');
+        setUser(data.me.user);
+        setBootData(data);
+        localStorage.setItem('user', JSON.stringify(data.me.user));
       } catch (err) {
         console.error('Token verification failed:', err);
         logout();
@@ -48,18 +52,29 @@ export const AuthProvider = ({ children }) => {
   }, [token]);
 
   // Login function
-  const login = (userData, authToken) => {
+  const login = (userData, authToken, refreshToken) => {
     setUser(userData);
     setToken(authToken);
     localStorage.setItem('token', authToken);
     localStorage.setItem('user', JSON.stringify(userData));
+    if (refreshToken) {
+      localStorage.setItem('refreshToken', refreshToken);
+    }
   };
 
   // Logout function
   const logout = () => {
+    const storedToken = localStorage.getItem('token');
+    if (storedToken) {
+      // Revoke server-side too; the local session ends either way
+      authService.logout(storedToken, localStorage.getItem('refreshToken'))
+        .catch((err) => console.error('Logout failed:', err));
+    }
     setUser(null);
     setToken(null);
+    setBootData(null);
     localStorage.removeItem('token');
+    localStorage.removeItem('refreshToken');
     localStorage.removeItem('user');
   };
 
@@ -80,6 +95,7 @@ export const AuthProvider = ({ children }) => {
     token,
     loading,
     error,
+    bootData,
     login,
     logout,
     isAuthenticated,
@@ -1,5 +1,5 @@
 // pages/Dashboard.js
-import React, { useState, useEffect } from 'react';
+import React, { useMemo } from 'react';
 import { Container, Grid, Typography, Box, Button, Divider, Skeleton } from '@mui/material';
 import { useAuth } from '../context/AuthContext';
 import DashboardLayout from '../components/layout/DashboardLayout';
@@ -8,41 +8,32 @@ import RecentActivity from '../components/dashboard/RecentActivity';
 import DistributionCharts from '../components/dashboard/DistributionCharts';
 import QuickActions from '../components/dashboard/QuickActions';
 
-const Dashboard = () => {
-  const { user } = useAuth();
-  const [loading, setLoading] = useState(true);
-  const [dashboardData, setDashboardData] = useState(null);
+// Project.CLOSED_STATUSES plus archived on the backend
+const CLOSED_PROJECT_STATUSES = ['completed', 'closed', 'cancelled', 'archived'];
+
+const dashboardStats = ({ projects, companies, users, tickets }) => {
+  const projectList = projects?.projects || [];
+  const completedProjects = projectList.filter((project) => project.status === 'completed').length;
   
-  useEffect(() => {
-    // Simulate API fetch
-    const fetchDashboardData = async () => {
-      try {
-        // In a real app, this would be an API call
-        // await api.get('/dashboard')
-        
-        // Simulate API delay
-        setTimeout(() => {
-          setDashboardData({
-            stats: {
-              totalCompanies: 12,
-              totalUsers: 78,
-              activeProjects: 24,
-              completedProjects: 14,
-              projectProgress: 65,
-              pendingTickets: 5,
-              resolvedTickets: 42
-            }
-          });
-          setLoading(false);
-        }, 1000);
-      } catch (error) {
-        console.error('Error fetching dashboard data:', error);
-        setLoading(false);
-      }
-    };
-    
-    fetchDashboardData();
-  }, []);
+  return {
+    totalCompanies: companies?.companies?.length || 0,
+    totalUsers: users?.users?.length || 0,
+    activeProjects: projectList.filter((project) => !CLOSED_PROJECT_STATUSES.includes(project.status)).length,
+    completedProjects,
+    projectProgress: projectList.length ? Math.round((completedProjects / projectList.length) * 100) : 0,
+    pendingTickets: tickets?.pendingTickets || 0,
+    resolvedTickets: tickets?.resolvedTickets || 0
+  };
+};
+
+const Dashboard = () => {
+  // Dashboard data arrives with the profile in the app's boot batch
+  const { user, bootData } = useAuth();
+  const loading = !bootData;
+  const dashboardData = useMemo(() => bootData && {
+    stats: dashboardStats(bootData),
+    distribution: bootData.distribution
+  }, [bootData]);
   
   // Check if user has 'super_admin' role
   const isSuperAdmin = user?.role === 'super_admin';
@@ -104,7 +95,7 @@ const Dashboard = () => {
             {loading ? (
               <Skeleton variant="rounded" height={400} />
             ) : (
-              <DistributionCharts />
+              <DistributionCharts distribution={dashboardData?.distribution} />
             )}
           </Grid>
           
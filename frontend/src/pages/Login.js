@@ -35,7 +35,7 @@ export const Login = () => {
     
     try {
       const data = await authService.login(email, password);
-      login(data.user, data.token);
+      login(data.user, data.token, data.refresh_token);
       navigate("/dashboard");
     } catch (err) {
       console.error("Login error:", err);
@@ -23,15 +23,45 @@ api.interceptors.request.use(
   }
 );
 
+// Concurrent 401s share one refresh call
+let refreshing = null;
+
+const refreshTokens = async () => {
+  const refreshToken = localStorage.getItem('refreshToken');
+  if (!refreshToken) throw new Error('No refresh token');
+
+  const response = await axios.post(`${api.defaults.baseURL}/auth/refresh`, { refresh_token: refreshToken });
+  localStorage.setItem('token', response.data.token);
+  localStorage.setItem('refreshToken', response.data.refresh_token);
+  return response.data.token;
+};
+
 // Add a response interceptor to handle common errors
 api.interceptors.response.use(
   (response) => {
     return response;
   },
-  (error) => {
+  async (error) => {
+    const request = error.config;
     if (error.response && error.response.status === 401) {
-      // Token expired or invalid, redirect to login
+      // Access token expired or revoked: renew it once, then retry the request
+      if (request && !request.retried && !request.url.startsWith('/auth/')) {
+        request.retried = true;
+        try {
+          refreshing = refreshing || refreshTokens();
+          const token = await refreshing;
+          request.headers.Authorization = `Bearer ${token}`;
+          return api(request);
+        } catch (refreshError) {
+          console.error('Token refresh failed:', refreshError);
+        } finally {
+          refreshing = null;
+        }
+      }
+
+      // Session is over, redirect to login
       localStorage.removeItem('token');
+      localStorage.removeItem('refreshToken');
       localStorage.removeItem('user');
       window.location.href = '/login';
     }
@@ -58,6 +88,17 @@ export const authService = {
     const response = await api.get('/auth/me');
     return response.data;
   },
+
+  // Revoke the access token and the refresh token's session
+  // (tokens are passed in, since they are cleared from storage before the call goes out)
+  logout: async (token, refreshToken) => {
+    const response = await api.post(
+      '/auth/logout',
+      { refresh_token: refreshToken },
+      { headers: { Authorization: `Bearer ${token}` } }
+    );
+    return response.data;
+  },
 };
 
 // User services
@@ -105,4 +146,37 @@ export const projectService = {
   },
 };
 
+// Batch services
+export const batchService = {
+  // Run several API calls in one round trip, e.g. [{ id: 'me', path: '/auth/me' }]
+  run: async (requests) => {
+    const response = await api.post('/batch', {
+      requests: requests.map(({ path, ...rest }) => ({ ...rest, path: `/api${path}` })),
+    });
+    return response.data.responses;
+  },
+};
+
+// Everything the first screen needs, fetched in one /api/batch round trip
+const BOOT_REQUESTS = [
+  { id: 'me', path: '/auth/me' },
+  { id: 'projects', path: '/projects' },
+  { id: 'companies', path: '/companies' },
+  { id: 'users', path: '/users' },
+  { id: 'tickets', path: '/tickets/summary' },
+  { id: 'distribution', path: '/analytics/distribution' },
+];
+
+export const bootService = {
+  // Profile plus first-screen data by id; calls the user may not make come back as null
+  load: async () => {
+    const responses = await batchService.run(BOOT_REQUESTS);
+    const data = {};
+    responses.forEach(({ id, status, body }) => {
+      data[id] = status === 200 ? body : null;
+    });
+    return data;
+  },
+};
+
 export default api;
\ No newline at end of file